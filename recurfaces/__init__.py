@@ -3,3 +3,12 @@ os.environ['PYGAME_HIDE_SUPPORT_PROMPT'] = "hide"
 
 from .recurface import Recurface
 from .renderpipeline import PipelineFlag, PipelineFilter
+from .rectmerger import RectMerger
+from .renderprofiler import RenderProfiler, FrameReport, RecurfaceStats
+from .surfacecache import SurfaceCache
+from .filtercache import FilterCache
+from .spatialindex import SpatialIndex
+from .recurfacegroup import RecurfaceGroup
+from .tiledrecurface import TiledRecurface
+from .streamedrecurface import StreamedRecurface
+from .positionarrays import PositionArrays
@@ -0,0 +1,219 @@
+from pygame import Surface
+
+from typing import Optional, Callable, Sequence, Union
+from collections import OrderedDict
+from weakref import ref
+from threading import RLock
+
+from .renderpipeline import PipelineFilter
+from .surfacecache import SurfaceCache
+
+
+class _FilterCacheEntry:
+    __slots__ = ("output", "byte_size")
+
+    def __init__(self, output: Surface, byte_size: int):
+        self.output = output
+        self.byte_size = byte_size
+
+
+class FilterCache:
+    """
+    Shares the outputs of deterministic pipeline filters between recurfaces.
+
+    When a recurface's render pipeline begins with one or more deterministic filters (before its children are applied),
+    the output of those filters depends only on its stored surface. Any other recurfaces with the same stored surface
+    and the same leading filters (wrapping the same filter functions) can then re-use that output rather than
+    computing their own. Outputs are keyed by the identity of the source surface and the filter functions, so a
+    source surface which is modified in place must be flagged (see Recurface.flag_surface()) to discard its outputs.
+
+    Source surfaces and filter functions are only weakly referenced, and their outputs are discarded once they are
+    garbage collected (so that their ids cannot be re-used by new objects while outputs are stored under them).
+    Filter functions which do not support weak references, such as built-in functions, are referenced strongly.
+
+    If a memory budget is set, the least recently used outputs are evicted whenever the total size of all outputs
+    exceeds it. A budget of 0 disables the cache
+    """
+
+    def __init__(self, max_bytes: Optional[int] = 32 * 1024**2):
+        self.__max_bytes = None
+
+        # Ordered from least to most recently used
+        self.__entries: OrderedDict[tuple[int, ...], _FilterCacheEntry] = OrderedDict()
+        # Maps the id of each source surface with stored outputs to a weak reference to it and the keys of its outputs
+        self.__sources: dict[int, tuple[ref, set[tuple[int, ...]]]] = {}
+        """
+        Maps the id of each filter function with stored outputs to a weak reference to it (or the function itself,
+        if it cannot be weakly referenced) and the keys of its outputs
+        """
+        self.__filter_funcs: dict[int, tuple[Union[ref, Callable[[Surface], Surface]], set[tuple[int, ...]]]] = {}
+        self.__used_bytes = 0
+        self.__lock = RLock()
+
+        self.max_bytes = max_bytes
+
+    @property
+    def max_bytes(self) -> Optional[int]:
+        """
+        The total number of bytes which stored filter outputs are allowed to use.
+        If set to None, there is no limit
+        """
+
+        return self.__max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: Optional[int]):
+        if (value is not None) and (value < 0):
+            raise ValueError("max bytes cannot be negative")
+
+        with self.__lock:
+            self.__max_bytes = value
+            self.__enforce_budget()
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.__max_bytes != 0
+
+    @property
+    def used_bytes(self) -> int:
+        """
+        The total number of bytes currently used by stored filter outputs
+        """
+
+        return self.__used_bytes
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, source: Surface, filters: Sequence[PipelineFilter]) -> Optional[Surface]:
+        """
+        Returns the stored output of applying the provided filters in order to a copy of the provided source surface,
+        if there is one. The returned surface is shared, so must not be modified
+        """
+
+        key = self.__get_key(source, filters)
+        with self.__lock:
+            if (entry := self.__entries.get(key)) is None:
+                return None
+
+            self.__entries.move_to_end(key)
+            return entry.output
+
+    def store(self, source: Surface, filters: Sequence[PipelineFilter], output: Surface) -> bool:
+        """
+        Records the provided output as the result of applying the provided filters in order to a copy of the provided
+        source surface, and evicts other outputs as necessary to keep within the memory budget.
+        The output must not be modified after it is stored.
+        Returns False if the output is too large to be stored at all
+        """
+
+        byte_size = SurfaceCache.get_byte_size(output)
+        key = self.__get_key(source, filters)
+
+        with self.__lock:
+            if (self.__max_bytes is not None) and (byte_size > self.__max_bytes):
+                return False
+
+            self.__discard(key)
+
+            source_id = key[0]
+            if (source_details := self.__sources.get(source_id)) is None:
+                source_details = self.__sources[source_id] = (
+                    ref(source, lambda _, source_id=source_id: self.__discard_source_id(source_id)),
+                    set()
+                )
+            source_details[1].add(key)
+
+            for pipeline_filter in filters:
+                self.__get_filter_func_keys(pipeline_filter.filter).add(key)
+
+            self.__entries[key] = _FilterCacheEntry(output, byte_size)
+            self.__used_bytes += byte_size
+
+            self.__enforce_budget()
+            return True
+
+    def discard_source(self, source: Surface) -> None:
+        """
+        Discards every stored output generated from the provided source surface
+        """
+
+        self.__discard_source_id(id(source))
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+            self.__sources.clear()
+            self.__filter_funcs.clear()
+            self.__used_bytes = 0
+
+    @staticmethod
+    def __get_key(source: Surface, filters: Sequence[PipelineFilter]) -> tuple[int, ...]:
+        return id(source), *(id(pipeline_filter.filter) for pipeline_filter in filters)
+
+    def __enforce_budget(self) -> None:
+        if self.__max_bytes is None:
+            return
+
+        while self.__used_bytes > self.__max_bytes:
+            self.__discard(next(iter(self.__entries)))
+
+    def __get_filter_func_keys(self, filter_func: Callable[[Surface], Surface]) -> set[tuple[int, ...]]:
+        """
+        Returns the set of keys of the outputs stored for the provided filter function, starting to track it
+        if it has no stored outputs yet
+        """
+
+        filter_func_id = id(filter_func)
+        if (filter_func_details := self.__filter_funcs.get(filter_func_id)) is None:
+            try:
+                filter_func_ref = ref(
+                    filter_func, lambda _, filter_func_id=filter_func_id: self.__discard_filter_func_id(filter_func_id)
+                )
+            except TypeError:  # Holding the function itself ensures that its id cannot be re-used
+                filter_func_ref = filter_func
+
+            filter_func_details = self.__filter_funcs[filter_func_id] = (filter_func_ref, set())
+
+        return filter_func_details[1]
+
+    def __discard(self, key: tuple[int, ...]) -> None:
+        if (entry := self.__entries.pop(key, None)) is None:
+            return
+
+        self.__used_bytes -= entry.byte_size
+
+        source_id, *filter_func_ids = key
+        FilterCache.__discard_tracked_key(self.__sources, source_id, key)
+        for filter_func_id in set(filter_func_ids):
+            FilterCache.__discard_tracked_key(self.__filter_funcs, filter_func_id, key)
+
+    def __discard_source_id(self, source_id: int) -> None:
+        with self.__lock:
+            if (source_details := self.__sources.get(source_id)) is None:
+                return
+
+            for key in tuple(source_details[1]):
+                self.__discard(key)
+
+    def __discard_filter_func_id(self, filter_func_id: int) -> None:
+        with self.__lock:
+            if (filter_func_details := self.__filter_funcs.get(filter_func_id)) is None:
+                return
+
+            for key in tuple(filter_func_details[1]):
+                self.__discard(key)
+
+    @staticmethod
+    def __discard_tracked_key(
+            tracked: dict[int, tuple[object, set[tuple[int, ...]]]], tracked_id: int, key: tuple[int, ...]
+    ) -> None:
+        """
+        Removes the provided key from the keys tracked under the provided id, and stops tracking the id once
+        it has no keys left
+        """
+
+        keys = tracked[tracked_id][1]
+        keys.discard(key)
+        if not keys:
+            del tracked[tracked_id]
@@ -0,0 +1,117 @@
+from typing import Any, Sequence
+
+try:
+    import numpy
+except ImportError:  # NumPy is an optional dependency, only required by this module
+    numpy = None
+
+from .recurface import Recurface
+
+
+class PositionArrays:
+    """
+    Reads and updates the render positions of many recurfaces at once using NumPy arrays of shape (n, 2),
+    where each row holds the (x, y) values for the recurface at the same index.
+
+    Rounding to the nearest pixel is carried out for all positions at once, and only those recurfaces whose
+    rounded render coords actually change are flagged to be updated in the next render.
+    Requires NumPy, which can be installed as an optional dependency of this package
+    """
+
+    @staticmethod
+    def get(recurfaces: Sequence[Recurface]) -> "numpy.ndarray":
+        """
+        Returns an array of the render positions of the provided recurfaces.
+        Rows for recurfaces without a render position are filled with NaN values
+        """
+
+        PositionArrays.__check_numpy()
+
+        positions = [recurface.render_position for recurface in recurfaces]
+        if not positions:
+            return numpy.empty((0, 2))
+        if None not in positions:
+            return numpy.array(positions, dtype=numpy.float64)
+
+        result = numpy.full((len(positions), 2), numpy.nan)
+        for index, position in enumerate(positions):
+            if position is not None:
+                result[index] = position
+
+        return result
+
+    @staticmethod
+    def set(recurfaces: Sequence[Recurface], positions: Any) -> None:
+        """
+        Sets the render position of each provided recurface to the corresponding row of the provided positions
+        """
+
+        PositionArrays.__check_numpy()
+
+        positions = PositionArrays.__to_rows(positions, len(recurfaces), "positions")
+        if not numpy.isfinite(positions).all():
+            raise ValueError("positions must all be finite")
+
+        PositionArrays.__apply(recurfaces, positions, PositionArrays.get(recurfaces))
+
+    @staticmethod
+    def move(recurfaces: Sequence[Recurface], offsets: Any) -> None:
+        """
+        Adds the provided offsets to the render positions of the provided recurfaces.
+        Offsets can be provided either as one row per recurface, or as a single (x, y) offset applied to all of them.
+
+        Note: If any of the provided recurfaces do not currently have a render position, this will throw a ValueError
+        """
+
+        PositionArrays.__check_numpy()
+
+        offsets = numpy.asarray(offsets, dtype=numpy.float64)
+        if offsets.shape == (2,):
+            offsets = numpy.broadcast_to(offsets, (len(recurfaces), 2))
+        offsets = PositionArrays.__to_rows(offsets, len(recurfaces), "offsets")
+
+        previous_positions = PositionArrays.get(recurfaces)
+        if numpy.isnan(previous_positions).any():
+            raise ValueError(".render_position is not currently set for all provided recurfaces")
+
+        PositionArrays.__apply(recurfaces, previous_positions + offsets, previous_positions)
+
+    @staticmethod
+    def __apply(recurfaces: Sequence[Recurface], positions: Any, previous_positions: Any) -> None:
+        # Recurfaces which previously had no position (NaN rows) always compare as changed
+        is_changed = (
+            PositionArrays.to_nearest_pixels(positions) != PositionArrays.to_nearest_pixels(previous_positions)
+        ).any(axis=1)
+        is_moved = (positions != previous_positions).any(axis=1)
+
+        with Recurface.batch():
+            for recurface, position, do_move, do_flag in zip(
+                    recurfaces, positions.tolist(), is_moved.tolist(), is_changed.tolist()
+            ):
+                if do_move:
+                    recurface._set_render_position((position[0], position[1]), do_flag=do_flag)
+
+    @staticmethod
+    def to_nearest_pixels(coords: Any) -> "numpy.ndarray":
+        """
+        Vectorised equivalent of Recurface.to_nearest_pixel(), rounding each of the provided coordinates half-up.
+        NaN values are preserved
+        """
+
+        PositionArrays.__check_numpy()
+
+        coords = numpy.asarray(coords, dtype=numpy.float64)
+        return numpy.where(numpy.mod(coords, 1) == 0.5, numpy.ceil(coords), numpy.round(coords))
+
+    @staticmethod
+    def __to_rows(values: Any, count: int, name: str) -> "numpy.ndarray":
+        result = numpy.asarray(values, dtype=numpy.float64)
+        if result.shape != (count, 2):
+            raise ValueError(f"{name} must have shape ({count}, 2) (received {result.shape})")
+
+        return result
+
+    @staticmethod
+    def __check_numpy() -> None:
+        if numpy is None:
+            raise ImportError("NumPy must be installed to use PositionArrays (pip install recurfaces[numpy])")
@@ -0,0 +1,305 @@
+from pygame import Rect
+
+from bisect import bisect_left, bisect_right
+from typing import Optional, Iterable
+
+
+class _MergeEntry:
+    __slots__ = ("rect", "covered_area", "input_rects")
+
+    def __init__(self, rect: Rect, covered_area: int, input_rects: list[Rect]):
+        # The bounding rect of the input rects which have been merged together
+        self.rect = rect
+        # The area covered by those input rects, counting any overlapping areas only once
+        self.covered_area = covered_area
+        self.input_rects = input_rects
+
+
+class RectMerger:
+    def __init__(
+            self,
+            max_rects: Optional[int] = 64,
+            collapse_overdraw_ratio: float = 1.1,
+            merge_overdraw_ratio: float = 1.0
+    ):
+        if (max_rects is not None) and (max_rects < 1):
+            raise ValueError("max rects must be at least 1")
+        if collapse_overdraw_ratio < 1 or merge_overdraw_ratio < 1:
+            raise ValueError("overdraw ratios cannot be lower than 1")
+
+        self.__max_rects = max_rects
+        self.__collapse_overdraw_ratio = collapse_overdraw_ratio
+        self.__merge_overdraw_ratio = merge_overdraw_ratio
+
+    @property
+    def max_rects(self) -> Optional[int]:
+        """
+        The maximum number of rects which can be returned by .merge(). If there are more rects than this remaining
+        after merging, they are collapsed into a single bounding rect instead.
+        If set to None, there is no maximum
+        """
+
+        return self.__max_rects
+
+    @property
+    def collapse_overdraw_ratio(self) -> float:
+        """
+        If the area of the bounding rect of all merged rects is no more than this many times larger than the area
+        covered by the input rects, they are collapsed into that single bounding rect.
+        A value of 1 means that rects are only collapsed if doing so would not cause any extra area to be updated
+        """
+
+        return self.__collapse_overdraw_ratio
+
+    @property
+    def merge_overdraw_ratio(self) -> float:
+        """
+        Two overlapping or adjacent rects are merged into their bounding rect if its area is no more than
+        this many times larger than the area covered by the input rects which make them up (as rects which have
+        already been merged may cover more area than their input rects did).
+        A value of 1 means that rects are only merged if their bounding rect covers exactly the same area
+        """
+
+        return self.__merge_overdraw_ratio
+
+    def merge(self, rects: Iterable[Rect]) -> list[Rect]:
+        """
+        Returns a new list of rects which covers (at least) all areas covered by the provided rects.
+
+        Rects which are entirely contained within other rects are removed, overlapping and adjacent rects are
+        merged wherever that does not cause excessive overdraw, and finally all rects are collapsed into their
+        bounding rect if the configured cost model determines that updating that single area would be cheaper.
+        The returned rects are ordered by descending area
+        """
+
+        input_rects = self.remove_contained(rects)
+        if len(input_rects) < 2:
+            return input_rects
+
+        result = self._merge_touching(input_rects)
+
+        bounding_rect = result[0].unionall(result[1:])
+        if (self.__max_rects is not None) and (len(result) > self.__max_rects):
+            return [bounding_rect]
+
+        # Overdraw is measured against the area the input rects cover, which merging can only have increased
+        covered_area = self.union_area(input_rects)
+        if (bounding_rect.width * bounding_rect.height) <= (covered_area * self.__collapse_overdraw_ratio):
+            return [bounding_rect]
+
+        return result
+
+    def _merge_touching(self, rects: list[Rect]) -> list[Rect]:
+        """
+        Merges any overlapping or adjacent rects from those provided whose bounding rect would not exceed
+        the configured overdraw ratio, until no further merges are possible. The provided rects are not modified.
+
+        This is done in a single sweep across the rects from left to right. Whenever two rects are merged, the merged
+        rect is immediately compared with any others it may now reach, rather than sweeping across all rects again
+        """
+
+        # Rects which the sweep has passed, ordered by their right edges
+        finished_entries = []
+        finished_rights = []
+        active_entries = []
+
+        for rect in sorted(rects, key=lambda rect: rect.x):
+            # Only rects which reach the left edge of this rect can overlap or be adjacent to it
+            still_active_entries = []
+            for active_entry in active_entries:
+                if active_entry.rect.right >= rect.x:
+                    still_active_entries.append(active_entry)
+                else:
+                    finished_index = bisect_right(finished_rights, active_entry.rect.right)
+                    finished_rights.insert(finished_index, active_entry.rect.right)
+                    finished_entries.insert(finished_index, active_entry)
+            active_entries = still_active_entries
+
+            entry = _MergeEntry(Rect(rect), rect.width * rect.height, [rect])
+            is_merged = True
+            while is_merged:
+                is_merged = False
+
+                """
+                A merged rect can extend further left than the sweep has reached, so may now reach finished rects.
+                Rects which have not yet been swept are compared with it once they are reached
+                """
+                rect = entry.rect
+                rect_left, rect_top, rect_right, rect_bottom = rect.left, rect.top, rect.right, rect.bottom
+                first_finished_index = bisect_left(finished_rights, rect_left)
+                for other_entries, first_index in ((active_entries, 0), (finished_entries, first_finished_index)):
+                    for other_index in range(first_index, len(other_entries)):
+                        other_entry = other_entries[other_index]
+
+                        # Only rects which overlap or are adjacent to this rect can be merged with it
+                        other_rect = other_entry.rect
+                        if not (
+                                (other_rect.left <= rect_right) and (rect_left <= other_rect.right) and
+                                (other_rect.top <= rect_bottom) and (rect_top <= other_rect.bottom)
+                        ):
+                            continue
+
+                        merged_entry = self.__get_merged_entry(entry, other_entry)
+                        if merged_entry is not None:
+                            del other_entries[other_index]
+                            if other_entries is finished_entries:
+                                del finished_rights[other_index]
+
+                            entry = merged_entry
+                            is_merged = True
+                            break
+                    if is_merged:
+                        break
+
+            active_entries.append(entry)
+
+        return sorted(
+            (entry.rect for entry in (*finished_entries, *active_entries)),
+            key=lambda rect: (-(rect.width * rect.height), rect.x, rect.y)
+        )
+
+    def __get_merged_entry(self, entry: "_MergeEntry", other_entry: "_MergeEntry") -> Optional["_MergeEntry"]:
+        """
+        Returns an entry for the bounding rect of the two provided entries (whose rects must overlap or be adjacent),
+        if that bounding rect would not exceed the configured overdraw ratio. Otherwise, returns None
+        """
+
+        rect, other_rect = entry.rect, other_entry.rect
+        bounding_rect = rect.union(other_rect)
+        bounding_area = bounding_rect.width * bounding_rect.height
+
+        # The sum of the two covered areas is at least the area they cover together, so is checked first
+        covered_area = entry.covered_area + other_entry.covered_area
+        if bounding_area > (covered_area * self.__merge_overdraw_ratio):
+            return None
+
+        if overlap_rect := rect.clip(other_rect):
+            covered_area -= RectMerger.__get_covered_overlap_area(entry, other_entry, overlap_rect)
+            if bounding_area > (covered_area * self.__merge_overdraw_ratio):
+                return None
+
+        # The larger list of input rects is extended, so that each input rect is only copied a few times
+        input_rects, other_input_rects = entry.input_rects, other_entry.input_rects
+        if len(input_rects) < len(other_input_rects):
+            input_rects, other_input_rects = other_input_rects, input_rects
+        input_rects.extend(other_input_rects)
+
+        return _MergeEntry(bounding_rect, covered_area, input_rects)
+
+    @staticmethod
+    def remove_contained(rects: Iterable[Rect]) -> list[Rect]:
+        """
+        Returns a new list containing copies of only those rects whose bounds are not entirely contained within
+        the bounds of another rect present in the list (this includes removing additional identical copies of rects),
+        ordered by descending area. Rects which cover no area are also removed
+        """
+
+        # A rect can only be contained by rects at least as large as it, so larger rects are kept (or not) first
+        rects_by_area = sorted(
+            (Rect(rect) for rect in rects if rect),
+            key=lambda rect: (-(rect.width * rect.height), rect.x)
+        )
+        if len(rects_by_area) < 2:
+            return rects_by_area
+
+        result = []
+
+        """
+        Kept rects are stored in a uniform grid. Any rect containing another must also contain its top left corner,
+        so each rect only needs comparing with the kept rects in that corner's grid cell
+        """
+        cell_size = RectMerger.__get_cell_size(rects_by_area)
+        cells: dict[tuple[int, int], list[Rect]] = {}
+        for rect in rects_by_area:
+            corner_cell = (rect.x // cell_size, rect.y // cell_size)
+            if any(kept_rect.contains(rect) for kept_rect in cells.get(corner_cell, ())):
+                continue
+
+            result.append(rect)
+            for cell in RectMerger.__get_cells(rect, cell_size):
+                if cell_rects := cells.get(cell):
+                    cell_rects.append(rect)
+                else:
+                    cells[cell] = [rect]
+
+        return result
+
+    @staticmethod
+    def union_area(rects: Iterable[Rect]) -> int:
+        """
+        Calculates the total area covered by the provided rects, counting any overlapping areas only once
+        """
+
+        # Events are ordered along the x axis, with each one marking where a rect's vertical span starts or stops
+        events = []
+        for rect in rects:
+            if rect:
+                events.append((rect.left, 1, rect.top, rect.bottom))
+                events.append((rect.right, -1, rect.top, rect.bottom))
+        events.sort()
+
+        result = 0
+        active_spans = []
+        previous_x = None
+        for x, event_type, top, bottom in events:
+            if active_spans and (previous_x is not None):
+                # Sum the length of the union of all vertical spans which are active between the two x positions
+                covered_length = 0
+                span_top, span_bottom = None, None
+                for active_top, active_bottom in sorted(active_spans):
+                    if (span_bottom is None) or (active_top > span_bottom):
+                        if span_bottom is not None:
+                            covered_length += span_bottom - span_top
+                        span_top, span_bottom = active_top, active_bottom
+                    else:
+                        span_bottom = max(span_bottom, active_bottom)
+                covered_length += span_bottom - span_top
+
+                result += covered_length * (x - previous_x)
+
+            if event_type == 1:
+                active_spans.append((top, bottom))
+            else:
+                active_spans.remove((top, bottom))
+            previous_x = x
+
+        return result
+
+    @staticmethod
+    def __get_cell_size(rects: list[Rect]) -> int:
+        """
+        Returns a grid cell size for the provided rects (of which there must be at least 1), based on their average
+        dimensions so that each rect overlaps only a few cells
+        """
+
+        total_area = sum(rect.width * rect.height for rect in rects)
+        return max(1, round((total_area / len(rects)) ** 0.5))
+
+    @staticmethod
+    def __get_cells(rect: Rect, cell_size: int) -> tuple[tuple[int, int], ...]:
+        """
+        Returns the grid cells which the provided rect overlaps
+        """
+
+        return tuple(
+            (cell_x, cell_y)
+            for cell_x in range(rect.left // cell_size, ((rect.right - 1) // cell_size) + 1)
+            for cell_y in range(rect.top // cell_size, ((rect.bottom - 1) // cell_size) + 1)
+        )
+
+    @staticmethod
+    def __get_covered_overlap_area(entry: "_MergeEntry", other_entry: "_MergeEntry", overlap_rect: Rect) -> int:
+        """
+        Returns the area which is covered by the input rects of both provided entries. Only the parts of those
+        input rects inside the overlap of the entries' bounding rects can contribute to it
+        """
+
+        parts = [rect.clip(overlap_rect) for rect in entry.input_rects if rect.colliderect(overlap_rect)]
+        other_parts = [rect.clip(overlap_rect) for rect in other_entry.input_rects if rect.colliderect(overlap_rect)]
+        if not (parts and other_parts):
+            return 0
+
+        return (
+            RectMerger.union_area(parts) + RectMerger.union_area(other_parts)
+            - RectMerger.union_area(parts + other_parts)
+        )
@@ -1,55 +1,216 @@
-from pygame import Surface, Rect
+from pygame import Surface, Rect, SRCALPHA, RLEACCEL, mask, transform
 
-from typing import Optional, FrozenSet, Any, Callable, Iterable, Union
+from typing import Optional, FrozenSet, Any, Callable, Iterable, Union, Iterator, Generator
 from weakref import ref
+from contextlib import contextmanager
 from math import ceil
-
-from .renderpipeline import PipelineFlag, PipelineFilter
+from time import perf_counter
+from bisect import insort, bisect_left
+from concurrent.futures import Executor, Future
+
+from .renderpipeline import PipelineFlag, PipelineFilter, PipelinePlan
+from .rectmerger import RectMerger
+from .renderprofiler import RenderProfiler
+from .surfacecache import SurfaceCache
+from .filtercache import FilterCache
+from .spatialindex import SpatialIndex
+
+# Shared by all recurfaces with no child recurfaces, as each call to frozenset() otherwise allocates a new object
+_EMPTY_FROZENSET = frozenset()
+# Marks a stored surface whose fill colour has not yet been checked (None represents a surface with no single fill colour)
+_UNCHECKED = object()
+"""
+The estimated cost of restoring and re-compositing each separate area of a patched composite (see
+Recurface.__flush_patched_blit_batch()), in addition to the cost of its pixels, measured in equivalent pixels blitted
+"""
+_PATCH_AREA_COST = 16384
+
+
+class _BlitBatch:
+    """
+    Collects the blits made by sibling recurfaces (and the children of any surfaceless siblings) onto a shared
+    destination, in render order, so that they can all be submitted to pygame in a single Surface.blits() call
+    """
+
+    __slots__ = ("blit_sequence", "blitters")
+
+    def __init__(self):
+        self.blit_sequence: list[tuple[Surface, tuple[int, int]]] = []
+        # The recurface responsible for each blit, and whether the full area of its blit must be reported as updated
+        self.blitters: list[tuple["Recurface", bool]] = []
 
 
 class Recurface:
+    """
+    Instance attributes are stored in slots to keep the memory footprint of each recurface low in very large chains.
+    Subclasses which do not declare their own __slots__ will still receive a __dict__ as normal
+    """
+    __slots__ = (
+        "__surface", "__render_position", "__render_coords", "__absolute_render_coords", "__absolute_rect",
+        "__render_priority", "__do_render", "__do_clip_to_visible_area",
+        "__rect", "__rect_origin", "__has_rect_changed", "__changed_sub_rects", "__has_hidden_changes",
+        "__top_level_changed_rects",
+        "__child_recurfaces", "__sorted_child_recurfaces", "__frozen_child_recurfaces", "__ordered_child_recurfaces",
+        "__are_child_recurfaces_ordered", "__is_child_order_stale", "__were_child_recurfaces_ordered",
+        "__cached_surfaces", "__cached_surfaces_area", "__scroll_surface", "__scroll_positions", "__patch_surface",
+        "__surface_fill_colour",
+        "__are_child_rects_stale", "__converted_surface", "__converted_surface_key", "__converted_destination_key",
+        "__is_reset", "__can_render_previous", "__invalidated_epoch",
+        "__pipeline_plan", "__before_render", "__parent_recurface",
+        "__weakref__"
+    )
+
+    """
+    The rect merger stored under this class attribute is used to optimise the rects returned by .render().
+    It can be replaced (on this class or a subclass) with a differently configured RectMerger to adjust how eagerly
+    rects are merged and collapsed
+    """
+    rect_merger: RectMerger = RectMerger()
+
+    """
+    Tracks the memory used by the cached surfaces of all recurfaces, and evicts them as needed to keep within its
+    memory budget (if one is set on it). Evicted surfaces are rebuilt the next time they are needed
+    """
+    surface_cache: SurfaceCache = SurfaceCache()
+
+    """
+    Shares the output of deterministic filters applied at the start of render pipelines (before the children are
+    applied) between all recurfaces with the same stored surface and the same leading filters.
+    Can be disabled by setting its memory budget to 0
+    """
+    filter_cache: FilterCache = FilterCache()
+
+    """
+    If set to True, each recurface's stored surface is converted to the pixel format of the surface it is rendered onto
+    (keeping per-pixel alpha if it is used) before being copied or blitted, as are any surfaces cached in a format which
+    differs from it. Blitting surfaces whose format does not match their destination requires each pixel to be converted
+    every time. Static surfaces which are blitted directly and use a colorkey or per-pixel alpha are also given
+    RLE acceleration. The converted stored surfaces are kept, and only regenerated when a stored surface is replaced
+    or flagged, or the destination's format changes. Requires a display mode to have been set
+    """
+    do_convert_surfaces: bool = False
+
+    # Tracks how many .batch() contexts are currently open, and the cache invalidations recorded within them
+    __batch_depth: int = 0
+    __batched_invalidations: dict["Recurface", tuple[bool, "Recurface", str]] = {}
+    """
+    Incremented each time a chain is about to be rendered, as no cached surfaces can be regenerated between renders.
+    Once a recurface's cached surfaces have been flagged in the current epoch, so have those of any ancestors which
+    the flagged change could affect, and so later changes to its descendants do not need to walk any further up
+    """
+    __invalidation_epoch: int = 0
+
     def __init__(
             self, surface: Optional[Surface] = None, position: Optional[tuple[float, float]] = None,
             parent: Optional["Recurface"] = None, priority: Any = None, do_render: bool = True,
             before_render: Optional[Callable[["Recurface"], None]] = None,
             render_pipeline: Iterable[Union[PipelineFlag, PipelineFilter]] = (
                     PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE
-            )
+            ),
+            do_clip_to_visible_area: bool = False
     ):
         self.__surface = surface
-        self.__render_position = [position[0], position[1]] if position else None
+        self.__render_position = (position[0], position[1]) if position else None
+        # The render position rounded to the nearest pixel, which is only recalculated when the render position changes
+        self.__render_coords: Optional[tuple[int, int]] = self.to_nearest_pixel(*position) if position else None
+        """
+        The summed render coords of this recurface's ancestry, and the area of its stored surface at those coords.
+        These are only calculated when next needed after being cleared (see .__clear_absolute_coords())
+        """
+        self.__absolute_render_coords: Union[None, tuple[int, int], object] = _UNCHECKED
+        self.__absolute_rect: Union[None, Rect, object] = _UNCHECKED
         self.__render_priority = priority
         self.__do_render = do_render
+        self.__do_clip_to_visible_area = do_clip_to_visible_area
 
         # Attributes which hold the object's render state
 
         # Used to store the rect representing the most recent render location
         self.__rect: Optional[Rect] = None
+        """
+        The coords at which the working surface was blitted in the most recent render. Unlike the render location above,
+        these are not clipped, so they are the offset between the working surface's coords and the destination's
+        """
+        self.__rect_origin: tuple[int, int] = (0, 0)
         # If True, ensures that the previous render location gets updated on the next frame
         self.__has_rect_changed: bool = False
+        """
+        Empty containers below are shared immutable instances, and are only replaced with mutable containers of their own once there is something to store in them
+        """
         # Stores subsections of the most recent render location which have since changed, if the whole has not
-        self.__changed_sub_rects: list[Rect] = []
+        self.__changed_sub_rects: Union[list[Rect], tuple] = ()
+        """
+        If True, areas of the working surface which fell outside of the most recent render location (and so are not
+        covered by the changed sub-rects above) have also changed since
+        """
+        self.__has_hidden_changes: bool = False
         # Should only ever contain rects in a top-level recurface. Stores extra areas in the destination to be updated
-        self.__top_level_changed_rects: list[Rect] = []
+        self.__top_level_changed_rects: Union[list[Rect], tuple] = ()
 
         # Child recurfaces are stored multiple ways for optimisation
-        self.__child_recurfaces = set()
-        self.__frozen_child_recurfaces = frozenset()
-        self.__ordered_child_recurfaces = tuple()
+        self.__child_recurfaces: Union[set["Recurface"], FrozenSet["Recurface"]] = _EMPTY_FROZENSET
+        # Kept sorted by render priority whenever the child recurfaces are ordered and their order is not stale
+        self.__sorted_child_recurfaces: Union[list["Recurface"], tuple] = ()
+        # Immutable views of the child recurfaces, which are only regenerated when next needed (None if outdated)
+        self.__frozen_child_recurfaces: Optional[FrozenSet["Recurface"]] = _EMPTY_FROZENSET
+        self.__ordered_child_recurfaces: Optional[tuple["Recurface", ...]] = ()
+        self.__are_child_recurfaces_ordered: bool = True
+        # If True, the child recurfaces must be fully re-sorted before they are next accessed
+        self.__is_child_order_stale: bool = False
+        # Whether the child recurfaces were ordered before any render priority changes which are yet to be organised
+        self.__were_child_recurfaces_ordered: Optional[bool] = None
 
         # Optimisation attributes
 
         # Stores previously generated working surfaces at the render pipeline's cache points
         self.__cached_surfaces = []
+        # The area of the stored surface which the cached surfaces were generated from (None represents the full area)
+        self.__cached_surfaces_area: Optional[Rect] = None
+        """
+        The render position of each child recurface when the scrollable cached surface (see PipelinePlan) was generated,
+        and that cached surface if it has since been released only because child recurfaces moved. If every child
+        recurface has moved by the same offset, the released surface is scrolled into place rather than rebuilt
+        """
+        self.__scroll_positions: Optional[dict["Recurface", tuple[float, float]]] = None
+        self.__scroll_surface: Optional[Surface] = None
+        """
+        The scrollable cached surface (see PipelinePlan), if it has since been released because of changes to the child
+        recurfaces. As every change to the children is tracked by their rects, the released surface can be patched
+        by re-compositing only the areas which have changed, rather than rebuilt in full
+        """
+        self.__patch_surface: Optional[Surface] = None
+        # The mapped colour of every pixel in the stored surface, if they are all the same colour
+        self.__surface_fill_colour: Any = _UNCHECKED
+        """
+        If True, the rendered rects of the child recurfaces were not all updated when their composite was last scrolled,
+        or have since been reset while this recurface was not rendered
+        """
+        self.__are_child_rects_stale: bool = False
+        """
+        A copy of the stored surface converted to its destination's pixel format (see .do_convert_surfaces),
+        if it did not already match, and the (destination format, is static) key it was converted for
+        """
+        self.__converted_surface: Optional[Surface] = None
+        self.__converted_surface_key: Optional[tuple] = None
+        """
+        The (destination id, is static) key of the destination last checked against the converted surface's format.
+        As the format of a particular destination rarely changes, this avoids checking its format on every render
+        """
+        self.__converted_destination_key: Optional[tuple[int, bool]] = None
         # Tracks whether a reset has occurred since the previous render
         self.__is_reset: bool = True
-        # Used when determining whether to reset cached surfaces
+        """
+        Whether this recurface could render anything when it was last rendered (as recorded at that point, and never
+        while flagging changes). Used when determining whether to reset the cached surfaces of its ancestors
+        """
         self.__can_render_previous = self._can_render
+        # The invalidation epoch in which this recurface's cached surfaces were last flagged as invalid
+        self.__invalidated_epoch = -1
 
-        self.__render_pipeline = []
+        # The render pipeline, compiled into a form which can be executed without searching through its items
+        self.__pipeline_plan: Optional[PipelinePlan] = None
         self.render_pipeline = render_pipeline
-        self.__before_render = None
-        self.before_render = before_render  # Done this way to deliberately invoke setter code
+        self.__before_render = before_render
         self.__parent_recurface = None
         self.parent_recurface = parent  # Done this way to deliberately invoke setter code
 
@@ -72,10 +233,29 @@ class Recurface:
         if self.__surface == value:
             return  # Already set to the correct value
 
+        is_surface_removed = (self.__surface is not None) and (value is None)
+
         self.__surface = value
+        self.__surface_fill_colour = _UNCHECKED
+        self.__absolute_rect = _UNCHECKED
+        self.__converted_surface = None
+        self.__converted_surface_key = None
+        self.__converted_destination_key = None
 
         self._flag_rects()
-        self._flag_cached_surfaces(do_clear_self=True)
+        if is_surface_removed:
+            """
+            The children will now be rendered directly onto this recurface's destination, so their rendered rects
+            (which are relative to the removed surface, and were clipped to it) no longer apply. If this recurface
+            has already been reset, the area they covered was updated along with it, so their rects are discarded
+            """
+            for child in self.__child_recurfaces:
+                child_rects = child._reset_rects()
+                if not self.__is_reset:
+                    self._frontload_update_rects(child_rects)
+        self._flag_cached_surfaces(do_clear_self=True, origin=self, cause="surface")
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="surface")
 
     @property
     def parent_recurface(self) -> Optional["Recurface"]:
@@ -93,21 +273,29 @@ class Recurface:
 
         if old_parent is not None:
             old_parent._frontload_update_rects(self._reset_rects())
-            old_parent._flag_cached_surfaces(do_clear_self=False)
+            old_parent._flag_cached_surfaces(do_clear_self=False, origin=self, cause="parent_recurface")
 
             self.__parent_recurface = None
             old_parent.remove_child_recurface(self)
+            if SpatialIndex.attached:
+                old_parent._flag_spatial_indexes(cause="child_recurfaces")
 
         else:  # If this recurface was previously top-level
             # Assumes that the new parent will render to the same destination as this recurface did
             value._add_top_level_update_rects((*self._reset_rects(), *self.__top_level_changed_rects))
-            self.__top_level_changed_rects = []
+            self.__top_level_changed_rects = ()
 
         if value is not None:
             self.__parent_recurface = ref(value)
             value.add_child_recurface(self)
 
-            value._flag_cached_surfaces(do_clear_self=False)
+            value._flag_cached_surfaces(do_clear_self=False, origin=self, cause="parent_recurface")
+            if SpatialIndex.attached:
+                value._flag_spatial_indexes(cause="child_recurfaces")
+
+        self.__clear_absolute_coords()
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="parent_recurface")
 
     @property
     def ancestry(self) -> tuple["Recurface", ...]:
@@ -135,14 +323,26 @@ class Recurface:
         the child recurfaces will instead be returned as a frozenset (unordered)
         """
 
-        if self.are_child_recurfaces_ordered:
+        if self.__is_child_order_stale:
+            self._organise_child_recurfaces()
+
+        if self.__are_child_recurfaces_ordered:
+            if self.__ordered_child_recurfaces is None:
+                self.__ordered_child_recurfaces = tuple(self.__sorted_child_recurfaces)
+
             return self.__ordered_child_recurfaces
         else:
+            if self.__frozen_child_recurfaces is None:
+                self.__frozen_child_recurfaces = frozenset(self.__child_recurfaces)
+
             return self.__frozen_child_recurfaces
 
     @property
     def are_child_recurfaces_ordered(self) -> bool:
-        return not (type(self.__ordered_child_recurfaces) is TypeError)
+        if self.__is_child_order_stale:
+            self._organise_child_recurfaces()
+
+        return self.__are_child_recurfaces_ordered
 
     @property
     def render_position(self) -> Optional[tuple[float, float]]:
@@ -151,7 +351,7 @@ class Recurface:
         before rounding to the nearest pixel has been applied
         """
 
-        return tuple(self.__render_position) if self.__render_position else None
+        return self.__render_position
 
     @render_position.setter
     def render_position(self, value: Optional[tuple[float, float]]):
@@ -163,11 +363,36 @@ class Recurface:
             if (self.__render_position[0] == value[0]) and (self.__render_position[1] == value[1]):
                 return  # Already set to the correct value
 
-        self.__render_position = [value[0], value[1]] if value else None
+        self.__render_position = (value[0], value[1]) if value else None
+        self.__render_coords = self.to_nearest_pixel(*value) if value else None
+        if self.__absolute_render_coords is not _UNCHECKED:
+            self.__clear_absolute_coords()
 
         self._flag_rects()
         if parent := self.parent_recurface:
-            parent._flag_cached_surfaces(do_clear_self=False)
+            parent._flag_cached_surfaces(do_clear_self=False, origin=self, cause="render_position")
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="render_position")
+
+    def _set_render_position(self, value: tuple[float, float], do_flag: bool) -> None:
+        """
+        Stores the provided render position without checking it against the existing value.
+        Used by bulk position updates, which have already determined whether the rounded render coords have changed;
+        if do_flag is False, the change is assumed to have no visible effect, so nothing is flagged for the next render
+        """
+
+        self.__render_position = value
+
+        if do_flag:
+            self.__render_coords = self.to_nearest_pixel(*value)
+            if self.__absolute_render_coords is not _UNCHECKED:
+                self.__clear_absolute_coords()
+
+            self._flag_rects()
+            if parent := self.parent_recurface:
+                parent._flag_cached_surfaces(do_clear_self=False, origin=self, cause="render_position")
+            if SpatialIndex.attached:
+                self._flag_spatial_indexes(cause="render_position")
 
     @property
     def render_coords(self) -> Optional[tuple[int, int]]:
@@ -179,32 +404,64 @@ class Recurface:
         leads to stuttery motion in some cases
         """
 
-        return self.to_nearest_pixel(*self.render_position) if self.__render_position else None
+        return self.__render_coords
 
     @property
     def absolute_render_coords(self) -> Optional[tuple[int, int]]:
         """
         Returns the summed render coords of all recurfaces in this object's ancestry. Assuming that the top-level
         recurface in this object's chain is rendered directly to a pygame window, the return value represents
-        this object's absolute display location on that pygame window
+        this object's absolute display location on that pygame window.
+
+        The result is cached until the render position or parent of this recurface or one of its ancestors changes
         """
 
-        result = [0, 0]
+        result = self.__absolute_render_coords
+        if result is not _UNCHECKED:
+            return result
 
+        # Finding the closest ancestor with cached coords, so that the coords of each recurface below it can be cached
+        uncached_recurfaces = []
         current_obj = self
-        while current_obj:
-            if not current_obj.render_position:
+        while (current_obj is not None) and (current_obj.__absolute_render_coords is _UNCHECKED):
+            uncached_recurfaces.append(current_obj)
+            current_obj = current_obj.parent_recurface
+
+        result = (0, 0) if current_obj is None else current_obj.__absolute_render_coords
+        for current_obj in reversed(uncached_recurfaces):
+            if (result is not None) and (current_obj_coords := current_obj.__render_coords):
+                result = (result[0] + current_obj_coords[0], result[1] + current_obj_coords[1])
+            else:
                 # Unable to calculate absolute render position due to missing position in the chain
-                return None
+                result = None
 
-            current_obj_coords = current_obj.render_coords
+            current_obj.__absolute_render_coords = result
 
-            result[0] += current_obj_coords[0]
-            result[1] += current_obj_coords[1]
+        return result
 
-            current_obj = current_obj.parent_recurface
+    @property
+    def absolute_rect(self) -> Optional[Rect]:
+        """
+        Returns the area covered by this recurface's stored surface at its absolute render coords
+        (see .absolute_render_coords), or None if it has no stored surface or its absolute render coords are unknown.
+        This does not account for any filters in the render pipeline which resize the working surface.
+
+        The result is cached until the stored surface, or the render position or parent of this recurface or one of
+        its ancestors, changes
+        """
+
+        result = self.__absolute_rect
+        if result is _UNCHECKED:
+            absolute_render_coords = self.absolute_render_coords
+            if (absolute_render_coords is None) or (not self.__surface):
+                result = None
+            else:
+                result = Rect(absolute_render_coords, self.__surface.get_size())
+
+            self.__absolute_rect = result
 
-        return result[0], result[1]
+        # A copy of the rect is returned to prevent external modification
+        return None if result is None else result.copy()
 
     @property
     def x_render_coord(self) -> int:
@@ -212,10 +469,10 @@ class Recurface:
         Represents the exact x coordinate that this recurface will render at on the destination
         """
 
-        if self.__render_position is None:
+        if self.__render_coords is None:
             raise ValueError(".render_position is not currently set")
 
-        return self.to_nearest_pixel(self.__render_position[0])
+        return self.__render_coords[0]
 
     @property
     def y_render_coord(self) -> int:
@@ -223,10 +480,10 @@ class Recurface:
         Represents the exact y coordinate that this recurface will render at on the destination
         """
 
-        if self.__render_position is None:
+        if self.__render_coords is None:
             raise ValueError(".render_position is not currently set")
 
-        return self.to_nearest_pixel(self.__render_position[1])
+        return self.__render_coords[1]
 
     @property
     def render_priority(self) -> Any:
@@ -243,21 +500,19 @@ class Recurface:
 
         parent = self.parent_recurface
 
-        # Determining if this recurface has changed from ordered to unordered, or vice-versa
-        is_ordered_old = (parent and parent.are_child_recurfaces_ordered)
-        self.__render_priority = value
+        """
+        Re-sorting the siblings is deferred until they are next accessed. If at that point they have changed from
+        ordered to unordered (or vice-versa), all siblings are flagged; otherwise, only this object has been reordered
+        """
         if parent:
-            parent._organise_child_recurfaces()
-        is_ordered_new = (parent and parent.are_child_recurfaces_ordered)
-
-        if is_ordered_old != is_ordered_new:  # Ordering of all siblings has been changed, they must all be updated
-            for sibling in parent.child_recurfaces:
-                sibling._flag_rects()
-        else:  # Only this object has been reordered amongst its siblings
-            self._flag_rects()
+            parent._flag_child_order()
+        self.__render_priority = value
 
+        self._flag_rects()
         if parent:
-            parent._flag_cached_surfaces(do_clear_self=False)
+            parent._flag_cached_surfaces(do_clear_self=False, origin=self, cause="render_priority")
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="render_priority")
 
     @property
     def do_render(self) -> bool:
@@ -277,7 +532,34 @@ class Recurface:
 
         self._flag_rects()
         if parent := self.parent_recurface:
-            parent._flag_cached_surfaces(do_clear_self=False)
+            parent._flag_cached_surfaces(do_clear_self=False, origin=self, cause="do_render")
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="do_render")
+
+    @property
+    def do_clip_to_visible_area(self) -> bool:
+        """
+        An optional flag which, when set to True, limits the rendering of this recurface's stored surface to
+        the area of it which will actually be visible on its destination. Only that area is copied, processed by
+        the render pipeline and blitted, so that the cost of rendering a large surface which is mostly outside of
+        its parent's area (or outside of the outer destination) scales with its visible area instead of its full size.
+
+        While this is enabled, any filters in the render pipeline will only receive the visible area of the working
+        surface, and so should not resize it or depend on the contents of the rest of the surface.
+        Any cached surfaces are regenerated whenever the visible area changes
+        """
+
+        return self.__do_clip_to_visible_area
+
+    @do_clip_to_visible_area.setter
+    def do_clip_to_visible_area(self, value: bool):
+        if self.__do_clip_to_visible_area == value:
+            return  # Already set to the correct value
+
+        self.__do_clip_to_visible_area = value
+
+        if self.is_surface_rendered:
+            self._flag_rects()
 
     @property
     def before_render(self) -> Callable:
@@ -285,21 +567,39 @@ class Recurface:
         Lifecycle method to be used as desired, which is called automatically at the top of .render()
         """
 
-        return self.__before_render
+        return self._call_before_render
 
     @before_render.setter
-    def before_render(self, value: Callable[["Recurface"], None]):
-        if value is None:
-            value = (lambda recurface: None)
+    def before_render(self, value: Optional[Callable[["Recurface"], None]]):
+        self.__before_render = value
 
-        def before_render(do_call_children: bool = True) -> None:
-            value(self)
+    def _call_before_render(self, do_call_children: bool = True) -> None:
+        """
+        Invokes the stored .before_render function (if any) for this recurface, and then (optionally) for each of
+        its descendants in turn
+        """
 
-            if do_call_children:
-                for child in self.child_recurfaces:
-                    child.before_render(do_call_children=True)
+        if not do_call_children:
+            if self.__before_render is not None:
+                self.__before_render(self)
+            return
 
-        self.__before_render = before_render
+        """
+        Descendants are visited in render order using a stack of iterators over each level's child recurfaces,
+        so that there is no limit on the depth of the chain. Each recurface's children are only retrieved after its
+        own function has been invoked, in case that function modifies them
+        """
+        pending_levels = [iter((self,))]
+        while pending_levels:
+            for current_obj in pending_levels[-1]:
+                if current_obj.__before_render is not None:
+                    current_obj.__before_render(current_obj)
+
+                if current_obj.__child_recurfaces:
+                    pending_levels.append(iter(current_obj.child_recurfaces))
+                    break
+            else:  # All recurfaces at this level have been visited
+                pending_levels.pop()
 
     @property
     def render_pipeline(self) -> tuple[Union[PipelineFlag, PipelineFilter], ...]:
@@ -330,58 +630,40 @@ class Recurface:
         unexpected behaviour
         """
 
-        return tuple(self.__render_pipeline)
+        return self.__pipeline_plan.items
 
     @render_pipeline.setter
     def render_pipeline(self, value: Iterable[Union[PipelineFlag, PipelineFilter]]):
-        is_unchanged = True
-        is_deterministic = True
-        apply_children_flags = 0
+        new_plan = PipelinePlan.compile(value)
 
-        new_pipeline = []
-        new_cached_surfaces = []
-        cached_surface_index = 0
-
-        """
-        This loop simultaneously stores the new pipeline, preserves as many cached surfaces as possible based on
-        where the new pipeline first diverges from the previous one, and runs validation checks on the items
-        in the new pipeline
-        """
-        for item_index, item in enumerate(value):
-            if is_unchanged:
-                try:
-                    if self.__render_pipeline[item_index] != item:
-                        is_unchanged = False
-                except IndexError:
-                    is_unchanged = False
+        if self.__pipeline_plan is None:  # Setting the initial pipeline, so there are no cached surfaces to preserve
+            self.__pipeline_plan = new_plan
+            self.__cached_surfaces = [None] * len(new_plan.cache_pipeline_indexes)
+            return
 
-            if item == PipelineFlag.CACHE_SURFACE:
-                if not is_deterministic:
-                    raise ValueError("cannot cache surface after a non-deterministic filter")
+        previous_items = self.__pipeline_plan.items
+        if new_plan.items == previous_items:
+            return
 
-                if is_unchanged:
-                    new_cached_surfaces.append(self.__cached_surfaces[cached_surface_index])
-                else:
-                    new_cached_surfaces.append(None)
-                cached_surface_index += 1
-            elif item == PipelineFlag.APPLY_CHILDREN:
-                apply_children_flags += 1
-            elif type(item) is PipelineFilter:
-                if (not item.is_deterministic) and is_deterministic:
-                    is_deterministic = False
+        # Cached surfaces are preserved up to the point where the new pipeline first diverges from the previous one
+        diverging_index = 0
+        for previous_item, item in zip(previous_items, new_plan.items):
+            if previous_item != item:
+                break
+            diverging_index += 1
 
-            new_pipeline.append(item)
+        new_cached_surfaces = [None] * len(new_plan.cache_pipeline_indexes)
+        preserved_cached_surfaces = 0
+        for cached_surface_index, pipeline_index in enumerate(new_plan.cache_pipeline_indexes):
+            if pipeline_index >= diverging_index:
+                break
 
-        if is_unchanged:
-            return
+            new_cached_surfaces[cached_surface_index] = self.__cached_surfaces[cached_surface_index]
+            preserved_cached_surfaces += 1
 
-        if apply_children_flags != 1:
-            raise ValueError(
-                f"render pipeline must contain exactly 1 '{PipelineFlag.APPLY_CHILDREN}' flag"
-                f" (received {apply_children_flags})"
-            )
+        self.__release_cached_surfaces(start_index=preserved_cached_surfaces)
 
-        self.__render_pipeline = new_pipeline
+        self.__pipeline_plan = new_plan
         self.__cached_surfaces = new_cached_surfaces
 
         """
@@ -391,7 +673,7 @@ class Recurface:
         if self.is_surface_rendered:
             self._flag_rects()
             if parent := self.parent_recurface:
-                parent._flag_cached_surfaces(do_clear_self=False)
+                parent._flag_cached_surfaces(do_clear_self=False, origin=self, cause="render_pipeline")
 
     @property
     def is_surface_rendered(self) -> bool:
@@ -404,10 +686,10 @@ class Recurface:
         in the next render
         """
 
-        if not (self.do_render and self.render_position):
+        if not (self.__do_render and self.__render_position):
             return False
 
-        if (not self.surface) and (not self.child_recurfaces):
+        if (not self.surface) and (not self.__child_recurfaces):
             return False
 
         return True
@@ -429,15 +711,24 @@ class Recurface:
         without being replaced
         """
 
+        self.__surface_fill_colour = _UNCHECKED
+        self.__converted_surface = None
+        self.__converted_surface_key = None
+        self.__converted_destination_key = None
+        if self.__surface is not None:
+            Recurface.filter_cache.discard_source(self.__surface)
+
         self._flag_rects()
-        self._flag_cached_surfaces(do_clear_self=True)
+        self._flag_cached_surfaces(do_clear_self=True, origin=self, cause="flag_surface")
 
     def generate_surface_copy(self) -> Surface:
         """
         Can optionally be overridden.
 
         Generates a copy of this recurface object's stored surface. Raises an error if unable to do so.
-        By default, this method uses the standard Surface.copy() method provided by pygame.
+        By default, this method uses the standard Surface.copy() method provided by pygame (copying the converted
+        stored surface instead, if one has been generated - see .do_convert_surfaces).
+        The generated copy should always have the same dimensions as the stored surface.
 
         For any subclasses which can implement a less resource-intensive process to generate a copy
         of their particular surface (for example, a subclass whose stored surface is simple to create from scratch and
@@ -447,14 +738,50 @@ class Recurface:
         if self.surface is None:
             raise ValueError(".surface does not contain a valid pygame Surface to copy")
 
+        if self.__converted_surface is not None:
+            return self.__converted_surface.copy()
+
         return self.surface.copy()
 
+    def generate_surface_area_copy(self, area: Rect) -> Surface:
+        """
+        Can optionally be overridden.
+
+        Generates a copy of the provided area of this recurface object's stored surface. Raises an error if unable
+        to do so. This method is used in place of .generate_surface_copy() when .do_clip_to_visible_area is set to True
+        and only part of the stored surface will be visible; the generated copy should always have the same dimensions
+        as the provided area
+        """
+
+        if self.surface is None:
+            raise ValueError(".surface does not contain a valid pygame Surface to copy")
+
+        if self.__converted_surface is not None:
+            return self.__converted_surface.subsurface(area).copy()
+
+        return self.surface.subsurface(area).copy()
+
     def add_child_recurface(self, child: "Recurface") -> None:
         if child in self.__child_recurfaces:  # Child is already present
             return
 
-        self.__child_recurfaces.add(child)
-        self._organise_child_recurfaces()
+        if self.__child_recurfaces:
+            self.__child_recurfaces.add(child)
+        else:
+            self.__child_recurfaces = {child}
+        self.__frozen_child_recurfaces = None
+
+        # Adding a child cannot make unordered children ordered, so only ordered children need to be kept sorted
+        if self.__are_child_recurfaces_ordered and not self.__is_child_order_stale:
+            if self.__sorted_child_recurfaces:
+                try:
+                    insort(self.__sorted_child_recurfaces, child, key=self.__get_render_priority)
+                    self.__ordered_child_recurfaces = None
+                except TypeError:  # The new child's priority cannot be compared with those of its siblings
+                    self.__is_child_order_stale = True
+            else:
+                self.__sorted_child_recurfaces = [child]
+                self.__ordered_child_recurfaces = None
 
         if child.parent_recurface is not self:
             child.parent_recurface = self
@@ -462,11 +789,111 @@ class Recurface:
     def remove_child_recurface(self, child: "Recurface") -> None:
         if child in self.__child_recurfaces:
             self.__child_recurfaces.remove(child)
-            self._organise_child_recurfaces()
+            self.__frozen_child_recurfaces = None
+
+            if self.__are_child_recurfaces_ordered and not self.__is_child_order_stale:
+                sorted_children = self.__sorted_child_recurfaces
+                try:
+                    child_index = bisect_left(sorted_children, child.render_priority, key=self.__get_render_priority)
+                except TypeError:  # Such as if a single child remains, whose priority was never compared to another
+                    child_index = 0
+
+                # Searching through any siblings with an equal render priority
+                while sorted_children[child_index] is not child:
+                    child_index += 1
+                del sorted_children[child_index]
+                self.__ordered_child_recurfaces = None
+            else:  # Removing a child may allow unordered children to become ordered
+                self.__is_child_order_stale = True
 
             if child.parent_recurface is self:
                 child.parent_recurface = None
 
+    def add_child_recurfaces(self, children: Iterable["Recurface"]) -> None:
+        """
+        Adds each of the provided recurfaces as a child of this recurface, detaching them from any previous parents.
+
+        This is equivalent to calling .add_child_recurface() for each of them, except that the child recurfaces are
+        only sorted once (when they are next accessed) and the cached surfaces of this recurface and its ancestors are
+        only invalidated once, making it suitable for adding very large numbers of child recurfaces at once
+        """
+
+        new_children = []
+        for child in dict.fromkeys(children):  # Removes any duplicates while preserving order
+            if (child not in self.__child_recurfaces) and (child.parent_recurface is not self):
+                new_children.append(child)
+
+        if not new_children:
+            return
+
+        parent_ref = ref(self)
+        with Recurface.batch():
+            for child in new_children:
+                if child.parent_recurface is not None:
+                    child.parent_recurface = None
+                else:  # Assumes that this recurface will render to the same destination as the child recurface did
+                    self._add_top_level_update_rects((*child._reset_rects(), *child.__top_level_changed_rects))
+                    child.__top_level_changed_rects = ()
+
+                child.__parent_recurface = parent_ref
+                child.__clear_absolute_coords()
+
+            if self.__child_recurfaces:
+                self.__child_recurfaces.update(new_children)
+            else:
+                self.__child_recurfaces = set(new_children)
+            self.__frozen_child_recurfaces = None
+
+            # Rather than inserting each child into the sorted children individually, all children are sorted at once
+            self.__is_child_order_stale = True
+
+            self._flag_cached_surfaces(do_clear_self=False, origin=self, cause="child_recurfaces")
+
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="child_recurfaces")
+            for child in new_children:
+                child._flag_spatial_indexes(cause="parent_recurface")
+
+    def remove_child_recurfaces(self, children: Iterable["Recurface"]) -> None:
+        """
+        Removes each of the provided recurfaces from this recurface's children, leaving them as top-level recurfaces.
+
+        This is equivalent to calling .remove_child_recurface() for each of them, except that the sorted child
+        recurfaces are only filtered once and the cached surfaces of this recurface and its ancestors are
+        only invalidated once, making it suitable for removing very large numbers of child recurfaces at once
+        """
+
+        removed_children = set()
+        for child in children:
+            if child in self.__child_recurfaces:
+                removed_children.add(child)
+
+        if not removed_children:
+            return
+
+        for child in removed_children:
+            self._frontload_update_rects(child._reset_rects())
+            child.__parent_recurface = None
+            child.__clear_absolute_coords()
+
+        self.__child_recurfaces.difference_update(removed_children)
+        self.__frozen_child_recurfaces = None
+
+        if self.__are_child_recurfaces_ordered and not self.__is_child_order_stale:
+            self.__sorted_child_recurfaces = [
+                child for child in self.__sorted_child_recurfaces if child not in removed_children
+            ] or ()
+            self.__ordered_child_recurfaces = None
+        else:  # Removing children may allow unordered children to become ordered
+            self.__is_child_order_stale = True
+
+        self._flag_cached_surfaces(do_clear_self=False, origin=self, cause="child_recurfaces")
+
+        if SpatialIndex.attached:
+            self._flag_spatial_indexes(cause="child_recurfaces")
+            for child in removed_children:
+                child._flag_spatial_indexes(cause="parent_recurface")
+
     def move_render_position(self, x_offset: float = 0, y_offset: float = 0) -> tuple[float, float]:
         """
         Adds the provided offset values to the recurface's current position.
@@ -512,40 +939,109 @@ class Recurface:
                 old_child.move_render_position(*offset)
             old_child.parent_recurface = old_parent
 
-    def render(self, destination: Surface) -> list[Rect]:
+    def render(
+            self, destination: Surface, profiler: Optional[RenderProfiler] = None, executor: Optional[Executor] = None
+    ) -> list[Rect]:
         """
         Entry point for the rendering process.
         Returns an optimised list of pygame rects representing updated areas of the provided destination.
 
         This method should typically be called once per frame, on a single top-level recurface per external destination,
-        and the returned rects used to update that destination
+        and the returned rects used to update that destination.
+
+        If a profiler is provided, the work done for each recurface during this render is recorded in a new frame report.
+        Otherwise, any profiler which was provided to a previous render stops recording changes
+
+        If an executor (such as a concurrent.futures.ThreadPoolExecutor) is provided, sibling recurfaces whose surfaces
+        must be re-composited with their children this frame are composited concurrently on it, and then blitted
+        in priority order on the calling thread. The output and returned rects are identical to rendering without
+        an executor. Any pipeline filters and before_render functions must be safe to run on another thread,
+        and recurfaces must not be modified by other threads while rendering is in progress
         """
 
         if self.parent_recurface:
             raise RuntimeError("this method should only be called on a recurface which has no parent recurface")
 
-        self.before_render(do_call_children=True)
+        self._call_before_render(do_call_children=True)
+        Recurface._flush_batched_invalidations()
+        # Any cached surfaces flagged up to this point may be regenerated by this render
+        Recurface.__invalidation_epoch += 1
+
+        if profiler is not None:
+            profiler.begin_frame()
+        elif RenderProfiler.active is not None:
+            # Changes are no longer recorded once renders stop being profiled
+            RenderProfiler.active.detach()
 
-        result = self.__top_level_changed_rects
-        self.__top_level_changed_rects = []
+        result = self.__top_level_changed_rects or []
+        self.__top_level_changed_rects = ()
 
         # A data store which is accessible to the entire chain for this render, to minimise passing data along manually
         stack_data = {
-            "surface_caching_blockers": set()
+            "surface_caching_blockers": set(),
+            "profiler": profiler,
+            "executor": executor
         }
-        result += self._render(destination, stack_data=stack_data)
+        blit_batch = _BlitBatch()
+        result += self._render(
+            destination, stack_data=stack_data, clip_rect=destination.get_clip(), blit_batch=blit_batch
+        )
+        Recurface.__flush_blit_batch(destination, blit_batch, result, profiler)
+        result = self.rect_merger.merge(result)
+
+        if profiler is not None:
+            profiler.end_frame(len(result))
 
-        return self.trimmed_rects(result)
+        return result
 
-    def _render(self, destination: Surface, stack_data: dict, coords_offset: tuple[int, int] = (0, 0)) -> list[Rect]:
+    def _render(
+            self, destination: Surface, stack_data: dict, clip_rect: Rect, blit_batch: _BlitBatch,
+            coords_offset: tuple[int, int] = (0, 0)
+    ) -> list[Rect]:
         """
         Responsible for drawing copies of all stored surfaces in this recurface chain to the provided destination,
         at the appropriate locations and in the appropriate order.
-        Returns a list of pygame rects representing updated areas on the provided destination
+        Returns a list of pygame rects representing updated areas on the provided destination.
+
+        The provided clip rect represents the area of the destination which can actually be drawn to. Any recurface
+        with a surface which falls entirely outside of this area is culled, skipping all further work for it
+        and its children (which are confined to its surface area).
+
+        Rather than being blitted immediately, this recurface's working surface is added to the provided blit batch,
+        which collects every blit onto the destination. Once the batch is flushed by whichever caller provided it,
+        this recurface's rendered rect is recorded and, if its full area was updated, reported as part of the
+        flushed rects rather than in the list returned here.
+
+        The chain is walked using an explicit stack of suspended render steps (see .__render_steps()) rather than
+        by recursion, so there is no limit on the depth of the chain
         """
 
         result = []
 
+        render_stack = [self.__render_steps(destination, stack_data, clip_rect, blit_batch, coords_offset, result)]
+        while render_stack:
+            child_render_steps = next(render_stack[-1], None)
+
+            if child_render_steps is None:  # The current recurface has finished rendering
+                render_stack.pop()
+            else:  # The current recurface cannot continue until one of its children has been rendered
+                render_stack.append(child_render_steps)
+
+        return result
+
+    def __render_steps(
+            self, destination: Surface, stack_data: dict, clip_rect: Rect, blit_batch: _BlitBatch,
+            coords_offset: tuple[int, int], result: list[Rect]
+    ) -> Generator[Generator, None, None]:
+        """
+        Carries out the rendering process described in ._render() for this recurface only, adding its rects to the
+        provided result list.
+
+        Whenever a child recurface must be rendered, this generator yields that child's own render steps, which must
+        be run to completion before this generator is resumed. Driving these generators from a single loop (rather than
+        rendering each child with a nested call) keeps the call stack the same size regardless of the chain's depth
+        """
+
         # Helper variable used in rendering - must be calculated before attributes are reset
         is_fully_updated = False
         if self.__has_rect_changed:
@@ -553,6 +1049,12 @@ class Recurface:
         elif (not self.is_surface_rendered) and self.surface:
             is_fully_updated = True
 
+        # The previous render location and its changed areas, in case a released composite is patched (see below)
+        previous_rect = self.__rect
+        previous_rect_origin = self.__rect_origin
+        previous_changed_sub_rects = self.__changed_sub_rects
+        has_hidden_changes = self.__has_hidden_changes
+
         # Adding rects for any areas which have changed since the last frame
         if self.is_surface_rendered:
             if self.__has_rect_changed:
@@ -563,93 +1065,355 @@ class Recurface:
         # Resetting attributes holding values from the previous render, now that they have been accounted for above
         self.__rect = None
         self.__has_rect_changed = False
-        self.__changed_sub_rects = []
+        self.__changed_sub_rects = ()
+        self.__has_hidden_changes = False
+
+        # Recorded so that later changes are only propagated to ancestors which this render may have affected
+        self.__can_render_previous = self._can_render
 
         # Checking if nothing new should be rendered to the screen
         if (not self.do_render) or (self.render_position is None):
-            return result
+            return
 
         # Rendering
         if self.surface:  # This recurface must paste a surface onto the destination
+            profiler = stack_data["profiler"]
+            render_coords = self.__render_coords
             working_render_coords = (
-                self.x_render_coord + coords_offset[0],
-                self.y_render_coord + coords_offset[1]
+                render_coords[0] + coords_offset[0],
+                render_coords[1] + coords_offset[1]
             )
+
+            # The area of the stored surface to render, if only part of it is to be rendered
+            visible_area = None
+
+            # Culling is only possible if the size of the surface to be blitted is known ahead of time
+            if self.__pipeline_plan.is_size_fixed or self.__do_clip_to_visible_area:
+                surface_area = Rect(working_render_coords, self.surface.get_size())
+                if not clip_rect.colliderect(surface_area):
+                    """
+                    Nothing from this recurface or its children can appear on the destination, and any previous render
+                    location has already been accounted for above. Flagging this recurface as reset ensures that
+                    stale render details held by its children are not walked again before its next fresh render
+                    """
+                    self.__is_reset = True
+
+                    if profiler is not None:
+                        profiler.stats(self).is_culled = True
+                    return
+
+                if self.__do_clip_to_visible_area and not clip_rect.contains(surface_area):
+                    visible_area = clip_rect.clip(surface_area).move(
+                        -working_render_coords[0], -working_render_coords[1]
+                    )
+                    working_render_coords = (
+                        working_render_coords[0] + visible_area.x,
+                        working_render_coords[1] + visible_area.y
+                    )
+
+            # Cached surfaces can only be re-used if they were generated from the same area of the stored surface
+            if visible_area != self.__cached_surfaces_area:
+                self.__release_cached_surfaces()
+                self.__cached_surfaces_area = visible_area
+
+            plan = self.__pipeline_plan
+            cached_surfaces = self.__cached_surfaces
+
             working_surface = None
             pipeline_index = 0
             next_cached_surface_index = 0
             is_surface_caching_blocked = False
 
             # Finding the most complete cached surface available
-            for cached_surface_reverse_index, cached_surface in enumerate(reversed(self.__cached_surfaces)):
+            for retrieved_cached_surface_index in range(len(cached_surfaces)-1, -1, -1):
+                cached_surface = cached_surfaces[retrieved_cached_surface_index]
                 if cached_surface:
-                    retrieved_cached_surface_index = (len(self.__cached_surfaces)-1) - cached_surface_reverse_index
-                    next_cached_surface_index = retrieved_cached_surface_index + 1
+                    cache_flag_pipeline_index = plan.cache_pipeline_indexes[retrieved_cached_surface_index]
+
+                    if cache_flag_pipeline_index == plan.last_index:
+                        """
+                        If this is the last pipeline item, no further changes will be made to the surface.
+                        Therefore, it's fine to use the cached surface directly rather than copying it
+                        """
+                        working_surface = cached_surface
+                    else:
+                        working_surface = cached_surface.copy()
 
-                    # Finding the pipeline index it corresponds to
-                    cache_flag_reverse_index = 0  # Tracks how many cache flags have been encountered so far
-                    for pipeline_reverse_index, pipeline_item in enumerate(reversed(self.__render_pipeline)):
-                        if pipeline_item == PipelineFlag.CACHE_SURFACE:
-                            # If this is the cache flag corresponding to the retrieved cached surface
-                            if cache_flag_reverse_index == cached_surface_reverse_index:
-                                cache_flag_pipeline_index = (len(self.__render_pipeline)-1) - pipeline_reverse_index
-
-                                if cache_flag_pipeline_index == len(self.__render_pipeline)-1:
-                                    """
-                                    If this is the last pipeline item, no further changes will be made to the surface.
-                                    Therefore, it's fine to use the cached surface directly rather than copying it
-                                    """
-                                    working_surface = cached_surface
-                                else:
-                                    working_surface = cached_surface.copy()
-
-                                # Rendering will resume from this point in the pipeline
-                                pipeline_index = cache_flag_pipeline_index + 1
-                                break
-                            # Otherwise, increment the number of cache flags encountered
-                            else:
-                                cache_flag_reverse_index += 1
+                        if profiler is not None:
+                            profiler.stats(self).surface_copies += 1
+
+                    surface_cache = Recurface.surface_cache
+                    if surface_cache.max_bytes is not None:
+                        surface_cache.touch(self, retrieved_cached_surface_index)
+
+                    # Rendering will resume from this point in the pipeline
+                    pipeline_index = cache_flag_pipeline_index + 1
+                    next_cached_surface_index = retrieved_cached_surface_index + 1
                     break
 
-            if not working_surface:  # No valid cached surface was found
-                working_surface = self.generate_surface_copy()
+            # Subclasses which override the surface copy method used may provide something other than a plain copy
+            if visible_area:
+                is_surface_copy_default = type(self).generate_surface_area_copy is Recurface.generate_surface_area_copy
+            else:
+                is_surface_copy_default = type(self).generate_surface_copy is Recurface.generate_surface_copy
 
-            # Working through the render pipeline
-            while pipeline_index < len(self.__render_pipeline):
-                pipeline_item = self.__render_pipeline[pipeline_index]
+            """
+            The output of the leading deterministic filters can only be shared if it was generated from a full copy
+            of the stored surface (as provided by the default .generate_surface_copy())
+            """
+            filter_cache = Recurface.filter_cache
+            is_filter_output_shared = (
+                plan.shared_filters and (not visible_area) and filter_cache.is_enabled and is_surface_copy_default
+            )
+            is_shared_filter_output_modified = self.__child_recurfaces or plan.has_unshared_filters
 
-                if pipeline_item == PipelineFlag.CACHE_SURFACE:
-                    if not is_surface_caching_blocked:
-                        if pipeline_index == len(self.__render_pipeline)-1:
+            """
+            If nothing will modify the working surface before a filter replaces it with a new surface (or before
+            it is blitted), the stored surface itself (or a subsurface of its visible area) is used as the working surface
+            up to that point rather than a copy. Nothing is cached before that point, as the stored surface is already
+            available without copying it
+            """
+            borrow_end_index = plan.borrow_end_index
+            is_stored_surface_borrowed = (
+                (borrow_end_index is not None) and is_surface_copy_default
+                and not (self.__child_recurfaces and (plan.apply_children_index < borrow_end_index))
+            )
+
+            # The offset by which the released scrollable cached surface can be moved into place, if it can be re-used
+            scroll_offset = None
+            if self.__scroll_surface is not None:
+                if not working_surface:
+                    scroll_offset = self.__get_scroll_offset()
+                if scroll_offset is None:
+                    self.__scroll_surface = None
+
+            """
+            The areas of the released composite (see .__patch_surface) which must be restored from the stored surface,
+            if it is to be patched. The stored surface must be opaque, so that restoring an area of it overwrites that
+            area exactly, and the children's rendered rects must all be relative to the released composite
+            """
+            patch_rects = None
+            patch_surface = self.__patch_surface
+            if patch_surface is not None:
+                self.__patch_surface = None
+
+                if (
+                        (not working_surface) and (scroll_offset is None) and (not visible_area)
+                        and is_surface_copy_default and (not is_stored_surface_borrowed)
+                        and previous_rect and (not has_hidden_changes) and (not self.__is_reset)
+                        and (not self.__are_child_rects_stale)
+                        and Recurface.__is_opaque(self.__surface)
+                ):
+                    patch_rects = [
+                        rect.move(-previous_rect_origin[0], -previous_rect_origin[1])
+                        for rect in previous_changed_sub_rects
+                    ]
+
+            if working_surface:
+                if profiler is not None:
+                    profiler.stats(self).cache_hits += 1
+            elif patch_rects is not None:
+                """
+                Only the children have changed since the released composite was generated, so rendering resumes
+                from the point at which they are applied, restoring and re-compositing only the changed areas
+                """
+                if self.do_convert_surfaces:
+                    self.__update_converted_surface(destination, is_static=False)
+
+                working_surface = patch_surface
+                pipeline_index = plan.apply_children_index
+                next_cached_surface_index = plan.first_child_cached_surface_index
+
+                # The released composite is still partly rebuilt, so its cached surface counts as missed
+                if profiler is not None:
+                    profiler.stats(self).cache_patches += 1
+                    profiler.record_cache_miss(self)
+            elif scroll_offset is None:  # No valid cached surface was found
+                if is_filter_output_shared:
+                    working_surface = filter_cache.get(self.surface, plan.shared_filters)
+
+                if working_surface:
+                    """
+                    Another recurface (or this one, previously) has already applied the shared filters to the same
+                    stored surface, so rendering can resume after them. The shared output must be copied if it
+                    would otherwise be modified by this recurface's children or later filters
+                    """
+                    pipeline_index = plan.shared_filters_end_index + 1
+
+                    if is_shared_filter_output_modified:
+                        working_surface = working_surface.copy()
+
+                    if profiler is not None:
+                        profiler.stats(self).filter_cache_hits += 1
+                        if is_shared_filter_output_modified:
+                            profiler.stats(self).surface_copies += 1
+                elif is_stored_surface_borrowed:
+                    if self.do_convert_surfaces:
+                        """
+                        The stored surface is only treated as static (and given RLE acceleration where it helps)
+                        if it is blitted directly in full, as RLE surfaces must be decoded whenever they are read from
+                        """
+                        self.__update_converted_surface(destination, is_static=(
+                            (borrow_end_index == len(plan.items)) and not self.__do_clip_to_visible_area
+                        ))
+
+                    working_surface = self.__surface if self.__converted_surface is None else self.__converted_surface
+                    if visible_area:
+                        working_surface = working_surface.subsurface(visible_area)
+
+                    """
+                    No children are applied and nothing is cached before the end of the borrowed section, so rendering
+                    can skip straight to it
+                    """
+                    pipeline_index = borrow_end_index
+                    if self.__are_child_rects_stale:
+                        is_fully_updated = True
+                        self.__are_child_rects_stale = False
+                else:
+                    if self.do_convert_surfaces and is_surface_copy_default:
+                        self.__update_converted_surface(destination, is_static=False)
+
+                    if visible_area:
+                        working_surface = self.generate_surface_area_copy(visible_area)
+                    else:
+                        working_surface = self.generate_surface_copy()
+
+                    if profiler is not None:
+                        profiler.stats(self).surface_copies += 1
+
+                # Cached surfaces which are never stored (while the stored surface is borrowed) do not count as missed
+                if (profiler is not None) and cached_surfaces and not (
+                        is_stored_surface_borrowed and (plan.cache_pipeline_indexes[-1] < borrow_end_index)
+                ):
+                    profiler.record_cache_miss(self)
+
+            # Used to estimate how long each cached surface would take to rebuild, if evicted from the surface cache
+            build_start_time = perf_counter() if next_cached_surface_index < len(cached_surfaces) else 0
+
+            # Children are offset so that they are positioned relative to the full stored surface
+            child_coords_offset = (-visible_area.x, -visible_area.y) if visible_area else (0, 0)
+
+            if scroll_offset is not None:
+                """
+                Every child recurface has moved by the same offset since the released scrollable cached surface was
+                generated, and its stored surface is a single colour, so the released surface only needs scrolling
+                and the newly exposed strips re-compositing. Rendering then resumes from the scrollable cache point.
+                As the whole composite has moved, its full area must be updated
+                """
+                working_surface = self.__scroll_surface
+                self.__scroll_surface = None
+
+                if (yield from self.__scroll_steps(working_surface, scroll_offset, stack_data)):
+                    is_surface_caching_blocked = True
+
+                pipeline_index = plan.cache_pipeline_indexes[plan.scroll_cached_surface_index]
+                is_fully_updated = True
+                self.__scroll_positions = {child: child.__render_position for child in self.__child_recurfaces}
+
+                if profiler is not None:
+                    profiler.stats(self).cache_scrolls += 1
+
+            # Working through the render pipeline
+            pipeline_items = plan.items
+            while pipeline_index < len(pipeline_items):
+                pipeline_item = pipeline_items[pipeline_index]
+
+                # The plan stores flags as the flag members themselves, so they can be compared by identity
+                if pipeline_item is PipelineFlag.CACHE_SURFACE:
+                    is_caching_skipped = is_surface_caching_blocked or (
+                        is_stored_surface_borrowed and (pipeline_index < borrow_end_index)
+                    )
+                    if not is_caching_skipped:
+                        next_cached_surface_index = plan.cached_surface_indexes[pipeline_index]
+
+                        is_cached_surface_converted = self.do_convert_surfaces and not Recurface.__is_format_matching(
+                            working_surface, destination
+                        )
+
+                        if pipeline_index == plan.last_index:
                             """
                             If this is the last pipeline item,  no further changes will be made to the surface.
                             Therefore, it's fine to cache the original rather than a copy
                             """
-                            self.__cached_surfaces[next_cached_surface_index] = working_surface
+                            if is_cached_surface_converted:
+                                # A scrollable cached surface is modified when it is scrolled, so is not static
+                                working_surface = Recurface.__convert_surface(
+                                    working_surface, destination,
+                                    is_static=(next_cached_surface_index != plan.scroll_cached_surface_index)
+                                )
+                            cached_surface = working_surface
+                        elif is_cached_surface_converted:
+                            # Converting the working surface produces a new surface, so it does not also need copying
+                            cached_surface = Recurface.__convert_surface(working_surface, destination, is_static=False)
                         else:
-                            self.__cached_surfaces[next_cached_surface_index] = working_surface.copy()
+                            cached_surface = working_surface.copy()
 
-                        next_cached_surface_index += 1
+                            if profiler is not None:
+                                profiler.stats(self).surface_copies += 1
+
+                        """
+                        The cached surface is stored before it is tracked, so that if another thread's cached surfaces
+                        cause it to be evicted straight away (when rendering concurrently), the eviction is not undone
+                        """
+                        cached_surfaces[next_cached_surface_index] = cached_surface
+                        if not Recurface.surface_cache.store(
+                                self, next_cached_surface_index, cached_surface,
+                                rebuild_time=perf_counter() - build_start_time
+                        ):
+                            cached_surfaces[next_cached_surface_index] = None
+
+                elif pipeline_item is PipelineFlag.APPLY_CHILDREN:
+                    # If the previous composite was scrolled, the full area is updated so that no stale child rects are missed
+                    if self.__are_child_rects_stale:
+                        is_fully_updated = True
+                        self.__are_child_rects_stale = False
 
-                elif pipeline_item == PipelineFlag.APPLY_CHILDREN:
                     caching_blockers_len_before = len(stack_data["surface_caching_blockers"])
+                    child_clip_rect = working_surface.get_clip()
+                    child_blit_batch = _BlitBatch()
+                    child_rects = []
+
+                    children = self.child_recurfaces
+                    concurrent_renders = Recurface.__submit_concurrent_renders(
+                        children, working_surface, stack_data, child_clip_rect, child_coords_offset
+                    ) if stack_data["executor"] else None
 
                     # Render all child recurfaces onto the working surface, in the correct order
-                    for child in self.child_recurfaces:
-                        child_rects = child._render(working_surface, stack_data=stack_data, coords_offset=(0, 0))
-
-                        # Child rects are only needed if the full area of this recurface will not be updated
-                        if not is_fully_updated:
-                            for child_rect in child_rects:
-                                # Add the difference in coordinates between the destination and this recurface
-                                child_rect.x += working_render_coords[0]
-                                child_rect.y += working_render_coords[1]
-
-                                # Truncate the dimensions of the rect so that it only covers this object's render area
-                                render_area = working_surface.get_rect().move(*working_render_coords)
-                                clipped_rect = child_rect.clip(render_area)
-                                if clipped_rect:  # If the rect covers no area (either dimension is 0) it will be falsy
-                                    result.append(clipped_rect)
+                    for child in children:
+                        if concurrent_renders and (concurrent_render := concurrent_renders.get(child)):
+                            Recurface.__collect_concurrent_render(
+                                concurrent_render, stack_data, child_blit_batch, child_rects
+                            )
+                        else:
+                            yield child.__render_steps(
+                                working_surface, stack_data, child_clip_rect, child_blit_batch, child_coords_offset,
+                                child_rects
+                            )
+                    if patch_rects is None:
+                        blitted_rects = Recurface.__flush_blit_batch(
+                            working_surface, child_blit_batch, child_rects, profiler
+                        )
+                    else:
+                        blitted_rects = self.__flush_patched_blit_batch(
+                            working_surface, child_blit_batch, child_rects, profiler, patch_rects
+                        )
+
+                    if (plan.scroll_cached_surface_index is not None) and (not visible_area):
+                        self.__record_scroll_positions(working_surface, blitted_rects)
+
+                    # Child rects are only needed if the full area of this recurface will not be updated
+                    if not is_fully_updated:
+                        render_area = working_surface.get_rect().move(*working_render_coords)
+
+                        for child_rect in child_rects:
+                            # Add the difference in coordinates between the destination and this recurface
+                            child_rect.x += working_render_coords[0]
+                            child_rect.y += working_render_coords[1]
+
+                            # Truncate the dimensions of the rect so that it only covers this object's render area
+                            clipped_rect = child_rect.clip(render_area)
+                            if clipped_rect:  # If the rect covers no area (either dimension is 0) it will be falsy
+                                result.append(clipped_rect)
 
                     caching_blockers_len_after = len(stack_data["surface_caching_blockers"])
                     # If at least 1 child recurface is a blocker, or has blockers in its own children, etc.
@@ -668,36 +1432,360 @@ class Recurface:
                         self.__has_rect_changed = True
                         stack_data["surface_caching_blockers"].add(self)
 
-                    working_surface = pipeline_item.filter(working_surface)
+                    if profiler is None:
+                        working_surface = pipeline_item.filter(working_surface)
+                    else:
+                        filter_start_time = perf_counter()
+                        working_surface = pipeline_item.filter(working_surface)
+                        profiler.stats(self).filter_time += perf_counter() - filter_start_time
 
-                pipeline_index += 1
+                    if is_filter_output_shared and (pipeline_index == plan.shared_filters_end_index):
+                        filter_cache.store(
+                            self.surface, plan.shared_filters,
+                            working_surface.copy() if is_shared_filter_output_modified else working_surface
+                        )
 
-            # Apply the surface to its destination
-            self.__rect = destination.blit(
-                working_surface, working_render_coords
-            )
+                pipeline_index += 1
 
-            if is_fully_updated:
-                # A copy of the rect is returned to prevent external modification
-                result.append(self.__rect.copy())
+            # Queue the surface to be applied to its destination
+            blit_batch.blit_sequence.append((working_surface, working_render_coords))
+            blit_batch.blitters.append((self, is_fully_updated))
 
         else:  # If this recurface has no surface, children are to be rendered directly onto the destination
+            render_coords = self.__render_coords
             new_coords_offset = (
-                coords_offset[0] + self.x_render_coord,
-                coords_offset[1] + self.y_render_coord
+                coords_offset[0] + render_coords[0],
+                coords_offset[1] + render_coords[1]
             )
 
-            # Render all child recurfaces onto the destination, in the correct order
-            for child in self.child_recurfaces:
-                rects = child._render(destination, stack_data=stack_data, coords_offset=new_coords_offset)
-                for rect in rects:
-                    result.append(rect)
+            """
+            Render all child recurfaces onto the destination, in the correct order. Children share this recurface's
+            blit batch, and add their rects directly to its result list, as they are returned unchanged
+            """
+            children = self.child_recurfaces
+            concurrent_renders = Recurface.__submit_concurrent_renders(
+                children, destination, stack_data, clip_rect, new_coords_offset
+            ) if stack_data["executor"] else None
+
+            for child in children:
+                if concurrent_renders and (concurrent_render := concurrent_renders.get(child)):
+                    Recurface.__collect_concurrent_render(concurrent_render, stack_data, blit_batch, result)
+                else:
+                    yield child.__render_steps(destination, stack_data, clip_rect, blit_batch, new_coords_offset, result)
 
         # This attribute is only reset if a fresh render was completed, so it is split from the reset attributes above
         self.__is_reset = False
 
+    def __update_converted_surface(self, destination: Surface, is_static: bool) -> None:
+        """
+        Ensures that the converted stored surface matches the pixel format of the provided destination,
+        regenerating it only if that format (or whether the surface is static) has changed since it was last converted.
+        If the stored surface already matches and does not need RLE acceleration, no converted surface is kept
+        """
+
+        destination_key = (id(destination), is_static)
+        if destination_key == self.__converted_destination_key:
+            return
+        self.__converted_destination_key = destination_key
+
+        key = (destination.get_bitsize(), destination.get_masks(), destination.get_flags() & SRCALPHA, is_static)
+        if key == self.__converted_surface_key:
+            return
+
+        surface = self.__surface
+        if Recurface.__is_format_matching(surface, destination) and not (
+                is_static and Recurface.__is_rle_accelerable(surface)
+        ):
+            self.__converted_surface = None
+        else:
+            self.__converted_surface = Recurface.__convert_surface(surface, destination, is_static)
+
+        self.__converted_surface_key = key
+
+    def __record_scroll_positions(self, working_surface: Surface, blitted_rects: list[Rect]) -> None:
+        """
+        Records the render position of each child recurface as they are applied to the provided working surface,
+        if the resulting cached surface could be scrolled (i.e. if the stored surface is a single colour).
+
+        As scrolling updates the full area of this recurface, it is only worthwhile if the provided rects blitted by
+        the children cover a large part of that area. Otherwise, rebuilding the cached surface only requires the
+        areas around the moved children to be updated
+        """
+
+        if self.__surface_fill_colour is _UNCHECKED:
+            self.__surface_fill_colour = Recurface.get_fill_colour(self.surface)
+
+        if self.__surface_fill_colour is None:
+            return
+
+        width, height = working_surface.get_size()
+        if sum(rect.width * rect.height for rect in blitted_rects) * 2 < width * height:
+            return
+
+        self.__scroll_positions = {child: child.__render_position for child in self.__child_recurfaces}
+
+    def __get_scroll_offset(self) -> Optional[tuple[int, int]]:
+        """
+        If every child recurface has moved by the same number of pixels since the released scrollable cached surface
+        was generated (and some of its contents would still be visible after scrolling it by that offset),
+        returns that (x, y) offset. Otherwise, returns None
+        """
+
+        scroll_positions = self.__scroll_positions
+        if (scroll_positions is None) or (len(scroll_positions) != len(self.__child_recurfaces)):
+            return None
+
+        result = None
+        for child in self.__child_recurfaces:
+            previous_position = scroll_positions.get(child)
+            position = child.__render_position
+            if (previous_position is None) or (position is None):
+                return None
+
+            previous_coords = self.to_nearest_pixel(*previous_position)
+            coords = self.to_nearest_pixel(*position)
+            offset = (coords[0] - previous_coords[0], coords[1] - previous_coords[1])
+
+            if result is None:
+                result = offset
+            elif offset != result:
+                return None
+
+        if result is None:
+            return None
+
+        width, height = self.__scroll_surface.get_size()
+        if (abs(result[0]) >= width) or (abs(result[1]) >= height):
+            return None
+
         return result
 
+    def __scroll_steps(
+            self, working_surface: Surface, scroll_offset: tuple[int, int], stack_data: dict
+    ) -> Generator[Generator, None, bool]:
+        """
+        Scrolls the contents of the provided working surface by the provided offset, then fills each strip exposed
+        along its edges with the stored surface's colour and re-renders the child recurfaces clipped to that strip.
+        Child render steps are yielded in the same way as .__render_steps().
+        Returns True if any child recurfaces blocked surface caching
+        """
+
+        caching_blockers_len_before = len(stack_data["surface_caching_blockers"])
+        profiler = stack_data["profiler"]
+
+        working_surface.scroll(*scroll_offset)
+
+        x_offset, y_offset = scroll_offset
+        surface_rect = working_surface.get_rect()
+        # The area which still holds valid contents after scrolling
+        retained_rect = surface_rect.move(x_offset, y_offset).clip(surface_rect)
+
+        exposed_rects = []
+        if x_offset:
+            exposed_rects.append(
+                Rect((0 if x_offset > 0 else retained_rect.right), 0, abs(x_offset), surface_rect.height)
+            )
+        if y_offset:
+            exposed_rects.append(
+                Rect(retained_rect.x, (0 if y_offset > 0 else retained_rect.bottom), retained_rect.width, abs(y_offset))
+            )
+
+        for exposed_rect in exposed_rects:
+            working_surface.set_clip(exposed_rect)
+            working_surface.fill(self.__surface_fill_colour)
+
+            """
+            Child rects are not needed, as the full area of this recurface is updated. Any children rendered only to
+            this strip (or culled) may not hold their full rendered rects until the composite is next rebuilt
+            """
+            exposed_blit_batch = _BlitBatch()
+            exposed_child_rects = []
+            for child in self.child_recurfaces:
+                yield child.__render_steps(
+                    working_surface, stack_data, exposed_rect, exposed_blit_batch, (0, 0), exposed_child_rects
+                )
+            Recurface.__flush_blit_batch(working_surface, exposed_blit_batch, exposed_child_rects, profiler)
+
+        working_surface.set_clip(None)
+        self.__are_child_rects_stale = True
+
+        return len(stack_data["surface_caching_blockers"]) != caching_blockers_len_before
+
+    def __is_composite_invalidated(self) -> bool:
+        """
+        Returns True if this recurface will need to re-composite its children onto its surface when it next renders,
+        making it worth rendering concurrently with its siblings
+        """
+
+        if not (self.surface and self.__child_recurfaces and self.do_render and (self.render_position is not None)):
+            return False
+
+        # If a cached surface with the children already applied is available, there is little work left to do
+        return not any(self.__cached_surfaces[self.__pipeline_plan.first_child_cached_surface_index:])
+
+    @staticmethod
+    def __submit_concurrent_renders(
+            children: Iterable["Recurface"], destination: Surface, stack_data: dict, clip_rect: Rect,
+            coords_offset: tuple[int, int]
+    ) -> Optional[dict["Recurface", tuple[Future, dict]]]:
+        """
+        Submits each of the provided sibling recurfaces which must re-composite its children to the executor in the
+        provided stack data, returning the future and stack data of each submitted render mapped to its recurface.
+        If fewer than 2 siblings would be rendered concurrently, nothing is submitted and None is returned instead.
+
+        Each submitted sibling only draws onto its own working surfaces (its blit onto the destination is
+        returned in a separate blit batch), so siblings can be composited at the same time without interfering
+        """
+
+        invalidated_children = [child for child in children if child.__is_composite_invalidated()]
+        if len(invalidated_children) < 2:
+            return None
+
+        executor = stack_data["executor"]
+
+        result = {}
+        for child in invalidated_children:
+            """
+            Each concurrent render tracks its surface caching blockers separately, as other threads would otherwise
+            change the number of blockers while it is comparing them. Concurrent renders do not submit
+            any further renders of their own, so that they never wait on the executor they are running on
+            """
+            child_stack_data = {**stack_data, "surface_caching_blockers": set(), "executor": None}
+            result[child] = (
+                executor.submit(
+                    Recurface.__render_concurrently, child, destination, child_stack_data, clip_rect, coords_offset
+                ),
+                child_stack_data
+            )
+
+        return result
+
+    @staticmethod
+    def __render_concurrently(
+            recurface: "Recurface", destination: Surface, stack_data: dict, clip_rect: Rect,
+            coords_offset: tuple[int, int]
+    ) -> tuple[list[Rect], _BlitBatch]:
+        blit_batch = _BlitBatch()
+        rects = recurface._render(
+            destination, stack_data=stack_data, clip_rect=clip_rect, blit_batch=blit_batch, coords_offset=coords_offset
+        )
+
+        return rects, blit_batch
+
+    @staticmethod
+    def __collect_concurrent_render(
+            concurrent_render: tuple[Future, dict], stack_data: dict, blit_batch: _BlitBatch, result: list[Rect]
+    ) -> None:
+        """
+        Waits for the provided concurrent render to finish, then adds its rects, its queued blit and its surface
+        caching blockers to those of the current render, exactly as if it had been rendered in place
+        """
+
+        future, child_stack_data = concurrent_render
+        rects, child_blit_batch = future.result()
+
+        result += rects
+        blit_batch.blit_sequence += child_blit_batch.blit_sequence
+        blit_batch.blitters += child_blit_batch.blitters
+        stack_data["surface_caching_blockers"] |= child_stack_data["surface_caching_blockers"]
+
+    @staticmethod
+    def __flush_blit_batch(
+            destination: Surface, blit_batch: _BlitBatch, result: list[Rect], profiler: Optional[RenderProfiler]
+    ) -> list[Rect]:
+        """
+        Submits all blits collected in the provided batch onto the destination in a single call, then records the
+        rendered rect of each batched recurface. The rects of recurfaces whose full area was updated are added to
+        the provided result list.
+
+        Returns the rect of every blit made
+        """
+
+        if not blit_batch.blit_sequence:
+            return []
+
+        rects = destination.blits(blit_batch.blit_sequence)
+
+        blitters = zip(blit_batch.blitters, rects, blit_batch.blit_sequence)
+        for (recurface, is_fully_updated), rect, (_, coords) in blitters:
+            recurface.__rect = rect
+            recurface.__rect_origin = coords
+
+            if is_fully_updated:
+                # A copy of the rect is returned to prevent external modification
+                result.append(rect.copy())
+
+            if profiler is not None:
+                stats = profiler.stats(recurface)
+                stats.blits += 1
+                stats.pixels_blitted += rect.width * rect.height
+
+        return rects
+
+    def __flush_patched_blit_batch(
+            self, working_surface: Surface, blit_batch: _BlitBatch, result: list[Rect],
+            profiler: Optional[RenderProfiler], patch_rects: list[Rect]
+    ) -> list[Rect]:
+        """
+        Used in place of .__flush_blit_batch() when the provided working surface is a released composite being patched,
+        rather than a fresh copy of the stored surface. Only the areas which have changed since it was composited
+        (the provided patch rects, the rects reported by the batched recurfaces, and the full rects of those which
+        were fully updated) are restored from the stored surface, and only the blits which overlap those areas are
+        made again, clipped to them. The rendered rect of every batched recurface is still recorded, and the result
+        list is added to, exactly as if every blit had been made in full.
+
+        Returns the rect of every blit, whether or not it was made
+        """
+
+        clip_rect = working_surface.get_clip()
+        blit_sequence = blit_batch.blit_sequence
+        blitters = blit_batch.blitters
+        rects = [Rect(coords, surface.get_size()).clip(clip_rect) for surface, coords in blit_sequence]
+
+        for (recurface, is_fully_updated), rect, (_, coords) in zip(blitters, rects, blit_sequence):
+            recurface.__rect = rect
+            recurface.__rect_origin = coords
+
+            if is_fully_updated:
+                # A copy of the rect is returned to prevent external modification
+                result.append(rect.copy())
+
+        """
+        If most of the composite has changed, or it has changed in so many separate areas that patching each of them
+        would cost more, it is restored and re-composited in full instead
+        """
+        dirty_rects = [*patch_rects, *result]
+        patch_cost = sum(rect.width * rect.height for rect in dirty_rects) * 2 + len(dirty_rects) * _PATCH_AREA_COST
+        if patch_cost >= clip_rect.width * clip_rect.height:
+            dirty_rects = [clip_rect]
+
+        source = self.__surface if self.__converted_surface is None else self.__converted_surface
+        for dirty_rect in dirty_rects:
+            dirty_rect = dirty_rect.clip(clip_rect)
+            if not dirty_rect:
+                continue
+
+            working_surface.set_clip(dirty_rect)
+            working_surface.blit(source, dirty_rect, area=dirty_rect)
+
+            overlapping_indexes = dirty_rect.collidelistall(rects)
+            working_surface.blits([blit_sequence[index] for index in overlapping_indexes], doreturn=False)
+
+            if profiler is not None:
+                stats = profiler.stats(self)
+                stats.blits += 1
+                stats.pixels_blitted += dirty_rect.width * dirty_rect.height
+
+                for index in overlapping_indexes:
+                    stats = profiler.stats(blitters[index][0])
+                    overlap_rect = rects[index].clip(dirty_rect)
+                    stats.blits += 1
+                    stats.pixels_blitted += overlap_rect.width * overlap_rect.height
+
+        working_surface.set_clip(clip_rect)
+
+        return rects
+
     def _flag_rects(self) -> None:
         """
         This method manually flags the area covered by this recurface and its children to be updated on the next render
@@ -705,72 +1793,270 @@ class Recurface:
 
         if self.is_surface_rendered:
             self.__has_rect_changed = True
-        else:
+        elif not self.__is_reset:  # If this recurface has been reset, no descendants have rendered since then
+            if self.__surface is not None:
+                # The areas of the composite which the children were rendered onto are no longer tracked
+                self.__are_child_rects_stale = True
             for child in self.child_recurfaces:
                 self._frontload_update_rects(child._reset_rects())
 
-    def _flag_cached_surfaces(self, do_clear_self: bool) -> None:
+    def __clear_absolute_coords(self) -> None:
+        """
+        Clears the cached absolute render coords and absolute rects of this recurface and its descendants.
+        The coords of a recurface are only ever cached after those of its parent, so any descendants of a recurface
+        whose coords are not cached have nothing cached either, and are skipped
+        """
+
+        # Descendants are cleared using an explicit stack, so that there is no limit on the depth of the chain
+        pending_recurfaces = [self]
+        while pending_recurfaces:
+            current_obj = pending_recurfaces.pop()
+            if current_obj.__absolute_render_coords is _UNCHECKED:
+                continue
+
+            current_obj.__absolute_render_coords = _UNCHECKED
+            current_obj.__absolute_rect = _UNCHECKED
+            pending_recurfaces.extend(current_obj.__child_recurfaces)
+
+    def _flag_spatial_indexes(self, cause: str) -> None:
+        """
+        Records a change to this recurface in every attached spatial index (see SpatialIndex).
+        The cause is the name of the property or method through which this recurface was changed
+        """
+
+        for spatial_index in SpatialIndex.attached:
+            spatial_index._flag(self, cause)
+
+    def _flag_cached_surfaces(self, do_clear_self: bool, origin: "Recurface", cause: str) -> None:
         """
         This method handles the clearing of cached surfaces which have been invalidated due to changes to the state of
-        this recurface or one of its descendants
+        this recurface or one of its descendants.
+        The origin is the recurface which was changed, and the cause is the name of the property or method through
+        which it was changed (these are only used for profiling).
+
+        If a .batch() context is currently open, the invalidation is only recorded, to be carried out when it closes
+        """
+
+        if Recurface.__batch_depth:
+            batched_invalidations = Recurface.__batched_invalidations
+            if (batched_invalidation := batched_invalidations.get(self)) is None:
+                batched_invalidations[self] = (do_clear_self, origin, cause)
+            elif do_clear_self and not batched_invalidation[0]:
+                batched_invalidations[self] = (True, origin, cause)
+            elif (batched_invalidation[2] == "render_position") and (cause != "render_position"):
+                # Any other change prevents the cached surface from being scrolled, so must not be hidden by a move
+                batched_invalidations[self] = (batched_invalidation[0], origin, cause)
+            return
+
+        self._propagate_cached_surfaces_flag(do_clear_self, visited=None, origin=origin, cause=cause)
+
+    def _propagate_cached_surfaces_flag(
+            self, do_clear_self: bool, visited: Optional[set["Recurface"]], origin: "Recurface", cause: str
+    ) -> None:
+        """
+        Clears the invalidated cached surfaces of this recurface, and then of each recurface up its ancestry for as long
+        as the change may affect what that recurface renders.
+
+        If a set of visited recurfaces is provided, propagation stops at the first recurface which is already present
+        in it; flagging the same recurface again would have no further effect until the next render.
+        Propagation also stops at the first ancestor which has already been flagged since the last render began
+        (see Recurface.__invalidation_epoch). This recurface itself is always flagged, as the change may have
+        affected whether it can render. Whether each recurface could render is only recorded when it is rendered,
+        so stopping early leaves nothing unrecorded; any later change to whether an ancestor can render is
+        propagated from that ancestor (or its parent) itself
+        """
+
+        profiler = RenderProfiler.active
+        epoch = Recurface.__invalidation_epoch
+
+        """
+        A render position change is always flagged on the parent of the moved recurface. Only that parent's contents
+        may have moved without otherwise changing, so only it can keep its released cached surface to scroll
+        """
+        is_child_moved = (cause == "render_position")
+
+        current_obj = self
+        while current_obj:
+            if visited is not None:
+                if current_obj in visited:
+                    if not is_child_moved:
+                        # Any surface kept for scrolling when this recurface was first visited is no longer valid
+                        current_obj.__scroll_surface = None
+                    return
+                visited.add(current_obj)
+
+            if current_obj.__invalidated_epoch == epoch:
+                if current_obj is not self:
+                    # Any surface kept for scrolling when this recurface was first flagged is no longer valid
+                    current_obj.__scroll_surface = None
+                    return
+            else:
+                current_obj.__invalidated_epoch = epoch
+
+            is_cleared = current_obj.__clear_cached_surfaces(do_clear_self, is_child_moved)
+            if is_cleared and (profiler is not None):
+                profiler.record_invalidation(current_obj, origin, cause)
+            is_child_moved = False
+
+            """
+            If this recurface could not render anything when last rendered and still cannot, the change has not
+            affected anything above it. As the value from the last render is only updated when rendering, this
+            decision is the same whatever order changes are flagged in (and whether or not they are batched)
+            """
+            if not (current_obj._can_render or current_obj.__can_render_previous):
+                return
+
+            current_obj = current_obj.parent_recurface
+            do_clear_self = False
+
+    def __clear_cached_surfaces(self, do_clear_self: bool, is_child_moved: bool = False) -> bool:
+        """
+        Returns True if any previously cached surfaces were cleared.
+        If only the child recurfaces have changed, the scrollable cached surface is kept to be patched,
+        and if the only change is that a child recurface has moved, it is also kept for scrolling
         """
 
         if do_clear_self:  # Reset all cached surfaces
-            self.__cached_surfaces = [None] * len(self.__cached_surfaces)
-        else:  # Only reset cached surfaces which have child recurfaces applied to them (assumes a child has changed)
-            cached_surface_index = -1
-            # Reset cached surfaces starting from the end, so that less total iterations are necessary
-            for item in reversed(self.__render_pipeline):
-                if item == PipelineFlag.APPLY_CHILDREN:
-                    break
-                elif PipelineFlag.CACHE_SURFACE:
-                    self.__cached_surfaces[cached_surface_index] = None
-                    cached_surface_index -= 1
+            return self.__release_cached_surfaces()
+
+        plan = self.__pipeline_plan
+        patch_surface = None
+        if plan.scroll_cached_surface_index is not None:
+            patch_surface = self.__patch_surface or self.__cached_surfaces[plan.scroll_cached_surface_index]
+
+        scroll_surface = None
+        scroll_positions = self.__scroll_positions
+        if is_child_moved and (scroll_positions is not None):
+            scroll_surface = self.__scroll_surface or self.__cached_surfaces[plan.scroll_cached_surface_index]
+
+        # Only reset cached surfaces which have child recurfaces applied to them (assumes a child has changed)
+        result = self.__release_cached_surfaces(start_index=plan.first_child_cached_surface_index)
+        self.__patch_surface = patch_surface
+
+        if scroll_surface is not None:
+            self.__scroll_surface = scroll_surface
+            self.__scroll_positions = scroll_positions
+
+        return result
 
-        # Getting the previous value and a new one for can_render
-        can_render_previous = self.__can_render_previous
-        can_render = self._can_render
-        # Storing the updated value
-        self.__can_render_previous = can_render
+    def __release_cached_surfaces(self, start_index: int = 0) -> bool:
+        """
+        Clears every cached surface from the provided index onwards, and stops tracking them in the surface cache.
+        Returns True if any previously cached surfaces were cleared
+        """
+
+        result = False
+
+        self.__scroll_surface = None
+        self.__scroll_positions = None
+        self.__patch_surface = None
+
+        cached_surfaces = self.__cached_surfaces
+        for cached_surface_index in range(start_index, len(cached_surfaces)):
+            if cached_surfaces[cached_surface_index] is not None:
+                cached_surfaces[cached_surface_index] = None
+                Recurface.surface_cache.discard(self, cached_surface_index)
+                result = True
+
+        return result
 
-        if not (parent := self.parent_recurface):
+    def _evict_cached_surface(self, index: int) -> None:
+        """
+        Called by the surface cache to drop a cached surface in order to free up memory.
+        The surface will be rebuilt as normal the next time this recurface renders
+        """
+
+        self.__cached_surfaces[index] = None
+
+        if (profiler := RenderProfiler.active) is not None:
+            profiler.record_invalidation(self, self, "surface_cache")
+
+    @classmethod
+    @contextmanager
+    def batch(cls) -> Iterator[None]:
+        """
+        Opens a context within which any changes to recurfaces only record which cached surfaces they invalidate.
+        When the outermost open context closes, the recorded invalidations are deduplicated and carried out,
+        so that each recurface's ancestry only needs to be walked once no matter how many changes were made to it.
+
+        This has no effect on the rects returned by the next render, and can be used when making many changes
+        to recurfaces at once (such as moving a large number of sibling recurfaces). If a recurface is rendered while
+        the context is open, all invalidations recorded up to that point are carried out first
+        """
+
+        Recurface.__batch_depth += 1
+        try:
+            yield
+        finally:
+            Recurface.__batch_depth -= 1
+            if not Recurface.__batch_depth:
+                Recurface._flush_batched_invalidations()
+
+    @staticmethod
+    def _flush_batched_invalidations() -> None:
+        """
+        Carries out all cache invalidations recorded within .batch() contexts so far
+        """
+
+        batched_invalidations = Recurface.__batched_invalidations
+        if not batched_invalidations:
             return
 
-        if can_render or (can_render != can_render_previous):
-            return parent._flag_cached_surfaces(do_clear_self=False)
+        Recurface.__batched_invalidations = {}
+
+        profiler = RenderProfiler.active
+
+        # Full resets are carried out first, as propagation below skips any recurface which has already been visited
+        for recurface, (do_clear_self, origin, cause) in batched_invalidations.items():
+            if do_clear_self:
+                is_cleared = recurface.__clear_cached_surfaces(do_clear_self=True)
+                if is_cleared and (profiler is not None):
+                    profiler.record_invalidation(recurface, origin, cause)
+
+        visited = set()
+        for recurface, (do_clear_self, origin, cause) in batched_invalidations.items():
+            recurface._propagate_cached_surfaces_flag(do_clear_self=False, visited=visited, origin=origin, cause=cause)
 
     def _reset_rects(self) -> list[Rect]:
         """
         Sets the variables which hold this object's rendering details back to their default values, and returns
-        a pygame Rect representing the last on-screen render location (if any). Recursively resets child
-        recurfaces, and (if necessary) returns rects for their render locations too
+        a pygame Rect representing the last on-screen render location (if any). Also resets descendant recurfaces
+        where necessary, and returns rects for their render locations too
         """
 
-        # If this recurface has already been reset once since the last render, no further work needs doing
-        if self.__is_reset:
-            return []
-
         result = []
 
-        if self.is_surface_rendered:
-            """
-            If this recurface's surface is rendered when it is reset, its child recurfaces do not also need resetting,
-            as their surface area is fully contained and therefore represented by it.
+        # Descendants are reset using an explicit stack, so that there is no limit on the depth of the chain
+        pending_recurfaces = [self]
+        while pending_recurfaces:
+            current_obj = pending_recurfaces.pop()
 
-            If subsequent changes are made before the next render which would alter this relationship with the
-            child recurfaces, those changes are handled such that the child recurfaces get reset at that time
-            """
-            result.append(self.__rect)
-        else:
-            for child in self.child_recurfaces:
-                child_rects = child._reset_rects()
-                result += child_rects
+            # If this recurface has already been reset once since the last render, no further work needs doing
+            if current_obj.__is_reset:
+                continue
 
-        self.__rect = None
-        self.__has_rect_changed = False
-        self.__changed_sub_rects = []
+            if current_obj.is_surface_rendered:
+                """
+                If this recurface's surface is rendered when it is reset, its child recurfaces do not also need
+                resetting, as their surface area is fully contained and therefore represented by it.
 
-        self.__is_reset = True
+                If subsequent changes are made before the next render which would alter this relationship with the
+                child recurfaces, those changes are handled such that the child recurfaces get reset at that time
+                """
+                result.append(current_obj.__rect)
+            else:
+                if current_obj.__surface is not None:
+                    # The areas of the composite which the children were rendered onto are no longer tracked
+                    current_obj.__are_child_rects_stale = True
+                # The order in which child recurfaces are reset does not matter, so they do not need to be sorted
+                pending_recurfaces.extend(current_obj.__child_recurfaces)
+
+            current_obj.__rect = None
+            current_obj.__has_rect_changed = False
+            current_obj.__changed_sub_rects = ()
+            current_obj.__has_hidden_changes = False
+
+            current_obj.__is_reset = True
 
         return result
 
@@ -787,22 +2073,35 @@ class Recurface:
         if not rects:  # If there are no rects, nothing needs doing
             return
 
-        if self.parent_recurface and (not self.is_surface_rendered):
-            return self.parent_recurface._frontload_update_rects(rects)
+        current_obj = self
+        while (not current_obj.is_surface_rendered) and (parent := current_obj.parent_recurface):
+            current_obj = parent
+
+        if current_obj.is_surface_rendered:
+            target_rect = current_obj.__rect
+            target_origin = current_obj.__rect_origin
 
-        if self.is_surface_rendered:
             for rect in rects:
-                # Add the difference in coordinates between the last render destination and this recurface
-                rect.x += self.__rect.x
-                rect.y += self.__rect.y
+                """
+                Add the difference in coordinates between the last render destination and this recurface. The unclipped
+                origin is used, as the render location is clipped if it fell partly outside of its destination
+                """
+                rect.x += target_origin[0]
+                rect.y += target_origin[1]
 
                 # Truncate the dimensions of the rect so that it only covers this object's render area
-                clipped_rect = rect.clip(self.__rect)
+                clipped_rect = rect.clip(target_rect)
+                if clipped_rect != rect:
+                    # The truncated area is not visible, but has still changed in this recurface's composite
+                    current_obj.__has_hidden_changes = True
                 if clipped_rect:  # If the rect covers no area (either dimension is 0) it will be falsy
-                    self.__changed_sub_rects.append(clipped_rect)
+                    if current_obj.__changed_sub_rects:
+                        current_obj.__changed_sub_rects.append(clipped_rect)
+                    else:
+                        current_obj.__changed_sub_rects = [clipped_rect]
         else:  # The top-level recurface is not rendered, meaning that these rects are for the destination
             # As this object is not part of the current render hierarchy, its offset need not be applied to the rects
-            self.__top_level_changed_rects += list(rects)
+            current_obj.__top_level_changed_rects = [*current_obj.__top_level_changed_rects, *rects]
 
     def _add_top_level_update_rects(self, rects: Iterable[Rect]) -> None:
         """
@@ -816,50 +2115,152 @@ class Recurface:
         if not rects:  # If there are no rects, nothing needs doing
             return
 
-        if self.parent_recurface:
-            return self.parent_recurface._add_top_level_update_rects(rects)
+        current_obj = self
+        while parent := current_obj.parent_recurface:
+            current_obj = parent
 
-        self.__top_level_changed_rects += list(rects)
+        current_obj.__top_level_changed_rects = [*current_obj.__top_level_changed_rects, *rects]
 
     def _organise_child_recurfaces(self) -> None:
-        self.__frozen_child_recurfaces = frozenset(self.__child_recurfaces)
+        """
+        Fully re-sorts the child recurfaces by render priority. This is deferred until the child recurfaces are next
+        accessed after their order has been flagged as stale, so that any number of changes to the children
+        only require a single re-sort
+        """
 
         try:
-            self.__ordered_child_recurfaces = tuple(
-                sorted(self.__child_recurfaces, key=lambda recurface: recurface.render_priority)
-            )
-        except TypeError as ex:  # Unable to sort recurfaces due to non-comparable priority values
-            self.__ordered_child_recurfaces = ex
+            self.__sorted_child_recurfaces = sorted(self.__child_recurfaces, key=self.__get_render_priority) or ()
+            self.__are_child_recurfaces_ordered = True
+        except TypeError:  # Unable to sort recurfaces due to non-comparable priority values
+            self.__sorted_child_recurfaces = ()
+            self.__are_child_recurfaces_ordered = False
+
+        self.__ordered_child_recurfaces = None
+        self.__is_child_order_stale = False
+
+        were_ordered = self.__were_child_recurfaces_ordered
+        self.__were_child_recurfaces_ordered = None
+        # If a change in render priority has changed the ordering of all children, they must all be updated
+        if (were_ordered is not None) and (were_ordered != self.__are_child_recurfaces_ordered):
+            for child in self.__child_recurfaces:
+                child._flag_rects()
+
+    def _flag_child_order(self) -> None:
+        """
+        Should be invoked just before the render priority of one of this recurface's children is changed.
+        Flags the order of the child recurfaces to be re-sorted when they are next accessed
+        """
+
+        if self.__were_child_recurfaces_ordered is None:
+            self.__were_child_recurfaces_ordered = self.are_child_recurfaces_ordered
+
+        self.__is_child_order_stale = True
 
     @staticmethod
-    def trimmed_rects(rects: Iterable[Rect]) -> list[Rect]:
+    def __get_render_priority(recurface: "Recurface") -> Any:
+        return recurface.render_priority
+
+    @staticmethod
+    def get_fill_colour(surface: Surface) -> Optional[int]:
+        """
+        If every pixel in the provided surface (including its alpha value, if it has per-pixel alpha)
+        is the same colour, returns that colour mapped to the surface's pixel format. Otherwise, returns None
         """
-        Optimisation method, applied just before rects are returned from the top-level recurface's .render() method.
 
-        Returns a new list containing only those rects whose bounds are not entirely contained within the bounds of
-        another rect present in the list
-        (this includes removing additional identical copies of rects)
+        width, height = surface.get_size()
+        if not (width and height):
+            return None
+
+        colour = surface.get_at((0, 0))
+        if transform.threshold(None, surface, colour, (0, 0, 0, 0), set_behavior=0) != width * height:
+            return None
+
+        if surface.get_flags() & SRCALPHA:
+            # Masks generated from surfaces with per-pixel alpha only include pixels with a higher alpha than the threshold
+            if mask.from_surface(surface, colour.a).count():
+                return None
+            if colour.a and (mask.from_surface(surface, colour.a - 1).count() != width * height):
+                return None
+
+        return surface.get_at_mapped((0, 0))
+
+    @staticmethod
+    def __is_format_matching(surface: Surface, destination: Surface) -> bool:
+        """
+        Returns True if the provided surface is already in the pixel format it would be converted to
+        for the provided destination (see .__convert_surface())
         """
 
-        result = []
+        if surface.get_flags() & SRCALPHA:
+            return (surface.get_bitsize() == 32) and (surface.get_masks()[:3] == destination.get_masks()[:3])
 
-        # A rect can only be a direct subset of another rect if its surface area is equal or smaller
-        rects_by_surface_area = sorted(rects, key=lambda rect: -(rect.width * rect.height))
+        # Opaque surfaces are not converted for destinations with per-pixel alpha, as this would add alpha to them
+        if destination.get_flags() & SRCALPHA:
+            return True
 
-        for rect_index, rect_to_check in enumerate(rects_by_surface_area):
-            do_include = True
-            for bigger_rect_index in range(0, rect_index):
-                bigger_rect = rects_by_surface_area[bigger_rect_index]
+        return (surface.get_bitsize() == destination.get_bitsize()) and (surface.get_masks() == destination.get_masks())
 
-                if bigger_rect.contains(rect_to_check):
-                    do_include = False
-                    break
+    @staticmethod
+    def __is_opaque(surface: Surface) -> bool:
+        """
+        Returns True if blitting the provided surface overwrites its destination area exactly
+        (i.e. it has no per-pixel alpha, surface alpha or colorkey)
+        """
+
+        return (
+            (not surface.get_flags() & SRCALPHA) and (surface.get_alpha() is None) and (surface.get_colorkey() is None)
+        )
+
+    @staticmethod
+    def __is_rle_accelerable(surface: Surface) -> bool:
+        return bool(surface.get_flags() & SRCALPHA) or (surface.get_colorkey() is not None)
+
+    @staticmethod
+    def __convert_surface(surface: Surface, destination: Surface, is_static: bool) -> Surface:
+        """
+        Returns a copy of the provided surface converted to the pixel format of the provided destination,
+        keeping per-pixel alpha if the surface uses it. If the surface is static (it will only be blitted from,
+        not modified or read) and uses a colorkey or per-pixel alpha, RLE acceleration is enabled on the copy
+        """
 
-            if do_include:
-                result.append(rect_to_check)
+        if surface.get_flags() & SRCALPHA:
+            result = surface.convert_alpha(destination)
+            if is_static:
+                result.set_alpha(result.get_alpha(), RLEACCEL)
+        elif destination.get_flags() & SRCALPHA:
+            # Opaque surfaces are not converted for destinations with per-pixel alpha, as this would add alpha to them
+            result = surface.copy()
+            if is_static and ((colorkey := result.get_colorkey()) is not None):
+                result.set_colorkey(colorkey, RLEACCEL)
+        elif ((colorkey := surface.get_colorkey()) is not None) and (surface.get_alpha() is None):
+            """
+            Converting a colorkeyed surface directly can map its transparent pixels to a different value than the
+            colorkey itself (for example, when expanding 16-bit pixels), so it is instead blitted onto a surface
+            of the destination's format which has been filled with the colorkey
+            """
+            result = Surface(surface.get_size(), 0, destination)
+            result.fill(colorkey)
+            result.blit(surface, (0, 0))
+            result.set_colorkey(colorkey, RLEACCEL if is_static else 0)
+        else:
+            result = surface.convert(destination)
+            if is_static and ((colorkey := result.get_colorkey()) is not None):
+                result.set_colorkey(colorkey, RLEACCEL)
 
         return result
 
+    @staticmethod
+    def trimmed_rects(rects: Iterable[Rect]) -> list[Rect]:
+        """
+        Returns a new list containing only those rects whose bounds are not entirely contained within the bounds of
+        another rect present in the list
+        (this includes removing additional identical copies of rects).
+
+        The top-level recurface's .render() method applies the more thorough optimisations of .rect_merger instead
+        """
+
+        return RectMerger.remove_contained(rects)
+
     @staticmethod
     def to_nearest_pixel(*coords: float) -> Union[None, int, tuple[int, ...]]:
         """
@@ -0,0 +1,154 @@
+from pygame import Surface
+
+from typing import Optional, Any, Iterable, Sequence, Union, Iterator
+
+from .recurface import Recurface
+from .renderpipeline import PipelineFlag, PipelineFilter
+from .positionarrays import PositionArrays
+
+
+class RecurfaceGroup:
+    """
+    Creates and manages a large number of child recurfaces under a single parent recurface, such as the tiles of a map
+    or the particles in a burst, using bulk operations in place of handling each recurface individually.
+
+    The surfaces, positions and priorities of the recurfaces in a group are provided as parallel sequences
+    (one item per recurface), and can be read and updated in the same form. A single surface can instead be provided
+    to be shared by every recurface in the group, and priorities can be omitted entirely.
+
+    A group does not store these values itself: each is held by the recurface it belongs to, and reading one of the
+    properties below gathers it from every recurface in the group. The recurfaces in the group are regular recurfaces,
+    which are rendered as usual and can also be modified individually
+    """
+
+    def __init__(
+            self, parent: Recurface,
+            surfaces: Union[Optional[Surface], Sequence[Optional[Surface]]],
+            positions: Sequence[Optional[tuple[float, float]]],
+            priorities: Optional[Sequence[Any]] = None,
+            do_render: bool = True,
+            render_pipeline: Iterable[Union[PipelineFlag, PipelineFilter]] = (
+                    PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE
+            ),
+            recurface_class: type[Recurface] = Recurface
+    ):
+        count = len(positions)
+        surfaces = self.__to_sequence(surfaces, count, "surfaces", is_single=self.__is_single_surface(surfaces))
+        priorities = self.__to_sequence(priorities, count, "priorities", is_single=(priorities is None))
+        render_pipeline = tuple(render_pipeline)
+
+        self.__parent = parent
+        self.__recurfaces: tuple[Recurface, ...] = tuple(
+            recurface_class(
+                surface=surface, position=position, priority=priority, do_render=do_render,
+                render_pipeline=render_pipeline
+            )
+            for surface, position, priority in zip(surfaces, positions, priorities)
+        )
+
+        parent.add_child_recurfaces(self.__recurfaces)
+
+    @property
+    def parent(self) -> Recurface:
+        return self.__parent
+
+    @property
+    def recurfaces(self) -> tuple[Recurface, ...]:
+        return self.__recurfaces
+
+    def __len__(self) -> int:
+        return len(self.__recurfaces)
+
+    def __iter__(self) -> Iterator[Recurface]:
+        return iter(self.__recurfaces)
+
+    def __getitem__(self, index: int) -> Recurface:
+        return self.__recurfaces[index]
+
+    @property
+    def surfaces(self) -> list[Optional[Surface]]:
+        return [recurface.surface for recurface in self.__recurfaces]
+
+    @surfaces.setter
+    def surfaces(self, value: Union[Optional[Surface], Sequence[Optional[Surface]]]):
+        value = self.__to_sequence(value, len(self), "surfaces", is_single=self.__is_single_surface(value))
+
+        with Recurface.batch():
+            for recurface, surface in zip(self.__recurfaces, value):
+                recurface.surface = surface
+
+    @property
+    def positions(self) -> list[Optional[tuple[float, float]]]:
+        return [recurface.render_position for recurface in self.__recurfaces]
+
+    @positions.setter
+    def positions(self, value: Sequence[Optional[tuple[float, float]]]):
+        value = self.__to_sequence(value, len(self), "positions", is_single=False)
+
+        with Recurface.batch():
+            for recurface, position in zip(self.__recurfaces, value):
+                recurface.render_position = position
+
+    @property
+    def positions_array(self) -> Any:
+        """
+        The positions of the recurfaces in this group as a NumPy array of shape (n, 2) (requires NumPy).
+        Setting this property only flags those recurfaces whose rounded render coords have changed (see PositionArrays)
+        """
+
+        return PositionArrays.get(self.__recurfaces)
+
+    @positions_array.setter
+    def positions_array(self, value: Any):
+        PositionArrays.set(self.__recurfaces, value)
+
+    def move_positions_array(self, offsets: Any) -> None:
+        """
+        Adds the provided NumPy array of offsets (either one (x, y) row per recurface, or a single (x, y) offset)
+        to the positions of the recurfaces in this group (requires NumPy)
+        """
+
+        PositionArrays.move(self.__recurfaces, offsets)
+
+    @property
+    def priorities(self) -> list[Any]:
+        return [recurface.render_priority for recurface in self.__recurfaces]
+
+    @priorities.setter
+    def priorities(self, value: Sequence[Any]):
+        value = self.__to_sequence(value, len(self), "priorities", is_single=False)
+
+        with Recurface.batch():
+            for recurface, priority in zip(self.__recurfaces, value):
+                recurface.render_priority = priority
+
+    def move_render_positions(self, x_offset: float = 0, y_offset: float = 0) -> None:
+        """
+        Adds the provided offset values to the current position of every recurface in the group which has a position
+        """
+
+        with Recurface.batch():
+            for recurface in self.__recurfaces:
+                if recurface.render_position is not None:
+                    recurface.move_render_position(x_offset, y_offset)
+
+    def remove(self) -> None:
+        """
+        Removes every recurface in the group from the group's parent recurface in a single operation
+        """
+
+        self.__parent.remove_child_recurfaces(self.__recurfaces)
+
+    @staticmethod
+    def __is_single_surface(value: Any) -> bool:
+        return (value is None) or isinstance(value, Surface)
+
+    @staticmethod
+    def __to_sequence(value: Any, count: int, name: str, is_single: bool) -> Sequence:
+        if is_single:
+            return [value] * count
+
+        if len(value) != count:
+            raise ValueError(f"{name} must contain exactly 1 item per recurface (expected {count}, received {len(value)})")
+
+        return value
@@ -1,6 +1,6 @@
 from pygame import Surface
 
-from typing import Callable
+from typing import Callable, Iterable, Union, Optional, NamedTuple
 from enum import Enum
 
 
@@ -13,16 +13,25 @@ class PipelineFilter:
     def __init__(
             self,
             filter_func: Callable[[Surface], Surface],
-            is_deterministic: bool
+            is_deterministic: bool,
+            is_in_place: bool = True,
+            is_size_preserving: bool = False
     ):
         self.__filter = filter_func
         self.__is_deterministic = is_deterministic
+        self.__is_in_place = is_in_place
+        self.__is_size_preserving = is_size_preserving
 
     def __eq__(self, other):
         if type(other) is not type(self):
             return NotImplemented
 
-        return (self.filter is other.filter) and (self.is_deterministic == other.is_deterministic)
+        return (
+            (self.filter is other.filter)
+            and (self.is_deterministic == other.is_deterministic)
+            and (self.is_in_place == other.is_in_place)
+            and (self.is_size_preserving == other.is_size_preserving)
+        )
 
     @property
     def is_deterministic(self) -> bool:
@@ -38,6 +47,32 @@ class PipelineFilter:
 
         return self.__is_deterministic
 
+    @property
+    def is_in_place(self) -> bool:
+        """
+        This attribute should be set to a value which indicates whether the stored filter function may modify
+        the surface it receives in place.
+        If set to False, the filter function must never modify its input, and must always return a different surface
+        (such as one returned by pygame.transform.scale()).
+
+        Filters which do not modify their input in place allow the stored surface to be passed to them directly,
+        rather than a copy of it
+        """
+
+        return self.__is_in_place
+
+    @property
+    def is_size_preserving(self) -> bool:
+        """
+        This attribute should be set to a value which indicates whether the stored filter function always returns
+        a surface with the same dimensions as the surface it receives (such as a tint or a colour fill).
+
+        Recurfaces whose pipelines contain only size-preserving filters can be culled when they are entirely outside
+        the area being rendered to, without running their pipeline first
+        """
+
+        return self.__is_size_preserving
+
     @property
     def filter(self) -> Callable[[Surface], Surface]:
         """
@@ -45,3 +80,163 @@ class PipelineFilter:
         corresponding surface modified as desired
         """
         return self.__filter
+
+
+class PipelinePlan(NamedTuple):
+    """
+    An immutable, precompiled description of a render pipeline.
+    Recurfaces compile their pipeline into a plan whenever it is set, so that rendering and cache invalidation
+    can look up everything they need about the pipeline directly rather than searching through its items
+    """
+
+    # The items of the pipeline. Any items equal to a pipeline flag are stored as that flag, so can be compared by identity
+    items: tuple[Union[PipelineFlag, PipelineFilter], ...]
+    # The pipeline index of each CACHE_SURFACE flag, in the order of the cached surfaces they produce
+    cache_pipeline_indexes: tuple[int, ...]
+    # The cached surface index produced by the item at each pipeline index (None for items which are not cache flags)
+    cached_surface_indexes: tuple[Optional[int], ...]
+    apply_children_index: int
+    # The index of the first cached surface which has child recurfaces applied to it
+    first_child_cached_surface_index: int
+    """
+    The index of the first cached surface which has child recurfaces applied to it, if no filters are applied before it
+    (meaning it holds only the stored surface with the children applied). Otherwise, None.
+    The contents of this cached surface can be scrolled when all child recurfaces move together
+    """
+    scroll_cached_surface_index: Optional[int]
+    """
+    The deterministic filters applied before any non-deterministic filters, and before the children are applied.
+    Their combined output depends only on the stored surface, so can be shared between recurfaces
+    """
+    shared_filters: tuple[PipelineFilter, ...]
+    # The pipeline index of the last shared filter, if there are any shared filters
+    shared_filters_end_index: Optional[int]
+    # Whether any filters are applied after the shared filters
+    has_unshared_filters: bool
+    """
+    If the working surface is never modified in place before a filter replaces it with a new surface (disregarding
+    APPLY_CHILDREN), the pipeline index of that filter (or the number of items, if it is never replaced).
+    Until this point, the stored surface can be used as the working surface directly rather than being copied,
+    as long as no children are applied to it. Otherwise, None
+    """
+    borrow_end_index: Optional[int]
+    # Whether any filters in the pipeline are non-deterministic
+    is_deterministic: bool
+    # Whether the pipeline leaves the working surface's dimensions unchanged (all its filters are size-preserving)
+    is_size_fixed: bool
+    """
+    The pipeline index of the final item. Since no further changes are made to the working surface after this item,
+    a surface cached at this index does not need to be copied when it is stored or retrieved
+    """
+    last_index: int
+
+    @classmethod
+    def compile(cls, items: Iterable[Union[PipelineFlag, PipelineFilter]]) -> "PipelinePlan":
+        """
+        Validates the provided pipeline items and compiles them into a plan.
+        Plans for pipelines containing only flags are shared, as most recurfaces use one of only a few such pipelines
+        """
+
+        items = tuple(items)
+        try:
+            return _shared_plans[items]
+        except KeyError:
+            is_shareable = True
+        except TypeError:  # Filters cannot be hashed
+            is_shareable = False
+
+        new_items = []
+        cache_pipeline_indexes = []
+        cached_surface_indexes = []
+        apply_children_index = None
+        apply_children_flags = 0
+        is_deterministic = True
+        is_size_fixed = True
+
+        for item_index, item in enumerate(items):
+            cached_surface_index = None
+
+            if item == PipelineFlag.CACHE_SURFACE:
+                if not is_deterministic:
+                    raise ValueError("cannot cache surface after a non-deterministic filter")
+
+                item = PipelineFlag.CACHE_SURFACE
+                cached_surface_index = len(cache_pipeline_indexes)
+                cache_pipeline_indexes.append(item_index)
+            elif item == PipelineFlag.APPLY_CHILDREN:
+                item = PipelineFlag.APPLY_CHILDREN
+                apply_children_index = item_index
+                apply_children_flags += 1
+            elif type(item) is PipelineFilter:
+                # Other filters are free to return a surface of any size, so culling cannot assume fixed dimensions
+                if not item.is_size_preserving:
+                    is_size_fixed = False
+
+                if not item.is_deterministic:
+                    is_deterministic = False
+
+            new_items.append(item)
+            cached_surface_indexes.append(cached_surface_index)
+
+        if apply_children_flags != 1:
+            raise ValueError(
+                f"render pipeline must contain exactly 1 '{PipelineFlag.APPLY_CHILDREN}' flag"
+                f" (received {apply_children_flags})"
+            )
+
+        first_child_cached_surface_index = len(cache_pipeline_indexes)
+        for cached_surface_index, pipeline_index in enumerate(cache_pipeline_indexes):
+            if pipeline_index > apply_children_index:
+                first_child_cached_surface_index = cached_surface_index
+                break
+
+        shared_filters = []
+        shared_filters_end_index = None
+        for item_index, item in enumerate(new_items[:apply_children_index]):
+            if type(item) is PipelineFilter:
+                if not item.is_deterministic:
+                    break
+
+                shared_filters.append(item)
+                shared_filters_end_index = item_index
+
+        has_unshared_filters = any(
+            type(item) is PipelineFilter
+            for item in new_items[(-1 if shared_filters_end_index is None else shared_filters_end_index) + 1:]
+        )
+
+        borrow_end_index = len(new_items)
+        for item_index, item in enumerate(new_items):
+            if type(item) is PipelineFilter:
+                borrow_end_index = None if item.is_in_place else item_index
+                break
+
+        scroll_cached_surface_index = None
+        if first_child_cached_surface_index < len(cache_pipeline_indexes):
+            first_child_cache_pipeline_index = cache_pipeline_indexes[first_child_cached_surface_index]
+            if all(type(item) is PipelineFlag for item in new_items[:first_child_cache_pipeline_index]):
+                scroll_cached_surface_index = first_child_cached_surface_index
+
+        result = cls(
+            items=tuple(new_items),
+            cache_pipeline_indexes=tuple(cache_pipeline_indexes),
+            cached_surface_indexes=tuple(cached_surface_indexes),
+            apply_children_index=apply_children_index,
+            first_child_cached_surface_index=first_child_cached_surface_index,
+            scroll_cached_surface_index=scroll_cached_surface_index,
+            shared_filters=tuple(shared_filters),
+            shared_filters_end_index=shared_filters_end_index,
+            has_unshared_filters=has_unshared_filters,
+            borrow_end_index=borrow_end_index,
+            is_deterministic=is_deterministic,
+            is_size_fixed=is_size_fixed,
+            last_index=len(new_items) - 1
+        )
+
+        if is_shareable:
+            _shared_plans[items] = result
+
+        return result
+
+
+_shared_plans: dict[tuple[Union[PipelineFlag, PipelineFilter], ...], PipelinePlan] = {}
@@ -0,0 +1,243 @@
+from typing import Optional, Callable, Any, ClassVar
+from weakref import WeakKeyDictionary
+from time import perf_counter
+
+
+class RecurfaceStats:
+    """
+    Holds the work done for a single recurface during a single profiled frame
+    """
+
+    __slots__ = (
+        "filter_time", "surface_copies", "blits", "pixels_blitted", "cache_hits", "cache_misses", "cache_scrolls",
+        "cache_patches", "filter_cache_hits", "miss_invalidation", "is_culled"
+    )
+
+    def __init__(self):
+        # Total number of seconds spent inside pipeline filters
+        self.filter_time: float = 0
+        # Number of full copies made of the stored surface or of cached surfaces
+        self.surface_copies: int = 0
+        self.blits: int = 0
+        self.pixels_blitted: int = 0
+        self.cache_hits: int = 0
+        self.cache_misses: int = 0
+        # Number of times a released cached surface was scrolled into place rather than rebuilt
+        self.cache_scrolls: int = 0
+        # Number of times a released cached surface was patched where its child recurfaces changed, rather than rebuilt
+        self.cache_patches: int = 0
+        # Number of times the output of this recurface's leading filters was shared from the filter cache
+        self.filter_cache_hits: int = 0
+        # The (origin label, cause) of the most recent invalidation which cleared the cached surfaces that missed
+        self.miss_invalidation: Optional[tuple[str, str]] = None
+        self.is_culled: bool = False
+
+    def to_dict(self) -> dict[str, Any]:
+        return {attribute: getattr(self, attribute) for attribute in self.__slots__}
+
+
+class FrameReport:
+    """
+    Holds everything recorded by a RenderProfiler for a single frame. Recurfaces are identified by their labels
+    (see RenderProfiler.label()) so that reports can be exported without keeping any recurfaces alive
+    """
+
+    def __init__(self, frame_index: int):
+        self.__frame_index = frame_index
+        self.__duration: float = 0
+        self.__rects_count: int = 0
+        self.__recurface_stats: dict[str, RecurfaceStats] = {}
+        self.__invalidations: list[tuple[str, str, str]] = []
+
+    @property
+    def frame_index(self) -> int:
+        return self.__frame_index
+
+    @property
+    def duration(self) -> float:
+        """
+        The total number of seconds taken by the profiled .render() call
+        """
+
+        return self.__duration
+
+    @property
+    def rects_count(self) -> int:
+        """
+        The number of rects returned by the profiled .render() call
+        """
+
+        return self.__rects_count
+
+    @property
+    def recurface_stats(self) -> dict[str, RecurfaceStats]:
+        """
+        Maps the label of each recurface which did any rendering work during this frame to its stats
+        """
+
+        return self.__recurface_stats
+
+    @property
+    def invalidations(self) -> list[tuple[str, str, str]]:
+        """
+        Each invalidation recorded since the previous frame, as a tuple of (cleared recurface label,
+        origin recurface label, cause). The cause is the name of the property or method which was changed on
+        the origin recurface, such as "render_position"
+        """
+
+        return self.__invalidations
+
+    def totals(self) -> RecurfaceStats:
+        """
+        Returns the sum of the stats for all recurfaces in this frame
+        """
+
+        result = RecurfaceStats()
+        for stats in self.__recurface_stats.values():
+            result.filter_time += stats.filter_time
+            result.surface_copies += stats.surface_copies
+            result.blits += stats.blits
+            result.pixels_blitted += stats.pixels_blitted
+            result.cache_hits += stats.cache_hits
+            result.cache_misses += stats.cache_misses
+            result.cache_scrolls += stats.cache_scrolls
+            result.cache_patches += stats.cache_patches
+            result.filter_cache_hits += stats.filter_cache_hits
+
+        return result
+
+    def to_dict(self) -> dict[str, Any]:
+        """
+        Returns the contents of this report as a dict containing only JSON-compatible values
+        """
+
+        totals = self.totals().to_dict()
+        del totals["miss_invalidation"]
+        del totals["is_culled"]
+
+        return {
+            "frame_index": self.__frame_index,
+            "duration": self.__duration,
+            "rects_count": self.__rects_count,
+            "totals": totals,
+            "recurfaces": {label: stats.to_dict() for label, stats in self.__recurface_stats.items()},
+            "invalidations": [list(invalidation) for invalidation in self.__invalidations]
+        }
+
+    def _finish(self, duration: float, rects_count: int) -> None:
+        self.__duration = duration
+        self.__rects_count = rects_count
+
+
+class RenderProfiler:
+    """
+    Collects per-recurface instrumentation for each frame in which it is passed to Recurface.render().
+
+    From each render it is passed to until the next render it is not passed to (or until .detach() is called),
+    a profiler is also the active profiler, and records which changes invalidated the cached surfaces of which
+    recurfaces between frames. When no profiler is in use, none of this instrumentation is carried out
+    """
+
+    # The profiler currently recording cache invalidations, if any
+    active: ClassVar[Optional["RenderProfiler"]] = None
+
+    def __init__(self, on_frame: Optional[Callable[[FrameReport], None]] = None):
+        self.__on_frame = on_frame
+
+        self.__frame_index: int = 0
+        self.__current_report: Optional[FrameReport] = None
+        self.__last_report: Optional[FrameReport] = None
+        self.__frame_start_time: float = 0
+
+        self.__labels: WeakKeyDictionary = WeakKeyDictionary()
+        # Holds the (cleared recurface, origin recurface, cause) of each invalidation since the current frame began
+        self.__pending_invalidations: list[tuple[Any, Any, str]] = []
+        # Holds the (origin label, cause) of the most recent invalidation for each recurface
+        self.__last_invalidations: WeakKeyDictionary = WeakKeyDictionary()
+
+    @property
+    def last_report(self) -> Optional[FrameReport]:
+        """
+        The report for the most recently completed profiled frame
+        """
+
+        return self.__last_report
+
+    def label(self, recurface: Any, label: str) -> None:
+        """
+        Sets a human-readable label to identify the provided recurface by in this profiler's reports.
+        Unlabelled recurfaces are identified by their class name and id
+        """
+
+        self.__labels[recurface] = label
+
+    def get_label(self, recurface: Any) -> str:
+        if (label := self.__labels.get(recurface)) is not None:
+            return label
+
+        return f"{type(recurface).__name__}@{id(recurface):x}"
+
+    def detach(self) -> None:
+        """
+        Stops this profiler from recording cache invalidations, if it is currently the active profiler
+        """
+
+        if RenderProfiler.active is self:
+            RenderProfiler.active = None
+
+        # Recurfaces are not kept alive by invalidations which will never be reported
+        self.__pending_invalidations = []
+
+    def stats(self, recurface: Any) -> RecurfaceStats:
+        """
+        Returns the stats object for the provided recurface in the frame currently being profiled
+        """
+
+        recurface_stats = self.__current_report.recurface_stats
+        label = self.get_label(recurface)
+
+        if (result := recurface_stats.get(label)) is None:
+            result = recurface_stats[label] = RecurfaceStats()
+
+        return result
+
+    def record_cache_miss(self, recurface: Any) -> None:
+        stats = self.stats(recurface)
+        stats.cache_misses += 1
+        stats.miss_invalidation = self.__last_invalidations.get(recurface)
+
+    def record_invalidation(self, cleared_recurface: Any, origin_recurface: Any, cause: str) -> None:
+        """
+        Invalidations can be recorded for every change made between frames, so labels are only looked up
+        once the next frame begins
+        """
+
+        self.__pending_invalidations.append((cleared_recurface, origin_recurface, cause))
+
+    def begin_frame(self) -> None:
+        if RenderProfiler.active not in (None, self):
+            RenderProfiler.active.detach()
+        RenderProfiler.active = self
+
+        self.__current_report = FrameReport(self.__frame_index)
+        self.__frame_index += 1
+
+        invalidations = self.__current_report.invalidations
+        for cleared_recurface, origin_recurface, cause in self.__pending_invalidations:
+            invalidation = (self.get_label(origin_recurface), cause)
+
+            self.__last_invalidations[cleared_recurface] = invalidation
+            invalidations.append((self.get_label(cleared_recurface), *invalidation))
+        self.__pending_invalidations = []
+
+        self.__frame_start_time = perf_counter()
+
+    def end_frame(self, rects_count: int) -> None:
+        report = self.__current_report
+        report._finish(perf_counter() - self.__frame_start_time, rects_count)
+
+        self.__current_report = None
+        self.__last_report = report
+
+        if self.__on_frame is not None:
+            self.__on_frame(report)
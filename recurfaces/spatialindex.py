@@ -0,0 +1,308 @@
+from pygame import Rect
+
+from typing import Optional, Any, ClassVar, Iterable
+
+
+class _IndexEntry:
+    __slots__ = ("rect", "cells")
+
+    def __init__(self, rect: Rect, cells: tuple[tuple[int, int], ...]):
+        # The area of the destination covered by the recurface, clipped to the surfaces of its ancestors
+        self.rect = rect
+        # The grid cells which the area overlaps
+        self.cells = cells
+
+
+class SpatialIndex:
+    """
+    Indexes the area covered by each recurface with a stored surface in the chain below the provided top-level
+    recurface, so that the recurfaces at a point (such as the mouse position) or colliding with a rect (such as
+    a selection box) can be found without walking the whole chain.
+
+    Areas are expressed in the coordinates of the top-level recurface's destination, and are clipped to the surfaces
+    of each recurface's ancestors (as they are when rendered). Recurfaces which would not be rendered, because they or
+    one of their ancestors have .do_render set to False or no render position, are not indexed. Hit-testing is based on
+    the full rect of each stored surface; transparent pixels and any resizing done by pipeline filters are not taken
+    into account.
+
+    Recurfaces are stored in a uniform grid of square cells. Changes to the positions, surfaces, .do_render flags,
+    parents and render priorities of recurfaces are recorded as they are made, and only the affected recurfaces
+    (along with their descendants) are re-indexed when the index is next queried.
+
+    An index tracks changes from when it is created until .detach() is called. Changes made to recurfaces while it is
+    detached are not tracked, so it should not be queried afterwards
+    """
+
+    # Every index currently tracking changes to recurfaces
+    attached: ClassVar[tuple["SpatialIndex", ...]] = ()
+
+    def __init__(self, root: Any, cell_size: int = 64):
+        if root.parent_recurface is not None:
+            raise ValueError("spatial index root must be a top-level recurface")
+        if cell_size <= 0:
+            raise ValueError("cell size must be greater than 0")
+
+        self.__root = root
+        self.__cell_size = cell_size
+
+        self.__entries: dict[Any, _IndexEntry] = {}
+        self.__cells: dict[tuple[int, int], set[Any]] = {}
+        """
+        Every recurface in the indexed chain whose ancestors were all indexed when the index was last updated
+        (whether or not it was indexed itself). Changes to any other recurfaces cannot affect the index,
+        unless they are being added to one of these
+        """
+        self.__reachable_recurfaces: set[Any] = set()
+        # The recurfaces which have changed since the index was last updated, to be re-indexed with their descendants
+        self.__flagged_recurfaces: set[Any] = {root}
+        # The render order of the children of each parent recurface, which is only generated when next needed
+        self.__child_orders: dict[Any, dict[Any, int]] = {}
+
+        SpatialIndex.attached = (*SpatialIndex.attached, self)
+
+    @property
+    def root(self) -> Any:
+        return self.__root
+
+    @property
+    def cell_size(self) -> int:
+        return self.__cell_size
+
+    def __len__(self) -> int:
+        self.__update()
+
+        return len(self.__entries)
+
+    def detach(self) -> None:
+        """
+        Stops this index from tracking changes to recurfaces, and releases everything it has indexed
+        """
+
+        SpatialIndex.attached = tuple(
+            spatial_index for spatial_index in SpatialIndex.attached if spatial_index is not self
+        )
+
+        self.__entries.clear()
+        self.__cells.clear()
+        self.__reachable_recurfaces.clear()
+        self.__flagged_recurfaces.clear()
+        self.__child_orders.clear()
+
+    def get_rect(self, recurface: Any) -> Optional[Rect]:
+        """
+        Returns the indexed area covered by the provided recurface, or None if it is not indexed
+        """
+
+        self.__update()
+
+        entry = self.__entries.get(recurface)
+        return None if entry is None else entry.rect.copy()
+
+    def get_recurfaces_at(self, point: tuple[int, int]) -> list[Any]:
+        """
+        Returns every indexed recurface whose area contains the provided point, in top-down render order
+        (the recurface rendered last, and so appearing on top, is first)
+        """
+
+        self.__update()
+
+        cell_size = self.__cell_size
+        candidates = self.__cells.get((point[0] // cell_size, point[1] // cell_size))
+        if not candidates:
+            return []
+
+        entries = self.__entries
+        return self.__sorted_top_down(
+            recurface for recurface in candidates if entries[recurface].rect.collidepoint(point)
+        )
+
+    def get_recurfaces_colliding(self, rect: Rect) -> list[Any]:
+        """
+        Returns every indexed recurface whose area overlaps the provided rect, in top-down render order
+        (the recurface rendered last, and so appearing on top, is first)
+        """
+
+        self.__update()
+
+        rect = Rect(rect)
+        if not rect:
+            return []
+
+        candidates = set()
+        cells = self.__cells
+        for cell in self.__get_cells(rect):
+            if cell_recurfaces := cells.get(cell):
+                candidates |= cell_recurfaces
+
+        entries = self.__entries
+        return self.__sorted_top_down(
+            recurface for recurface in candidates if entries[recurface].rect.colliderect(rect)
+        )
+
+    def _flag(self, recurface: Any, cause: str) -> None:
+        """
+        Records a change to the provided recurface, made through the property or method named by the provided cause.
+        Called by recurfaces as they change, while this index is attached.
+        Changes to recurfaces which are not part of the indexed chain (such as those in other chains) are ignored
+        """
+
+        if cause == "render_priority":
+            # Only the order of the recurface amongst its siblings has changed
+            if (parent := recurface.parent_recurface) is not None:
+                self.__child_orders.pop(parent, None)
+        elif cause == "child_recurfaces":
+            self.__child_orders.pop(recurface, None)
+        else:
+            reachable_recurfaces = self.__reachable_recurfaces
+            if (recurface in reachable_recurfaces) or (recurface.parent_recurface in reachable_recurfaces):
+                self.__flagged_recurfaces.add(recurface)
+
+    def __update(self) -> None:
+        """
+        Re-indexes each flagged recurface along with its descendants, or removes them from the index if they are no
+        longer part of the indexed chain
+        """
+
+        flagged_recurfaces = self.__flagged_recurfaces
+        if not flagged_recurfaces:
+            return
+
+        self.__flagged_recurfaces = set()
+
+        for recurface in flagged_recurfaces:
+            """
+            Walking up the ancestry determines whether the recurface is still part of the indexed chain, and where
+            its area starts. If an ancestor has also been flagged, the recurface is re-indexed along with it instead
+            """
+            ancestors = []
+            current_obj = recurface.parent_recurface
+            while current_obj is not None:
+                if current_obj in flagged_recurfaces:
+                    break
+                ancestors.append(current_obj)
+                current_obj = current_obj.parent_recurface
+            else:
+                is_indexed = (ancestors[-1] if ancestors else recurface) is self.__root
+
+                # The position of the area covered by the recurface's parent, and the area its children are clipped to
+                offset = (0, 0)
+                clip_rect = None
+                for ancestor in reversed(ancestors):
+                    if not (ancestor.do_render and ancestor.render_position):
+                        is_indexed = False
+                        break
+
+                    coords = ancestor.render_coords
+                    offset = (offset[0] + coords[0], offset[1] + coords[1])
+                    if ancestor.surface:
+                        surface_rect = Rect(offset, ancestor.surface.get_size())
+                        clip_rect = surface_rect if clip_rect is None else clip_rect.clip(surface_rect)
+
+                self.__index_descendants(recurface, offset, clip_rect, is_indexed)
+
+    def __index_descendants(
+            self, recurface: Any, offset: tuple[int, int], clip_rect: Optional[Rect], is_indexed: bool
+    ) -> None:
+        """
+        Re-indexes the provided recurface and all of its descendants, starting from the provided offset and clip rect
+        of its parent. If the recurface is not to be indexed, it and its descendants are removed from the index instead;
+        only those which were previously reachable are visited, as nothing below any others can have been indexed
+        """
+
+        reachable_recurfaces = self.__reachable_recurfaces
+
+        # Descendants are visited using an explicit stack, so that there is no limit on the depth of the chain
+        pending_recurfaces = [(recurface, offset, clip_rect, is_indexed)]
+        while pending_recurfaces:
+            current_obj, offset, clip_rect, is_indexed = pending_recurfaces.pop()
+
+            if is_indexed:
+                reachable_recurfaces.add(current_obj)
+            elif current_obj in reachable_recurfaces:
+                reachable_recurfaces.discard(current_obj)
+            else:
+                continue
+
+            rect = None
+            if is_indexed and current_obj.do_render and current_obj.render_position:
+                coords = current_obj.render_coords
+                offset = (offset[0] + coords[0], offset[1] + coords[1])
+
+                if current_obj.surface:
+                    rect = Rect(offset, current_obj.surface.get_size())
+                    if clip_rect is not None:
+                        rect = rect.clip(clip_rect)
+                    clip_rect = rect
+            else:
+                is_indexed = False
+
+            self.__set_entry(current_obj, rect)
+
+            # Anything entirely clipped away cannot be seen, and so neither can its descendants
+            if is_indexed and (clip_rect is not None) and not clip_rect:
+                is_indexed = False
+
+            for child in current_obj.child_recurfaces:
+                pending_recurfaces.append((child, offset, clip_rect, is_indexed))
+
+    def __set_entry(self, recurface: Any, rect: Optional[Rect]) -> None:
+        """
+        Stores the provided area as the indexed area of the provided recurface, or removes it from the index
+        if the area is None or empty
+        """
+
+        entries = self.__entries
+        cells = self.__cells
+
+        if (entry := entries.pop(recurface, None)) is not None:
+            for cell in entry.cells:
+                cell_recurfaces = cells[cell]
+                cell_recurfaces.discard(recurface)
+                if not cell_recurfaces:
+                    del cells[cell]
+
+        if not rect:
+            return
+
+        entry = _IndexEntry(rect, self.__get_cells(rect))
+        entries[recurface] = entry
+
+        for cell in entry.cells:
+            if cell_recurfaces := cells.get(cell):
+                cell_recurfaces.add(recurface)
+            else:
+                cells[cell] = {recurface}
+
+    def __get_cells(self, rect: Rect) -> tuple[tuple[int, int], ...]:
+        cell_size = self.__cell_size
+
+        return tuple(
+            (cell_x, cell_y)
+            for cell_x in range(rect.left // cell_size, ((rect.right - 1) // cell_size) + 1)
+            for cell_y in range(rect.top // cell_size, ((rect.bottom - 1) // cell_size) + 1)
+        )
+
+    def __sorted_top_down(self, recurfaces: Iterable[Any]) -> list[Any]:
+        return sorted(recurfaces, key=self.__get_render_order_key, reverse=True)
+
+    def __get_render_order_key(self, recurface: Any) -> tuple[int, ...]:
+        """
+        Returns the position of the provided recurface in its chain's render order, as the position of each recurface
+        in its ancestry amongst its siblings. Keys sort in the order in which the recurfaces are rendered, with each
+        recurface sorting before its descendants (which are rendered on top of it)
+        """
+
+        child_orders = self.__child_orders
+
+        result = []
+        current_obj = recurface
+        while (parent := current_obj.parent_recurface) is not None:
+            if (child_order := child_orders.get(parent)) is None:
+                child_order = {child: index for index, child in enumerate(parent.child_recurfaces)}
+                child_orders[parent] = child_order
+
+            result.append(child_order[current_obj])
+            current_obj = parent
+
+        result.reverse()
+        return tuple(result)
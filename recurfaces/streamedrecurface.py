@@ -0,0 +1,164 @@
+from pygame import Surface, image
+
+from typing import Optional, Any, Callable, Iterable, Union
+from concurrent.futures import Executor, ThreadPoolExecutor, Future
+from os import PathLike
+from threading import Lock
+
+from .recurface import Recurface
+from .renderpipeline import PipelineFlag, PipelineFilter
+
+# Receives nothing, and returns a newly loaded surface. Invoked on a worker thread
+SurfaceLoader = Callable[[], Surface]
+
+
+class StreamedRecurface(Recurface):
+    """
+    A recurface whose stored surface is loaded in the background, so that creating it (or a whole level of them)
+    does not hold up the frame loop while images are decoded.
+
+    The surface source is either the path of an image file, which is loaded with pygame.image.load(), or a function
+    which returns a newly loaded surface. Loading begins the first time the chain containing this recurface is rendered
+    (or earlier, if .start_loading() is invoked), and is carried out by the provided executor; if no executor is
+    provided, a thread pool shared by all streamed recurfaces is used. Until the surface is ready, the placeholder
+    surface (if any) is rendered in its place. If there is no placeholder, nothing is rendered for this recurface
+    itself, and its children are rendered directly onto its destination as with any other recurface without a surface.
+
+    Once loading has finished, the loaded surface replaces the placeholder through the .surface setter before the
+    next render, on the thread which invokes .render(). If the source raised an error while loading, it is raised
+    from .render() at that point instead. The loader must not use pygame functions which require the display,
+    such as Surface.convert() (see Recurface.do_convert_surfaces to convert loaded surfaces automatically).
+
+    The before_render function of a streamed recurface (if any) is invoked after its surface has been checked
+    """
+
+    __slots__ = ("__source", "__placeholder", "__executor", "__future", "__is_loaded", "__user_before_render")
+
+    __default_executor: Optional[Executor] = None
+    __default_executor_lock = Lock()
+
+    def __init__(
+            self, source: Union[str, PathLike, SurfaceLoader], placeholder: Optional[Surface] = None,
+            executor: Optional[Executor] = None, position: Optional[tuple[float, float]] = None,
+            parent: Optional[Recurface] = None, priority: Any = None, do_render: bool = True,
+            before_render: Optional[Callable[[Recurface], None]] = None,
+            render_pipeline: Iterable[Union[PipelineFlag, PipelineFilter]] = (
+                    PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE
+            ),
+            do_clip_to_visible_area: bool = False
+    ):
+        if not (isinstance(source, (str, PathLike)) or callable(source)):
+            raise ValueError("surface source must be an image file path or a function which returns a surface")
+
+        self.__source = source
+        self.__placeholder = placeholder
+        self.__executor = executor
+        self.__user_before_render = before_render
+
+        # The pending result of loading the surface, while it is being loaded
+        self.__future: Optional[Future] = None
+        self.__is_loaded = False
+
+        super().__init__(
+            surface=placeholder, position=position, parent=parent, priority=priority, do_render=do_render,
+            before_render=StreamedRecurface.__update_before_render, render_pipeline=render_pipeline,
+            do_clip_to_visible_area=do_clip_to_visible_area
+        )
+
+    @Recurface.before_render.setter
+    def before_render(self, value: Optional[Callable[[Recurface], None]]):
+        self.__user_before_render = value
+
+    @property
+    def source(self) -> Union[str, PathLike, SurfaceLoader]:
+        return self.__source
+
+    @property
+    def placeholder(self) -> Optional[Surface]:
+        """
+        The surface rendered in place of the loaded surface until it is ready
+        """
+
+        return self.__placeholder
+
+    @placeholder.setter
+    def placeholder(self, value: Optional[Surface]):
+        if (not self.__is_loaded) and (self.surface is self.__placeholder):
+            self.surface = value
+
+        self.__placeholder = value
+
+    @property
+    def is_loading(self) -> bool:
+        return self.__future is not None
+
+    @property
+    def is_loaded(self) -> bool:
+        """
+        Whether the loaded surface has replaced the placeholder
+        """
+
+        return self.__is_loaded
+
+    def start_loading(self) -> Optional[Future]:
+        """
+        Begins loading the surface in the background, if it has not already been loaded or started loading.
+        Returns the future which will hold the loaded surface, or None if the surface has already been loaded.
+        This is invoked automatically before this recurface is first rendered
+        """
+
+        if self.__is_loaded:
+            return None
+
+        if self.__future is None:
+            executor = self.__executor or StreamedRecurface.get_default_executor()
+            self.__future = executor.submit(StreamedRecurface.__load_surface, self.__source)
+
+        return self.__future
+
+    def update_surface(self) -> None:
+        """
+        Replaces the placeholder with the loaded surface if it has finished loading, starting loading if needed.
+        Raises any error which occurred while loading. This is invoked automatically before each render
+        """
+
+        if self.__is_loaded:
+            return
+
+        future = self.start_loading()
+        if not future.done():
+            return
+
+        self.__future = None
+        # If loading failed, its error is raised here and loading is started again when this method is next invoked
+        surface = future.result()
+
+        self.__is_loaded = True
+        self.surface = surface
+
+    @staticmethod
+    def get_default_executor() -> Executor:
+        """
+        Returns the thread pool used to load the surfaces of streamed recurfaces which were not given an executor,
+        creating it if it does not exist yet
+        """
+
+        with StreamedRecurface.__default_executor_lock:
+            if StreamedRecurface.__default_executor is None:
+                StreamedRecurface.__default_executor = ThreadPoolExecutor(thread_name_prefix="recurfaces-streaming")
+
+            return StreamedRecurface.__default_executor
+
+    @staticmethod
+    def __load_surface(source: Union[str, PathLike, SurfaceLoader]) -> Surface:
+        if isinstance(source, (str, PathLike)):
+            return image.load(source)
+
+        return source()
+
+    @staticmethod
+    def __update_before_render(recurface: "StreamedRecurface") -> None:
+        recurface.update_surface()
+
+        if recurface.__user_before_render is not None:
+            recurface.__user_before_render(recurface)
@@ -0,0 +1,197 @@
+from pygame import Surface
+
+from typing import Optional, Any
+from collections import OrderedDict
+from weakref import ref
+from threading import RLock
+
+
+class _CacheEntry:
+    __slots__ = ("recurface_ref", "index", "byte_size", "rebuild_time", "hits")
+
+    def __init__(self, recurface_ref: ref, index: int, byte_size: int, rebuild_time: float):
+        self.recurface_ref = recurface_ref
+        self.index = index
+        self.byte_size = byte_size
+        # The number of seconds it took to build the cached surface from the previous cache point
+        self.rebuild_time = rebuild_time
+        # The number of times the cached surface has been used since it was stored
+        self.hits = 0
+
+    @property
+    def eviction_cost(self) -> float:
+        """
+        Estimates how much rendering time would be lost by evicting this entry
+        """
+
+        return self.rebuild_time * (self.hits + 1)
+
+
+class SurfaceCache:
+    """
+    Tracks the memory used by every surface cached by a CACHE_SURFACE pipeline flag, across all recurfaces.
+
+    If a memory budget is set, cached surfaces are evicted whenever the total size of all cached surfaces exceeds it.
+    By default the least recently used cached surfaces are evicted first; if this cache is cost aware, the cached
+    surfaces which are cheapest to rebuild (weighted by how often they have been used) are evicted first instead.
+    Evicted surfaces are simply rebuilt the next time they are needed.
+
+    All changes to the tracked surfaces are made while holding a lock, as recurfaces which are rendered concurrently
+    (see Recurface.render()) store and use their cached surfaces from multiple threads
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, is_cost_aware: bool = False):
+        self.__max_bytes = None
+        self.__is_cost_aware = is_cost_aware
+
+        # Ordered from least to most recently used
+        self.__entries: OrderedDict[tuple[int, int], _CacheEntry] = OrderedDict()
+        # Maps the id of each recurface with cached surfaces to a weak reference to it and the indexes it has cached
+        self.__recurfaces: dict[int, tuple[ref, set[int]]] = {}
+        self.__used_bytes = 0
+        self.__lock = RLock()
+
+        self.max_bytes = max_bytes
+
+    @property
+    def max_bytes(self) -> Optional[int]:
+        """
+        The total number of bytes which cached surfaces are allowed to use.
+        If set to None, there is no limit
+        """
+
+        return self.__max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: Optional[int]):
+        if (value is not None) and (value < 0):
+            raise ValueError("max bytes cannot be negative")
+
+        with self.__lock:
+            self.__max_bytes = value
+            self.__enforce_budget()
+
+    @property
+    def is_cost_aware(self) -> bool:
+        return self.__is_cost_aware
+
+    @is_cost_aware.setter
+    def is_cost_aware(self, value: bool):
+        self.__is_cost_aware = value
+
+    @property
+    def used_bytes(self) -> int:
+        """
+        The total number of bytes currently used by cached surfaces
+        """
+
+        return self.__used_bytes
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @staticmethod
+    def get_byte_size(surface: Surface) -> int:
+        return surface.get_pitch() * surface.get_height()
+
+    def store(self, recurface: Any, index: int, surface: Surface, rebuild_time: float = 0) -> bool:
+        """
+        Records a surface as being cached by the provided recurface, at the provided cached surface index,
+        and evicts other cached surfaces as necessary to keep within the memory budget.
+        Returns False if the surface is too large to be cached at all, in which case it should not be kept
+        """
+
+        byte_size = self.get_byte_size(surface)
+        key = (id(recurface), index)
+
+        with self.__lock:
+            self.discard(recurface, index)
+            if (self.__max_bytes is not None) and (byte_size > self.__max_bytes):
+                return False
+
+            recurface_id = key[0]
+            if (recurface_details := self.__recurfaces.get(recurface_id)) is None:
+                recurface_details = self.__recurfaces[recurface_id] = (
+                    ref(recurface, lambda _, recurface_id=recurface_id: self.__discard_recurface(recurface_id)),
+                    set()
+                )
+            recurface_details[1].add(index)
+
+            self.__entries[key] = _CacheEntry(recurface_details[0], index, byte_size, rebuild_time)
+            self.__used_bytes += byte_size
+
+            self.__enforce_budget(protected_key=key)
+            return True
+
+    def touch(self, recurface: Any, index: int) -> None:
+        """
+        Records that the surface cached by the provided recurface at the provided index has been used.
+        Recurfaces only report this while a memory budget is set, as it is otherwise not needed
+        """
+
+        key = (id(recurface), index)
+        with self.__lock:
+            if (entry := self.__entries.get(key)) is not None:
+                entry.hits += 1
+                self.__entries.move_to_end(key)
+
+    def discard(self, recurface: Any, index: int) -> None:
+        """
+        Stops tracking the surface cached by the provided recurface at the provided index, if there is one
+        """
+
+        recurface_id = id(recurface)
+        with self.__lock:
+            if (entry := self.__entries.pop((recurface_id, index), None)) is None:
+                return
+
+            self.__used_bytes -= entry.byte_size
+
+            indexes = self.__recurfaces[recurface_id][1]
+            indexes.discard(index)
+            if not indexes:
+                del self.__recurfaces[recurface_id]
+
+    def clear(self) -> None:
+        """
+        Evicts every cached surface
+        """
+
+        with self.__lock:
+            while self.__entries:
+                self.__evict(next(iter(self.__entries)))
+
+    def __enforce_budget(self, protected_key: Optional[tuple[int, int]] = None) -> None:
+        if self.__max_bytes is None:
+            return
+
+        while self.__used_bytes > self.__max_bytes:
+            if self.__is_cost_aware:
+                key = min(
+                    (key for key in self.__entries if key != protected_key),
+                    key=lambda key: self.__entries[key].eviction_cost
+                )
+            else:
+                # A newly stored entry is the most recently used, and is smaller than the budget, so is never reached
+                key = next(iter(self.__entries))
+
+            self.__evict(key)
+
+    def __evict(self, key: tuple[int, int]) -> None:
+        entry = self.__entries[key]
+
+        if (recurface := entry.recurface_ref()) is None:
+            self.__discard_recurface(key[0])
+            return
+
+        self.discard(recurface, entry.index)
+        recurface._evict_cached_surface(entry.index)
+
+    def __discard_recurface(self, recurface_id: int) -> None:
+        with self.__lock:
+            if (recurface_details := self.__recurfaces.pop(recurface_id, None)) is None:
+                return
+
+            for index in recurface_details[1]:
+                if (entry := self.__entries.pop((recurface_id, index), None)) is not None:
+                    self.__used_bytes -= entry.byte_size
@@ -0,0 +1,342 @@
+from pygame import Surface, Rect, display
+
+from typing import Optional, Any, Callable, Iterable, Union
+from collections import OrderedDict
+
+from .recurface import Recurface
+from .renderpipeline import PipelineFlag
+
+# Receives the (column, row) of a tile, and returns the surface for that tile (or None if the tile is empty)
+TileSource = Callable[[int, int], Optional[Surface]]
+
+
+class TiledRecurface(Recurface):
+    """
+    A recurface with no surface of its own, which represents a very large logical surface split into a grid of
+    fixed-size tiles. Before each render, only the tiles which intersect the area this recurface can be rendered to
+    are kept as its child recurfaces, so rendering time is proportional to that area rather than the full surface.
+
+    Tiles are taken from a tile source, which is either a single (large) pygame surface which tiles are cut out of,
+    or a function receiving the (column, row) of a tile and returning its surface (or None for an empty tile).
+    Tile surfaces are only materialised from the source when their tiles first come into view. Once out of view,
+    up to .max_cached_tiles of them are kept for re-use, with the least recently visible tiles being evicted first,
+    so memory usage is also bounded by the visible area rather than the full surface.
+
+    The visible area is limited by the surfaces of this recurface's ancestors. If none of them has a surface,
+    the chain renders directly onto the outer destination; its size is then taken from .viewport_size if set,
+    or else from the display surface.
+
+    The before_render function of a tiled recurface (if any) is invoked before its tiles are updated.
+    Tiles are managed automatically, so other child recurfaces should not be added to a tiled recurface
+    """
+
+    __slots__ = (
+        "__tile_source", "__tile_size", "__grid_size", "__max_cached_tiles", "__viewport_size", "__user_before_render",
+        "__visible_range", "__visible_tiles", "__hidden_tiles"
+    )
+
+    def __init__(
+            self, tile_source: Union[Surface, TileSource], tile_size: tuple[int, int],
+            grid_size: Optional[tuple[int, int]] = None, position: Optional[tuple[float, float]] = None,
+            parent: Optional[Recurface] = None, priority: Any = None, do_render: bool = True,
+            before_render: Optional[Callable[[Recurface], None]] = None, max_cached_tiles: int = 64,
+            viewport_size: Optional[tuple[int, int]] = None
+    ):
+        if (tile_size[0] < 1) or (tile_size[1] < 1):
+            raise ValueError("tile dimensions must be at least 1")
+        if max_cached_tiles < 0:
+            raise ValueError("max cached tiles cannot be negative")
+
+        self.__tile_size = (tile_size[0], tile_size[1])
+        self.__max_cached_tiles = max_cached_tiles
+        self.__viewport_size = viewport_size
+        self.__user_before_render = before_render
+
+        # The (first column, first row, last column, last row) of the tiles visible as of the last update
+        self.__visible_range: Optional[tuple[int, int, int, int]] = None
+        # Materialised tiles (None for empty tiles) which are currently children of this recurface
+        self.__visible_tiles: dict[tuple[int, int], Optional[Recurface]] = {}
+        # Materialised tiles which are out of view, ordered from least to most recently visible
+        self.__hidden_tiles: OrderedDict[tuple[int, int], Optional[Recurface]] = OrderedDict()
+
+        self.__tile_source = None
+        self.__grid_size = None
+        self.__set_tile_source(tile_source, grid_size)
+
+        super().__init__(
+            position=position, parent=parent, priority=priority, do_render=do_render,
+            before_render=TiledRecurface.__update_before_render
+        )
+
+    @Recurface.before_render.setter
+    def before_render(self, value: Optional[Callable[[Recurface], None]]):
+        self.__user_before_render = value
+
+    @property
+    def tile_source(self) -> Union[Surface, TileSource]:
+        return self.__tile_source
+
+    @tile_source.setter
+    def tile_source(self, value: Union[Surface, TileSource]):
+        self.set_tile_source(value, grid_size=(None if isinstance(value, Surface) else self.__grid_size))
+
+    def set_tile_source(self, tile_source: Union[Surface, TileSource], grid_size: Optional[tuple[int, int]] = None):
+        """
+        Replaces the tile source, discarding all previously materialised tiles.
+        If the tile source is a function, the grid size is the number of (columns, rows) it can provide tiles for;
+        if None, tiles are requested for any visible (column, row), including negative ones
+        """
+
+        self.__set_tile_source(tile_source, grid_size)
+        self.refresh_tiles()
+
+        # The visible tiles are re-calculated on the next update, in case the grid size has changed
+        self.__visible_range = None
+
+    @property
+    def tile_size(self) -> tuple[int, int]:
+        return self.__tile_size
+
+    @property
+    def grid_size(self) -> Optional[tuple[int, int]]:
+        """
+        The number of (columns, rows) of tiles, or None if the grid is unbounded
+        """
+
+        return self.__grid_size
+
+    @property
+    def max_cached_tiles(self) -> int:
+        """
+        The maximum number of materialised tiles which are kept for re-use after going out of view
+        """
+
+        return self.__max_cached_tiles
+
+    @max_cached_tiles.setter
+    def max_cached_tiles(self, value: int):
+        if value < 0:
+            raise ValueError("max cached tiles cannot be negative")
+
+        self.__max_cached_tiles = value
+        self.__evict_hidden_tiles()
+
+    @property
+    def viewport_size(self) -> Optional[tuple[int, int]]:
+        """
+        The size of the outer destination, used to determine the visible area if no ancestors of this recurface
+        have a surface. If None, the size of the display surface is used instead
+        """
+
+        return self.__viewport_size
+
+    @viewport_size.setter
+    def viewport_size(self, value: Optional[tuple[int, int]]):
+        self.__viewport_size = value
+
+    @property
+    def visible_tiles(self) -> tuple[tuple[int, int], ...]:
+        """
+        The (column, row) of each tile in view as of the last update, including empty tiles
+        """
+
+        return tuple(self.__visible_tiles)
+
+    @property
+    def materialised_tiles_count(self) -> int:
+        """
+        The number of tiles currently held in memory, whether in view or cached for re-use
+        """
+
+        return len(self.__visible_tiles) + len(self.__hidden_tiles)
+
+    def get_visible_area(self) -> Optional[Rect]:
+        """
+        Returns the area (relative to this recurface's render position) which its tiles can currently be rendered to,
+        or None if nothing from this recurface can currently be seen
+        """
+
+        result = None
+        x_offset, y_offset = 0, 0
+
+        current_obj = self
+        while current_obj:
+            if (not current_obj.do_render) or (current_obj.render_position is None):
+                return None
+
+            if (current_obj is not self) and current_obj.surface:
+                """
+                Nothing can be rendered outside of an ancestor's surface. Rects are kept in the coordinates of the
+                current recurface's surface, and offset as each further ancestor is reached
+                """
+                surface_rect = current_obj.surface.get_rect()
+                result = surface_rect if (result is None) else result.clip(surface_rect)
+
+            x_coord, y_coord = current_obj.render_coords
+            x_offset += x_coord
+            y_offset += y_coord
+            if result is not None:
+                result.move_ip(x_coord, y_coord)
+
+            current_obj = current_obj.parent_recurface
+
+        # The offsets now represent this recurface's render position on the outer destination
+        viewport_size = self.__viewport_size
+        if (viewport_size is None) and (display_surface := display.get_surface()):
+            viewport_size = display_surface.get_size()
+
+        if viewport_size is not None:
+            viewport_rect = Rect((0, 0), viewport_size)
+            result = viewport_rect if (result is None) else result.clip(viewport_rect)
+        elif result is None:
+            raise RuntimeError(
+                "unable to determine the visible area, as no ancestors have a surface and there is no display surface"
+                " (set .viewport_size instead)"
+            )
+
+        if not result:
+            return None
+
+        return result.move(-x_offset, -y_offset)
+
+    def update_tiles(self) -> None:
+        """
+        Materialises any tiles which have come into view and removes any tiles which have gone out of view.
+        This is invoked automatically before each render
+        """
+
+        visible_area = self.get_visible_area()
+
+        visible_range = None
+        if visible_area is not None:
+            tile_width, tile_height = self.__tile_size
+            first_column, last_column = visible_area.left // tile_width, (visible_area.right - 1) // tile_width
+            first_row, last_row = visible_area.top // tile_height, (visible_area.bottom - 1) // tile_height
+
+            if self.__grid_size is not None:
+                first_column, first_row = max(first_column, 0), max(first_row, 0)
+                last_column, last_row = min(last_column, self.__grid_size[0] - 1), min(last_row, self.__grid_size[1] - 1)
+
+            if (first_column <= last_column) and (first_row <= last_row):
+                visible_range = (first_column, first_row, last_column, last_row)
+
+        if visible_range == self.__visible_range:
+            return  # The same tiles are still in view
+
+        self.__visible_range = visible_range
+
+        previous_visible_tiles = self.__visible_tiles
+        visible_tiles = {}
+        added_tiles = []
+
+        if visible_range is not None:
+            first_column, first_row, last_column, last_row = visible_range
+            for row in range(first_row, last_row + 1):
+                for column in range(first_column, last_column + 1):
+                    coords = (column, row)
+
+                    if coords in previous_visible_tiles:
+                        visible_tiles[coords] = previous_visible_tiles.pop(coords)
+                        continue
+
+                    if coords in self.__hidden_tiles:
+                        tile = self.__hidden_tiles.pop(coords)
+                    else:
+                        tile = self.__materialise_tile(column, row)
+
+                    visible_tiles[coords] = tile
+                    if tile is not None:
+                        added_tiles.append(tile)
+
+        # Any tiles remaining from the previous update are now out of view
+        removed_tiles = []
+        for coords, tile in previous_visible_tiles.items():
+            self.__hidden_tiles[coords] = tile
+            if tile is not None:
+                removed_tiles.append(tile)
+
+        self.__visible_tiles = visible_tiles
+
+        self.remove_child_recurfaces(removed_tiles)
+        self.add_child_recurfaces(added_tiles)
+        self.__evict_hidden_tiles()
+
+    def refresh_tiles(self, tiles: Optional[Iterable[tuple[int, int]]] = None) -> None:
+        """
+        Discards the materialised surfaces of the tiles at the provided (column, row) coordinates (or of every tile,
+        if None), so that they are requested from the tile source again. This should be invoked if the tile source
+        has changed the contents of those tiles
+        """
+
+        if tiles is None:
+            tiles = (*self.__visible_tiles, *self.__hidden_tiles)
+
+        with Recurface.batch():
+            for coords in tiles:
+                self.__hidden_tiles.pop(coords, None)
+
+                if coords not in self.__visible_tiles:
+                    continue
+
+                tile = self.__visible_tiles[coords]
+                surface = self.__get_tile_surface(*coords)
+                if (tile is None) and (surface is not None):
+                    tile = self.__visible_tiles[coords] = self.__create_tile(coords[0], coords[1], surface)
+                    self.add_child_recurface(tile)
+                elif (tile is not None) and (surface is None):
+                    self.__visible_tiles[coords] = None
+                    self.remove_child_recurface(tile)
+                elif tile is not None:
+                    if tile.surface is surface:  # The tile source has modified the existing surface
+                        tile.flag_surface()
+                    else:
+                        tile.surface = surface
+
+    def __set_tile_source(self, tile_source: Union[Surface, TileSource], grid_size: Optional[tuple[int, int]]) -> None:
+        if isinstance(tile_source, Surface):
+            source_width, source_height = tile_source.get_size()
+            tile_width, tile_height = self.__tile_size
+            # The grid covers the full source surface, with any partial tiles along the far edges
+            grid_size = (-(-source_width // tile_width), -(-source_height // tile_height))
+        elif not callable(tile_source):
+            raise ValueError("tile source must be a pygame Surface or a function which returns tile surfaces")
+
+        self.__tile_source = tile_source
+        self.__grid_size = grid_size
+
+    def __get_tile_surface(self, column: int, row: int) -> Optional[Surface]:
+        tile_source = self.__tile_source
+        if not isinstance(tile_source, Surface):
+            return tile_source(column, row)
+
+        tile_width, tile_height = self.__tile_size
+        tile_area = Rect(column * tile_width, row * tile_height, tile_width, tile_height).clip(tile_source.get_rect())
+
+        # Subsurfaces share pixels with the source surface, so no additional memory is used for the tile itself
+        return tile_source.subsurface(tile_area) if tile_area else None
+
+    def __materialise_tile(self, column: int, row: int) -> Optional[Recurface]:
+        if (surface := self.__get_tile_surface(column, row)) is None:
+            return None
+
+        return self.__create_tile(column, row, surface)
+
+    def __create_tile(self, column: int, row: int, surface: Surface) -> Recurface:
+        tile_width, tile_height = self.__tile_size
+
+        return Recurface(
+            surface=surface, position=(column * tile_width, row * tile_height), priority=(row, column),
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN,)
+        )
+
+    def __evict_hidden_tiles(self) -> None:
+        hidden_tiles = self.__hidden_tiles
+        while len(hidden_tiles) > self.__max_cached_tiles:
+            hidden_tiles.popitem(last=False)
+
+    @staticmethod
+    def __update_before_render(recurface: "TiledRecurface") -> None:
+        if recurface.__user_before_render is not None:
+            recurface.__user_before_render(recurface)
+
+        recurface.update_tiles()
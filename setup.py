@@ -21,6 +21,9 @@ setup(
     install_requires=[
         "pygame~=2.5.0"
     ],
+    extras_require={
+        "numpy": ["numpy>=1.22"]
+    },
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
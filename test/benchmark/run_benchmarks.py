@@ -0,0 +1,403 @@
+"""
+Headless render benchmarks for recurfaces.
+
+Each benchmark builds a scene of a particular shape, then repeatedly applies a deterministic per-frame update
+and renders the scene under the SDL dummy video driver. Frame times, rects per frame and peak traced memory are
+reported in JSON, so that results from different versions can be stored and compared side by side:
+
+    python test/benchmark/run_benchmarks.py --output after.json --compare before.json
+"""
+
+import os
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "hide"
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))  # Allows running this file directly from any location
+
+from pygame import display, Surface, SRCALPHA, version as pygame_version
+
+from argparse import ArgumentParser
+from json import dumps, loads
+from platform import platform, python_version
+from random import Random
+from statistics import mean
+from subprocess import check_output, CalledProcessError
+from time import perf_counter
+from tracemalloc import start as start_tracing, stop as stop_tracing, get_traced_memory
+from typing import Callable, Optional
+
+from recurfaces import Recurface, PipelineFlag, PipelineFilter
+
+WINDOW_SIZE = (800, 600)
+SEED = 1234
+
+# A benchmark receives a seeded Random object, and returns the top-level recurface and a per-frame update function
+Benchmark = Callable[[Random], tuple[Recurface, Callable[[int], None]]]
+
+
+def filled_surface(size: tuple[int, int], colour: str) -> Surface:
+    result = Surface(size)
+    result.fill(colour)
+    return result
+
+
+def deep_chain(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    A single chain 400 recurfaces deep, alternating between recurfaces with and without surfaces.
+    The deepest recurface moves every frame
+    """
+
+    root = Recurface(surface=filled_surface(WINDOW_SIZE, "white"), position=(0, 0))
+    current = root
+    for depth in range(400):
+        surface = filled_surface((200, 200), "grey") if depth % 2 else None
+        current = Recurface(surface=surface, position=(0, 0), parent=current)
+    leaf = Recurface(surface=filled_surface((8, 8), "red"), position=(0, 0), parent=current)
+
+    def update(frame: int) -> None:
+        leaf.render_position = (rng.randrange(190), rng.randrange(190))
+
+    return root, update
+
+
+def wide_fan_out(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    2000 small recurfaces directly under a surfaceless top-level recurface, a tenth of which move every frame
+    """
+
+    root = Recurface(position=(0, 0))
+    sprite = filled_surface((16, 16), "red")
+    children = [
+        Recurface(surface=sprite, position=(rng.randrange(784), rng.randrange(584)), parent=root, priority=index)
+        for index in range(2000)
+    ]
+
+    def update(frame: int) -> None:
+        for child in rng.sample(children, 200):
+            child.move_render_position(rng.choice((-2, 2)), rng.choice((-2, 2)))
+
+    return root, update
+
+
+def cached_static_movers(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    A full-window cached parent holding 300 static recurfaces, and 100 recurfaces which move every frame
+    """
+
+    root = Recurface(surface=filled_surface(WINDOW_SIZE, "white"), position=(0, 0))
+    decoration = filled_surface((64, 64), "green")
+    for index in range(300):
+        Recurface(surface=decoration, position=(rng.randrange(736), rng.randrange(536)), parent=root, priority=index)
+
+    mover_surface = filled_surface((12, 12), "red")
+    movers = [
+        Recurface(surface=mover_surface, position=(rng.randrange(788), rng.randrange(588)), parent=root, priority=300)
+        for _ in range(100)
+    ]
+
+    def update(frame: int) -> None:
+        for mover in movers:
+            mover.render_position = (rng.randrange(788), rng.randrange(588))
+
+    return root, update
+
+
+def non_deterministic_filters(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    200 static recurfaces under a cached parent, each with a non-deterministic filter that recolours its surface
+    """
+
+    def random_fill(surface: Surface) -> Surface:
+        surface.fill((rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        return surface
+
+    root = Recurface(surface=filled_surface(WINDOW_SIZE, "white"), position=(0, 0))
+    sprite = filled_surface((24, 24), "blue")
+    flicker_filter = PipelineFilter(random_fill, is_deterministic=False)
+    for index in range(200):
+        Recurface(
+            surface=sprite, position=(rng.randrange(776), rng.randrange(576)), parent=root, priority=index,
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN, flicker_filter)
+        )
+
+    def update(frame: int) -> None:
+        pass
+
+    return root, update
+
+
+def mass_reparenting(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    1000 recurfaces split between two cached parents, half of which swap parents every frame
+    """
+
+    root = Recurface(position=(0, 0))
+    left = Recurface(surface=filled_surface((400, 600), "white"), position=(0, 0), parent=root, priority=0)
+    right = Recurface(surface=filled_surface((400, 600), "black"), position=(400, 0), parent=root, priority=1)
+    sprite = filled_surface((10, 10), "red")
+    children = [
+        Recurface(
+            surface=sprite, position=(rng.randrange(390), rng.randrange(590)),
+            parent=(left if index % 2 else right), priority=index
+        )
+        for index in range(1000)
+    ]
+
+    def update(frame: int) -> None:
+        for child in rng.sample(children, 500):
+            child.parent_recurface = right if child.parent_recurface is left else left
+
+    return root, update
+
+
+def scrolling_playfield(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    A full-window single-colour playfield covered by 1200 tiles, all of which scroll together every frame,
+    beneath a sprite which moves every frame
+    """
+
+    root = Recurface(position=(0, 0))
+    playfield = Recurface(surface=filled_surface(WINDOW_SIZE, "black"), position=(0, 0), parent=root, priority=0)
+    tile_surfaces = [filled_surface((20, 20), colour) for colour in ("green", "darkgreen", "olive", "brown")]
+    tiles = [
+        Recurface(
+            surface=rng.choice(tile_surfaces), position=((index % 40) * 20, (index // 40) * 20),
+            parent=playfield, priority=index
+        )
+        for index in range(40 * 30)
+    ]
+    sprite = Recurface(surface=filled_surface((16, 16), "red"), position=(392, 292), parent=root, priority=1)
+
+    def update(frame: int) -> None:
+        with Recurface.batch():
+            for tile in tiles:
+                tile.move_render_position(-2, 1)
+        sprite.render_position = (rng.randrange(784), rng.randrange(584))
+
+    return root, update
+
+
+def cursor_over_panel(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    A full-window cached panel holding 400 static widgets, and a cursor which moves across it every frame
+    """
+
+    panel = Recurface(surface=filled_surface(WINDOW_SIZE, "grey"), position=(0, 0))
+    widget_surfaces = [filled_surface((48, 24), colour) for colour in ("white", "lightblue", "navy")]
+    for index in range(400):
+        Recurface(
+            surface=rng.choice(widget_surfaces), position=(rng.randrange(752), rng.randrange(576)),
+            parent=panel, priority=index
+        )
+    cursor = Recurface(surface=filled_surface((12, 16), "black"), position=(400, 300), parent=panel, priority=400)
+
+    def update(frame: int) -> None:
+        cursor.move_render_position(rng.randrange(-8, 9), rng.randrange(-8, 9))
+
+    return panel, update
+
+
+def swarm_in_deep_branch(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    500 small recurfaces at the end of a branch 200 recurfaces deep, each of which is moved individually
+    (outside of a .batch() context) every frame
+    """
+
+    root = Recurface(surface=filled_surface(WINDOW_SIZE, "white"), position=(0, 0))
+    branch = root
+    for depth in range(200):
+        branch = Recurface(position=(0, 0), parent=branch)
+    swarm_surface = filled_surface((6, 6), "purple")
+    swarm = [
+        Recurface(surface=swarm_surface, position=(rng.randrange(794), rng.randrange(594)), parent=branch)
+        for _ in range(500)
+    ]
+
+    def update(frame: int) -> None:
+        for recurface in swarm:
+            recurface.move_render_position(rng.choice((-1, 1)), rng.choice((-1, 1)))
+
+    return root, update
+
+
+class ConvertingRecurface(Recurface):
+    do_convert_surfaces = True
+
+
+def mismatched_formats(rng: Random) -> tuple[Recurface, Callable[[int], None]]:
+    """
+    1000 recurfaces directly under a surfaceless top-level recurface, whose surfaces are 24-bit, 16-bit colorkeyed
+    or per-pixel alpha rather than the window's format, a tenth of which move every frame. Surface conversion is enabled
+    """
+
+    root = ConvertingRecurface(position=(0, 0))
+
+    opaque_surface = Surface((64, 64), depth=24)
+    opaque_surface.fill("orange")
+    colorkey_surface = Surface((64, 64), depth=16)
+    colorkey_surface.fill("black")
+    colorkey_surface.fill("blue", colorkey_surface.get_rect().inflate(-24, -24))
+    colorkey_surface.set_colorkey("black")
+    alpha_surface = Surface((64, 64), SRCALPHA)
+    alpha_surface.fill((255, 0, 255, 160), alpha_surface.get_rect().inflate(-16, -16))
+
+    children = [
+        ConvertingRecurface(
+            surface=rng.choice((opaque_surface, colorkey_surface, alpha_surface)),
+            position=(rng.randrange(736), rng.randrange(536)), parent=root, priority=index
+        )
+        for index in range(1000)
+    ]
+
+    def update(frame: int) -> None:
+        for child in rng.sample(children, 100):
+            child.move_render_position(rng.choice((-2, 2)), rng.choice((-2, 2)))
+
+    return root, update
+
+
+BENCHMARKS: dict[str, Benchmark] = {
+    "deep_chain": deep_chain,
+    "wide_fan_out": wide_fan_out,
+    "cached_static_movers": cached_static_movers,
+    "non_deterministic_filters": non_deterministic_filters,
+    "mass_reparenting": mass_reparenting,
+    "scrolling_playfield": scrolling_playfield,
+    "mismatched_formats": mismatched_formats,
+    "cursor_over_panel": cursor_over_panel,
+    "swarm_in_deep_branch": swarm_in_deep_branch
+}
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered)-1, round(fraction * (len(ordered)-1)))]
+
+
+def run_frames(benchmark: Benchmark, window: Surface, frames: int) -> tuple[list[float], list[int]]:
+    """
+    Builds a fresh scene from the provided benchmark and renders it for the provided number of frames (after an
+    initial untimed render), returning the time taken by each frame and the number of rects each frame returned
+    """
+
+    root, update = benchmark(Random(SEED))
+
+    window.fill("black")
+    root.render(window)
+    display.update()
+
+    frame_times = []
+    rects_counts = []
+    for frame in range(frames):
+        start_time = perf_counter()
+        update(frame)
+        rects = root.render(window)
+        display.update(rects)
+        frame_times.append(perf_counter() - start_time)
+        rects_counts.append(len(rects))
+
+    return frame_times, rects_counts
+
+
+def run_benchmark(benchmark: Benchmark, window: Surface, frames: int) -> dict:
+    frame_times, rects_counts = run_frames(benchmark, window, frames)
+
+    # Memory is measured in a separate run, as tracing allocations significantly slows down rendering
+    start_tracing()
+    run_frames(benchmark, window, min(frames, 10))
+    peak_memory = get_traced_memory()[1]
+    stop_tracing()
+
+    frame_times_ms = [frame_time * 1000 for frame_time in frame_times]
+    return {
+        "frames": frames,
+        "frame_time_ms": {
+            "mean": round(mean(frame_times_ms), 4),
+            "p50": round(percentile(frame_times_ms, 0.5), 4),
+            "p90": round(percentile(frame_times_ms, 0.9), 4),
+            "p99": round(percentile(frame_times_ms, 0.99), 4),
+            "max": round(max(frame_times_ms), 4)
+        },
+        "rects_per_frame": {
+            "mean": round(mean(rects_counts), 2),
+            "max": max(rects_counts)
+        },
+        "peak_memory_bytes": peak_memory
+    }
+
+
+def get_commit_hash() -> Optional[str]:
+    try:
+        return check_output(
+            ["git", "rev-parse", "HEAD"], cwd=Path(__file__).resolve().parent, text=True
+        ).strip()
+    except (CalledProcessError, OSError):
+        return None
+
+
+def format_comparison(baseline: dict, current: dict) -> str:
+    """
+    Returns a table comparing the median and 99th percentile frame times of two sets of results
+    """
+
+    lines = [
+        f"{'benchmark':<28}{'p50 before':>12}{'p50 after':>12}{'change':>9}"
+        f"{'p99 before':>12}{'p99 after':>12}{'change':>9}"
+    ]
+    for name, result in current["benchmarks"].items():
+        if name not in baseline["benchmarks"]:
+            continue
+
+        line = f"{name:<28}"
+        for key in ("p50", "p99"):
+            before = baseline["benchmarks"][name]["frame_time_ms"][key]
+            after = result["frame_time_ms"][key]
+            change = ((after - before) / before * 100) if before else 0
+            line += f"{before:>12.3f}{after:>12.3f}{change:>+8.1f}%"
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def main() -> None:
+    parser = ArgumentParser(description="Runs headless render benchmarks and reports the results as JSON")
+    parser.add_argument("--frames", type=int, default=200, help="number of timed frames per benchmark")
+    parser.add_argument("--only", nargs="*", choices=BENCHMARKS, help="names of specific benchmarks to run")
+    parser.add_argument("--output", help="file path to write the JSON results to (defaults to stdout)")
+    parser.add_argument("--compare", help="file path of previous JSON results to compare against")
+    args = parser.parse_args()
+
+    display.init()
+    window = display.set_mode(WINDOW_SIZE)
+
+    results = {
+        "commit": get_commit_hash(),
+        "python": python_version(),
+        "pygame": pygame_version.ver,
+        "platform": platform(),
+        "benchmarks": {
+            name: run_benchmark(benchmark, window, args.frames)
+            for name, benchmark in BENCHMARKS.items()
+            if (not args.only) or (name in args.only)
+        }
+    }
+
+    display.quit()
+
+    results_json = dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            output_file.write(results_json)
+    else:
+        print(results_json)
+
+    if args.compare:
+        with open(args.compare, "r") as baseline_file:
+            baseline = loads(baseline_file.read())
+        print(format_comparison(baseline, results), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+import pytest
+from gc import collect
+from weakref import ref
+from pygame import Surface, image, transform
+
+from recurfaces import Recurface, FilterCache, PipelineFlag, PipelineFilter, RenderProfiler
+
+
+@pytest.fixture
+def res():
+    class FilterCacheResources:
+        calls = []
+
+        @staticmethod
+        def tint(surface: Surface) -> Surface:
+            FilterCacheResources.calls.append("tint")
+
+            surface.fill((50, 0, 0), special_flags=0x1)  # BLEND_ADD
+            return surface
+
+        @staticmethod
+        def build_sprites(count: int, sprite: Surface, *extra_items) -> list[Recurface]:
+            tint_filter = PipelineFilter(FilterCacheResources.tint, is_deterministic=True)
+            return [
+                Recurface(
+                    surface=sprite, position=(index * 10, 0),
+                    render_pipeline=(tint_filter, PipelineFlag.APPLY_CHILDREN, *extra_items)
+                )
+                for index in range(count)
+            ]
+
+    # Ensures that outputs stored by other tests are not evicted or released part way through a test
+    collect()
+    Recurface.filter_cache.clear()
+
+    yield FilterCacheResources
+
+    Recurface.filter_cache.max_bytes = 32 * 1024**2
+
+
+class TestFilterCache:
+    def test_evicts_least_recently_used(self):
+        cache = FilterCache(max_bytes=2 * 400)
+        filters = (PipelineFilter(lambda surface: surface, is_deterministic=True),)
+        source_1, source_2, source_3 = Surface((1, 1)), Surface((1, 1)), Surface((1, 1))
+
+        cache.store(source_1, filters, Surface((10, 10), depth=32))
+        cache.store(source_2, filters, Surface((10, 10), depth=32))
+        cache.get(source_1, filters)
+        cache.store(source_3, filters, Surface((10, 10), depth=32))
+
+        assert cache.get(source_1, filters) is not None
+        assert cache.get(source_2, filters) is None
+        assert cache.used_bytes == 2 * 400
+
+    def test_outputs_released_with_source(self):
+        cache = FilterCache()
+        filters = (PipelineFilter(lambda surface: surface, is_deterministic=True),)
+
+        source = Surface((10, 10))
+        cache.store(source, filters, Surface((10, 10), depth=32))
+        del source
+        collect()
+
+        assert len(cache) == 0
+        assert cache.used_bytes == 0
+
+    def test_outputs_released_with_filter_func(self):
+        class Captured:
+            pass
+
+        cache = FilterCache()
+        source = Surface((10, 10))
+        captured = Captured()
+        captured_ref = ref(captured)
+
+        def keep_captured(surface: Surface, captured=captured) -> Surface:
+            return surface
+
+        filters = (PipelineFilter(keep_captured, is_deterministic=True),)
+        cache.store(source, filters, Surface((10, 10), depth=32))
+        del captured, keep_captured, filters
+        collect()
+
+        # The cache does not keep the filter function (or anything it captures) alive
+        assert captured_ref() is None
+        assert len(cache) == 0
+        assert cache.used_bytes == 0
+
+    def test_builtin_filter_func_held_by_cache(self):
+        cache = FilterCache()
+        source = Surface((10, 10))
+        output = Surface((10, 10), depth=32)
+
+        cache.store(source, (PipelineFilter(transform.flip, is_deterministic=True),), output)
+        collect()
+        assert cache.get(source, (PipelineFilter(transform.flip, is_deterministic=True),)) is output
+
+    def test_recurfaces_share_filter_output(self, res):
+        sprite = Surface((10, 10))
+        sprite.fill((100, 100, 100))
+        root = Recurface(surface=Surface((100, 10)), position=(0, 0))
+        for sprite_recurface in res.build_sprites(5, sprite):
+            sprite_recurface.parent_recurface = root
+
+        profiler = RenderProfiler()
+        destination = Surface((100, 10))
+        root.render(destination, profiler=profiler)
+
+        assert res.calls == ["tint"]
+        assert profiler.last_report.totals().filter_cache_hits == 4
+        assert destination.get_at((45, 5))[:3] == (150, 100, 100)
+        assert sprite.get_at((5, 5))[:3] == (100, 100, 100)
+
+    def test_shared_output_not_modified_by_children(self, res):
+        sprite = Surface((10, 10))
+        first, second = res.build_sprites(2, sprite, PipelineFlag.CACHE_SURFACE)
+        child_surface = Surface((5, 5))
+        child_surface.fill((0, 0, 255))
+        Recurface(surface=child_surface, position=(0, 0), parent=first)
+
+        first.render(Surface((10, 10)))
+        destination = Surface((20, 10))
+        second.render(destination)
+
+        assert res.calls == ["tint"]
+        assert destination.get_at((10, 0))[:3] == (50, 0, 0)
+
+    def test_flag_surface_discards_shared_output(self, res):
+        sprite = Surface((10, 10))
+        first, second = res.build_sprites(2, sprite)
+        first.render(Surface((10, 10)))
+
+        sprite.fill((0, 100, 0))
+        first.flag_surface()
+        destination = Surface((20, 10))
+        second.render(destination)
+
+        assert res.calls == ["tint", "tint"]
+        assert destination.get_at((10, 0))[:3] == (50, 100, 0)
+
+    def test_disabled_cache_matches_shared_output(self, res):
+        sprite = Surface((10, 10))
+        sprite.fill((20, 40, 60))
+        root = Recurface(surface=Surface((30, 10)), position=(0, 0))
+        for sprite_recurface in res.build_sprites(3, sprite):
+            sprite_recurface.parent_recurface = root
+
+        shared_destination = Surface((30, 10))
+        root.render(shared_destination)
+
+        Recurface.filter_cache.max_bytes = 0
+        root._flag_cached_surfaces(do_clear_self=True, origin=root, cause="test")
+        for sprite_recurface in root.child_recurfaces:
+            sprite_recurface.flag_surface()
+        res.calls.clear()
+
+        unshared_destination = Surface((30, 10))
+        root.render(unshared_destination)
+
+        assert res.calls == ["tint"] * 3
+        assert image.tobytes(shared_destination, "RGB") == image.tobytes(unshared_destination, "RGB")
@@ -0,0 +1,58 @@
+import pytest
+from pygame import Surface, Rect
+
+from recurfaces import Recurface, RecurfaceGroup, PositionArrays
+
+numpy = pytest.importorskip("numpy")
+
+
+@pytest.fixture
+def res():
+    class PositionArraysResources:
+        surface_bg = Surface((800, 600))
+        parent = Recurface(surface=Surface((200, 200)), position=(0, 0))
+        group = RecurfaceGroup(parent, Surface((10, 10)), [(0, 0), (20, 0), (40, 0)])
+
+    return PositionArraysResources
+
+
+class TestPositionArrays:
+    def test_to_nearest_pixels_matches_to_nearest_pixel(self):
+        coords = [-2.5, -1.5, -0.5, 0.49, 0.5, 1.5, 2.5, 2.51, 7.0]
+        assert PositionArrays.to_nearest_pixels(coords).tolist() == [Recurface.to_nearest_pixel(c) for c in coords]
+
+    def test_get_positions(self, res):
+        res.group[1].render_position = None
+        positions = PositionArrays.get(res.group.recurfaces)
+
+        assert positions[0].tolist() == [0, 0]
+        assert numpy.isnan(positions[1]).all()
+
+    def test_set_positions(self, res):
+        res.group.positions_array = numpy.array([[0, 0], [25, 5], [40.5, 0]])
+        assert res.group.positions == [(0, 0), (25, 5), (40.5, 0)]
+
+    def test_move_positions(self, res):
+        res.group.move_positions_array([10, 5])
+        assert res.group.positions == [(10, 5), (30, 5), (50, 5)]
+
+        res.group.move_positions_array([[1, 0], [0, 0], [0, -1]])
+        assert res.group.positions == [(11, 5), (30, 5), (50, 4)]
+
+    def test_only_flags_changed_render_coords(self, res):
+        res.parent.render(res.surface_bg)
+
+        res.group.move_positions_array([[0.2, 0], [0, 0], [1, 0]])
+        rects = res.parent.render(res.surface_bg)
+        assert rects == [Rect(40, 0, 11, 10)]
+        assert res.group.positions[0] == (0.2, 0)
+
+    def test_invalid_shape(self, res):
+        with pytest.raises(ValueError):
+            res.group.positions_array = numpy.zeros((2, 2))
+
+    def test_move_without_position(self, res):
+        res.group[0].render_position = None
+
+        with pytest.raises(ValueError):
+            res.group.move_positions_array([1, 1])
@@ -0,0 +1,84 @@
+import pytest
+from random import Random
+from pygame import Rect
+
+from recurfaces import Recurface, RectMerger
+
+
+class TestRectMerger:
+    def test_removes_contained_rects(self):
+        rects = RectMerger.remove_contained([Rect(10, 10, 5, 5), Rect(0, 0, 50, 50), Rect(0, 0, 50, 50)])
+        assert rects == [Rect(0, 0, 50, 50)]
+
+    def test_removes_contained_rects_behind_wider_rects(self):
+        rects = RectMerger.remove_contained([Rect(0, 0, 50, 10), Rect(10, 20, 100, 10), Rect(20, 0, 10, 5)])
+        assert rects == [Rect(10, 20, 100, 10), Rect(0, 0, 50, 10)]
+
+    def test_removes_empty_rects(self):
+        rects = RectMerger.remove_contained([Rect(0, 0, 0, 10), Rect(0, 0, 10, 10)])
+        assert rects == [Rect(0, 0, 10, 10)]
+
+    def test_trimmed_rects_matches_remove_contained(self):
+        rects = [Rect(0, 0, 10, 10), Rect(5, 5, 2, 2), Rect(20, 20, 5, 5)]
+        assert Recurface.trimmed_rects(rects) == [Rect(0, 0, 10, 10), Rect(20, 20, 5, 5)]
+
+    def test_merges_adjacent_rects_without_overdraw(self):
+        rects = RectMerger().merge([Rect(0, 0, 10, 10), Rect(10, 0, 10, 10), Rect(20, 0, 10, 10)])
+        assert rects == [Rect(0, 0, 30, 10)]
+
+    def test_keeps_distant_rects_separate(self):
+        rects = RectMerger().merge([Rect(0, 0, 10, 10), Rect(100, 100, 10, 10)])
+        assert rects == [Rect(0, 0, 10, 10), Rect(100, 100, 10, 10)]
+
+    def test_does_not_merge_l_shaped_rects(self):
+        rects = RectMerger(collapse_overdraw_ratio=1).merge([Rect(0, 0, 100, 10), Rect(0, 10, 10, 90)])
+        assert rects == [Rect(0, 0, 100, 10), Rect(0, 10, 10, 90)]
+
+    def test_collapses_when_overdraw_is_low(self):
+        rects = RectMerger(collapse_overdraw_ratio=1.5).merge([Rect(0, 0, 100, 60), Rect(0, 60, 80, 40)])
+        assert rects == [Rect(0, 0, 100, 100)]
+
+    def test_collapses_when_too_many_rects(self):
+        rects = RectMerger(max_rects=2).merge([Rect(x * 20, 0, 10, 10) for x in range(3)])
+        assert rects == [Rect(0, 0, 50, 10)]
+
+    def test_collapse_overdraw_measured_against_input_rects(self):
+        # The first two rects merge with some overdraw, which must not count towards the area covered when collapsing
+        rect_merger = RectMerger(collapse_overdraw_ratio=1.4, merge_overdraw_ratio=1.5)
+        rects = rect_merger.merge([Rect(0, 0, 10, 10), Rect(10, 0, 10, 5), Rect(30, 0, 10, 10)])
+        assert rects == [Rect(0, 0, 20, 10), Rect(30, 0, 10, 10)]
+
+    def test_merge_overdraw_measured_against_input_rects(self):
+        # If the first two rects are merged, the third overlaps only the overdraw of their merged rect
+        rect_merger = RectMerger(collapse_overdraw_ratio=1, merge_overdraw_ratio=1.7)
+        rects = rect_merger.merge([Rect(0, 0, 10, 10), Rect(10, 0, 10, 2), Rect(11, 2, 9, 10)])
+        assert rects == [Rect(0, 0, 20, 12)]
+
+    def test_matches_brute_force_for_random_rects(self):
+        rng = Random(3)
+        for _ in range(20):
+            rects = [
+                Rect(rng.randrange(200), rng.randrange(200), rng.randrange(0, 40), rng.randrange(0, 40))
+                for _ in range(rng.randrange(1, 80))
+            ]
+
+            expected = []
+            for rect in (rect for rect in rects if rect):
+                if not any(other.contains(rect) and (other != rect) for other in rects):
+                    if rect not in expected:
+                        expected.append(rect)
+            assert sorted(RectMerger.remove_contained(rects)) == sorted(expected)
+
+            merged_rects = RectMerger(max_rects=None, merge_overdraw_ratio=1.2).merge(rects)
+            for rect in expected:
+                assert any(merged_rect.contains(rect) for merged_rect in merged_rects)
+            for merged_rect in merged_rects:
+                input_rects = [rect for rect in expected if merged_rect.contains(rect)]
+                assert merged_rect.width * merged_rect.height <= RectMerger.union_area(input_rects) * 1.2
+
+    def test_union_area_counts_overlaps_once(self):
+        assert RectMerger.union_area([Rect(0, 0, 10, 10), Rect(5, 5, 10, 10), Rect(50, 50, 1, 1)]) == 176
+
+    def test_invalid_configuration(self):
+        pytest.raises(ValueError, RectMerger, max_rects=0)
+        pytest.raises(ValueError, RectMerger, collapse_overdraw_ratio=0.5)
@@ -1,11 +1,33 @@
 import pytest
-from pygame import display, Surface, Rect
+from random import Random
+from sys import getrecursionlimit
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from pygame import Surface, Rect, SRCALPHA, image, display, draw
 
-from datetime import datetime
-from json import loads, dumps
-from subprocess import check_output
+from recurfaces import Recurface, PipelineFlag, PipelineFilter, RenderProfiler
 
-from recurfaces import Recurface
+
+class CopyCountingRecurface(Recurface):
+    """
+    Tracks how many times a copy of its stored surface has been generated during rendering
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.copies_count = 0
+
+        super().__init__(*args, **kwargs)
+
+    def generate_surface_copy(self) -> Surface:
+        self.copies_count += 1
+
+        return super().generate_surface_copy()
+
+    def generate_surface_area_copy(self, area: Rect) -> Surface:
+        self.copies_count += 1
+        self.copied_area = area.copy()
+
+        return super().generate_surface_area_copy(area)
 
 
 @pytest.fixture
@@ -34,6 +56,167 @@ def res():
     return RecurfaceResources
 
 
+@pytest.fixture
+def window(monkeypatch):
+    # Converting surfaces requires a display mode to have been set
+    monkeypatch.setenv("SDL_VIDEODRIVER", "dummy")
+    display.init()
+
+    yield display.set_mode((100, 100))
+
+    Recurface.do_convert_surfaces = False
+    display.quit()
+
+
+def build_sibling_branches() -> tuple[Recurface, list[Recurface]]:
+    """
+    Builds a surfaceless top-level recurface holding several cached branches (one of which is nested inside another),
+    each with children of its own. Returns the top-level recurface and the deepest children of each branch
+    """
+
+    root = Recurface(position=(0, 0))
+    leaves = []
+    for index in range(4):
+        branch_surface = Surface((150, 150))
+        branch_surface.fill((60 * index, 100, 200))
+        branch = Recurface(surface=branch_surface, position=(index * 160, 10), parent=root, priority=index)
+
+        inner_branch = Recurface(surface=Surface((60, 60)), position=(20, 20), parent=branch, priority=0)
+        leaf_surface = Surface((10, 10))
+        leaf_surface.fill("red")
+        leaves.append(Recurface(surface=leaf_surface, position=(5, 5), parent=inner_branch))
+        Recurface(surface=leaf_surface, position=(100, 100), parent=branch, priority=1)
+
+    return root, leaves
+
+
+def build_scrolling_layer(offset: tuple[int, int] = (0, 0)) -> tuple[Recurface, Recurface, list[Recurface]]:
+    """
+    Builds a surfaceless top-level recurface holding a single-colour playfield covered by a grid of differently coloured
+    tiles, with a sprite drawn above it. Returns the top-level recurface, the playfield and the tiles
+    """
+
+    root = Recurface(position=(0, 0))
+    playfield_surface = Surface((100, 80))
+    playfield_surface.fill("grey")
+    playfield = Recurface(surface=playfield_surface, position=(10, 10), parent=root, priority=0)
+
+    tiles = []
+    for index in range(6 * 5):
+        tile_surface = Surface((20, 20))
+        tile_surface.fill((index * 8, 255 - index * 8, 100))
+        position = (((index % 6) * 20) - 10 + offset[0], ((index // 6) * 20) - 10 + offset[1])
+        tiles.append(Recurface(surface=tile_surface, position=position, parent=playfield, priority=index))
+
+    sprite_surface = Surface((8, 8))
+    sprite_surface.fill("red")
+    Recurface(surface=sprite_surface, position=(30, 30), parent=root, priority=1)
+
+    return root, playfield, tiles
+
+
+def build_cursor_panel() -> tuple[Recurface, Recurface, list[Recurface]]:
+    """
+    Builds a surfaceless top-level recurface holding a cached panel with a patterned stored surface, covered by several
+    widgets (one of which has a child of its own) and a cursor. Returns the top-level recurface, the panel and
+    the panel's children, with the cursor last
+    """
+
+    root = Recurface(position=(0, 0))
+    panel_surface = Surface((400, 300))
+    panel_surface.fill((40, 40, 60))
+    draw.line(panel_surface, (200, 200, 0), (0, 0), (399, 299), 3)
+    panel = Recurface(surface=panel_surface, position=(20, 10), parent=root)
+
+    children = []
+    for index in range(4):
+        widget_surface = Surface((40, 30))
+        widget_surface.fill((50 * index, 150, 100))
+        children.append(
+            Recurface(surface=widget_surface, position=(index * 45, 20 + index * 25), parent=panel, priority=index)
+        )
+
+    button_surface = Surface((10, 10))
+    button_surface.fill("white")
+    Recurface(surface=button_surface, position=(5, 5), parent=children[1])
+
+    cursor_surface = Surface((6, 6))
+    cursor_surface.fill("red")
+    children.append(Recurface(surface=cursor_surface, position=(60, 60), parent=panel, priority=10))
+
+    return root, panel, children
+
+
+def build_random_chain(seed: int, size: int = 24) -> list[Recurface]:
+    """
+    Builds a top-level recurface with a cached surface, holding a randomly shaped chain of recurfaces (some without
+    surfaces) with distinct priorities. Returns every recurface in the chain, with the top-level recurface first.
+    The same seed always produces an identical chain
+    """
+
+    rng = Random(seed)
+    root_surface = Surface((200, 200))
+    root_surface.fill((20, 20, 20))
+    result = [Recurface(surface=root_surface, position=(0, 0))]
+    for index in range(size):
+        surface = None
+        if rng.random() < 0.7:
+            surface = Surface((rng.randrange(10, 60), rng.randrange(10, 60)))
+            surface.fill((rng.randrange(40, 256), rng.randrange(40, 256), rng.randrange(40, 256)))
+        result.append(Recurface(
+            surface=surface, position=(rng.randrange(-20, 180), rng.randrange(-20, 180)),
+            parent=rng.choice(result), priority=rng.random()
+        ))
+
+    return result
+
+
+def apply_random_change(rng: Random, recurfaces: list[Recurface], surfaces: list[Optional[Surface]]) -> None:
+    """
+    Makes a random change to one of the provided recurfaces (other than the top-level recurface, which is first).
+    The provided surfaces are the original surfaces of the recurfaces, used to restore any which have been removed
+    """
+
+    index = rng.randrange(1, len(recurfaces))
+    recurface = recurfaces[index]
+    change = rng.randrange(6)
+    if change == 0:
+        recurface.move_render_position(rng.randrange(-15, 16), rng.randrange(-15, 16))
+    elif change == 1:
+        recurface.do_render = not recurface.do_render
+    elif change == 2:
+        recurface.surface = None if recurface.surface else surfaces[index]
+    elif change == 3:
+        recurface.render_priority = rng.random()
+    elif change == 4:
+        # Recurfaces are sometimes removed from the chain, and may be added back later
+        candidates = [candidate for candidate in recurfaces if recurface not in candidate.ancestry]
+        recurface.parent_recurface = None if rng.random() < 0.2 else rng.choice(candidates)
+    elif recurface.surface:
+        recurface.surface.fill((rng.randrange(40, 256), rng.randrange(40, 256), rng.randrange(40, 256)))
+        recurface.flag_surface()
+
+
+def render_naively(recurface: Recurface, destination: Surface, offset: tuple[int, int] = (0, 0)) -> None:
+    """
+    Renders the provided recurface and its descendants onto the provided destination from scratch,
+    without using any of the optimisations of .render()
+    """
+
+    if not (recurface.do_render and recurface.render_position):
+        return
+
+    coords = (offset[0] + recurface.x_render_coord, offset[1] + recurface.y_render_coord)
+    if recurface.surface:
+        working_surface = recurface.surface.copy()
+        for child in recurface.child_recurfaces:
+            render_naively(child, working_surface)
+        destination.blit(working_surface, coords)
+    else:
+        for child in recurface.child_recurfaces:
+            render_naively(child, destination, coords)
+
+
 class TestRecurface:
     def test_first_render(self, res):
         rects = res.recurface_1.render(res.surface_bg)
@@ -56,7 +239,7 @@ class TestRecurface:
         res.recurface_1.move_render_position(20)
 
         rects = res.recurface_1.render(res.surface_bg)
-        assert rects == [Rect(10, 20, 300, 200), Rect(30, 20, 300, 200)]
+        assert rects == [Rect(10, 20, 320, 200)]
 
     def test_surface_changed_before_first_render(self, res):
         res.recurface_1.surface = res.surface_3
@@ -161,7 +344,7 @@ class TestRecurface:
         res.recurface_1.move_render_position(3, 6)
         rects = res.recurface_1.render(res.surface_bg)
 
-        assert rects == [Rect(10, 20, 300, 200), Rect(28, 56, 300, 200)]
+        assert rects == [Rect(10, 20, 318, 236)]
 
     def test_change_multiple_attributes_after_first_render(self, res):
         res.recurface_1.render(res.surface_bg)
@@ -189,7 +372,7 @@ class TestRecurface:
         res.recurface_1.add_child_recurface(res.recurface_2)  # This will reset recurface_2
 
         rects = res.recurface_1.render(res.surface_bg)
-        assert rects == [Rect(30, 40, 100, 300), Rect(50, 70, 100, 150)]
+        assert rects == [Rect(30, 40, 120, 300)]
 
     def test_remove_child_after_child_moved(self, res):
         res.recurface_1.add_child_recurface(res.recurface_2)
@@ -241,6 +424,265 @@ class TestRecurface:
         rects = res.recurface_1.render(res.surface_bg)
         assert rects == [Rect(44, 65, 100, 155), Rect(94, 125, 70, 60)]
 
+    def test_child_recurfaces_ordered_by_priority(self, res):
+        res.recurface_2.render_priority = 2
+        res.recurface_3.render_priority = 1
+        res.recurface_no_surface.render_priority = 3
+        res.recurface_1.add_child_recurface(res.recurface_2)
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        res.recurface_1.add_child_recurface(res.recurface_no_surface)
+        assert res.recurface_1.child_recurfaces == (res.recurface_3, res.recurface_2, res.recurface_no_surface)
+
+        res.recurface_3.render_priority = 4
+        assert res.recurface_1.child_recurfaces == (res.recurface_2, res.recurface_no_surface, res.recurface_3)
+
+        res.recurface_1.remove_child_recurface(res.recurface_no_surface)
+        assert res.recurface_1.child_recurfaces == (res.recurface_2, res.recurface_3)
+
+    def test_child_recurfaces_unordered_until_priorities_comparable(self, res):
+        res.recurface_2.render_priority = 1
+        res.recurface_1.add_child_recurface(res.recurface_2)
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        assert not res.recurface_1.are_child_recurfaces_ordered
+        assert res.recurface_1.child_recurfaces == frozenset((res.recurface_2, res.recurface_3))
+
+        res.recurface_3.render_priority = 0
+        assert res.recurface_1.are_child_recurfaces_ordered
+        assert res.recurface_1.child_recurfaces == (res.recurface_3, res.recurface_2)
+
+    def test_priority_change_to_ordered_flags_siblings(self, res):
+        res.recurface_2.render_priority = 1
+        res.recurface_1.add_child_recurface(res.recurface_2)
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        res.recurface_1.render(res.surface_bg)
+
+        res.recurface_3.render_priority = 0
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(40, 60, 100, 160)]
+
+    def test_batch_matches_unbatched_rects(self, res):
+        res.recurface_1.add_child_recurface(res.recurface_2)
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        res.recurface_1.render(res.surface_bg)
+
+        with res.recurface_1.batch():
+            res.recurface_2.move_render_position(5, 5)
+            res.recurface_3.move_render_position(-5, -5)
+
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(40, 60, 105, 160)]
+
+    def test_batch_invalidates_cached_parent(self, res):
+        res.surface_1.fill("white")
+        res.surface_3.fill("red")
+        res.recurface_1.flag_surface()
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        res.recurface_1.render(res.surface_bg)
+
+        with res.recurface_1.batch():
+            res.recurface_3.move_render_position(10)
+            res.recurface_3.move_render_position(10)
+            assert res.surface_bg.get_at((65, 85)) == (255, 0, 0)
+
+        res.recurface_1.render(res.surface_bg)
+        assert res.surface_bg.get_at((65, 85)) == (255, 255, 255)
+        assert res.surface_bg.get_at((145, 85)) == (255, 0, 0)
+
+    # Seed 430 produces a sequence of changes which was previously rendered differently when batched
+    @pytest.mark.parametrize("seed", [*range(10), 430])
+    def test_batch_matches_unbatched_random_changes(self, seed):
+        chains = (build_random_chain(seed), build_random_chain(seed))
+        surfaces = tuple([recurface.surface for recurface in chain] for chain in chains)
+        destinations = (Surface((200, 200)), Surface((200, 200)))
+        screens = (Surface((200, 200)), Surface((200, 200)))
+        for chain, destination, screen in zip(chains, destinations, screens):
+            chain[0].render(destination)
+            screen.blit(destination, (0, 0))
+
+        rng = Random(seed)
+        for frame in range(40):
+            changes_seed = rng.random()
+            changes_count = rng.randrange(1, 6)
+
+            changes_rng = Random(changes_seed)
+            for _ in range(changes_count):
+                apply_random_change(changes_rng, chains[0], surfaces[0])
+
+            changes_rng = Random(changes_seed)
+            with Recurface.batch():
+                for _ in range(changes_count):
+                    apply_random_change(changes_rng, chains[1], surfaces[1])
+
+            all_rects = []
+            for chain, destination, screen in zip(chains, destinations, screens):
+                rects = chain[0].render(destination)
+                for rect in rects:
+                    screen.blit(destination, rect, area=rect)
+                all_rects.append(sorted(rects))
+
+            expected = Surface((200, 200))
+            render_naively(chains[0][0], expected)
+
+            assert all_rects[0] == all_rects[1]
+            for destination, screen in zip(destinations, screens):
+                assert image.tobytes(destination, "RGB") == image.tobytes(expected, "RGB")
+                assert image.tobytes(screen, "RGB") == image.tobytes(expected, "RGB")
+
+    def test_render_within_batch_applies_recorded_changes(self, res):
+        res.surface_3.fill("red")
+        res.recurface_3.flag_surface()
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        res.recurface_1.render(res.surface_bg)
+
+        with res.recurface_1.batch():
+            res.recurface_3.move_render_position(20)
+            res.recurface_1.render(res.surface_bg)
+
+        assert res.surface_bg.get_at((130, 80)) == (255, 0, 0)
+
+    def test_repeated_changes_stop_at_flagged_ancestors(self, res):
+        class RenderCheckCountingRecurface(Recurface):
+            checks_count = 0
+
+            @property
+            def _can_render(self) -> bool:
+                RenderCheckCountingRecurface.checks_count += 1
+                return super()._can_render
+
+        root = RenderCheckCountingRecurface(surface=Surface((100, 100)), position=(0, 0))
+        branch = root
+        for depth in range(50):
+            branch = RenderCheckCountingRecurface(position=(0, 0), parent=branch)
+        leaves = [
+            RenderCheckCountingRecurface(surface=Surface((5, 5)), position=(index * 5, 0), parent=branch)
+            for index in range(10)
+        ]
+        destination = Surface((100, 100))
+        root.render(destination)
+
+        RenderCheckCountingRecurface.checks_count = 0
+        leaves[0].move_render_position(0, 5)
+        assert RenderCheckCountingRecurface.checks_count == 51
+
+        # Only the leaves' parent is checked again, as its ancestors have already been flagged since the last render
+        RenderCheckCountingRecurface.checks_count = 0
+        for leaf in leaves[1:]:
+            leaf.move_render_position(0, 5)
+        assert RenderCheckCountingRecurface.checks_count == 9
+
+        # Rendering allows cached surfaces to be regenerated, so the next change is propagated in full again
+        leaves[0].surface.fill("red")
+        root.render(destination)
+        assert destination.get_at((0, 5)) == (255, 0, 0)
+
+        RenderCheckCountingRecurface.checks_count = 0
+        leaves[0].move_render_position(0, 10)
+        assert RenderCheckCountingRecurface.checks_count == 51
+
+        root.render(destination)
+        assert destination.get_at((0, 5)) == (0, 0, 0)
+        assert destination.get_at((0, 15)) == (255, 0, 0)
+
+    # Seeds 175 and 225 produce sequences of changes which were previously rendered incorrectly
+    @pytest.mark.parametrize("seed", [*range(8), 175, 225])
+    def test_repeated_changes_with_visibility_changes_in_one_frame(self, seed):
+        recurfaces = build_random_chain(seed, size=10)
+        root = recurfaces[0]
+        surfaces = [recurface.surface for recurface in recurfaces]
+        destination = Surface((200, 200))
+        screen = Surface((200, 200))
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+
+        """
+        Each frame flags the same ancestors several times, with changes to whether they can render in between.
+        Later changes stop at the ancestors flagged by earlier ones, so must not depend on their state at that point
+        """
+        rng = Random(seed)
+        for frame in range(20):
+            for _ in range(rng.randrange(1, 8)):
+                index = rng.randrange(1, len(recurfaces))
+                recurface = recurfaces[index]
+                change = rng.randrange(3)
+                if change == 0:
+                    recurface.do_render = not recurface.do_render
+                elif change == 1:
+                    recurface.surface = None if recurface.surface else surfaces[index]
+                else:
+                    recurface.move_render_position(rng.randrange(-5, 6), 0)
+
+            for rect in root.render(destination):
+                screen.blit(destination, rect, area=rect)
+
+            expected = Surface((200, 200))
+            render_naively(root, expected)
+            assert image.tobytes(destination, "RGB") == image.tobytes(expected, "RGB")
+            assert image.tobytes(screen, "RGB") == image.tobytes(expected, "RGB")
+
+    def test_child_change_with_filter_after_apply_children(self, res):
+        res.recurface_1.render_pipeline = [
+            PipelineFlag.APPLY_CHILDREN, PipelineFilter(lambda surface: surface, is_deterministic=True),
+            PipelineFlag.CACHE_SURFACE
+        ]
+        res.recurface_1.add_child_recurface(res.recurface_2)
+        res.recurface_1.render(res.surface_bg)
+        res.recurface_2.move_render_position(10)
+
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(40, 60, 110, 160)]
+
+    def test_compact_representation(self, res):
+        assert not hasattr(res.recurface_1, "__dict__")
+
+        # Subclasses which do not declare slots can still store their own attributes
+        recurface = CopyCountingRecurface(surface=res.surface_1, position=(0, 0))
+        recurface.extra_attribute = True
+        assert recurface.copies_count == 0
+
+    def test_before_render_can_be_read_and_cleared(self, res):
+        calls = []
+        res.recurface_1.add_child_recurface(res.recurface_2)
+        res.recurface_2.before_render = lambda r: calls.append(r)
+
+        res.recurface_1.before_render()
+        assert calls == [res.recurface_2]
+
+        res.recurface_2.before_render = None
+        res.recurface_1.render(res.surface_bg)
+        assert calls == [res.recurface_2]
+
+    def test_cached_absolute_coords_follow_ancestors(self, res):
+        root = Recurface(position=(10, 10))
+        branch = Recurface(position=(5, 5), parent=root)
+        leaf = Recurface(surface=Surface((20, 20)), position=(1, 2), parent=branch)
+        other_root = Recurface(position=(100, 100))
+        assert leaf.absolute_render_coords == (16, 17)
+        assert leaf.absolute_rect == Rect(16, 17, 20, 20)
+
+        root.move_render_position(10, 0)
+        assert leaf.absolute_render_coords == (26, 17)
+
+        branch.parent_recurface = other_root
+        assert leaf.absolute_render_coords == (106, 107)
+
+        root.add_child_recurfaces([branch])
+        assert leaf.absolute_render_coords == (26, 17)
+
+        root.remove_child_recurfaces([branch])
+        assert leaf.absolute_render_coords == (6, 7)
+
+        leaf.surface = Surface((5, 5))
+        assert leaf.absolute_rect == Rect(6, 7, 5, 5)
+
+        branch.render_position = None
+        assert leaf.absolute_render_coords is None
+        assert leaf.absolute_rect is None
+
+        branch.render_position = (0, 0)
+        leaf.surface = None
+        assert leaf.absolute_render_coords == (1, 2)
+        assert leaf.absolute_rect is None
+
     def test_copy_surface_with_no_surface(self, res):
         assert pytest.raises(ValueError, res.recurface_no_surface.generate_surface_copy)
 
@@ -251,7 +693,7 @@ class TestRecurface:
         assert rects == [Rect(20, 20, 300, 200)]
 
         rects = res.recurface_1.render(res.surface_bg)
-        assert rects == [Rect(20, 20, 300, 200), Rect(30, 20, 300, 200)]
+        assert rects == [Rect(20, 20, 310, 200)]
 
     def test_long_chain_rects(self, res):
         """
@@ -301,110 +743,450 @@ class TestRecurface:
         rects = res.recurface_simple_1.render(res.surface_bg)
         assert rects == [Rect(2, 2, 98, 98)]
 
-    def test_performance(self, res):
-        """
-        This test implements a broad check to ensure that performance has not significantly dropped due to
-        applied changes.
+    def test_offscreen_culled_before_first_render(self, res):
+        recurface = CopyCountingRecurface(surface=res.surface_1, position=(900, 20))
 
-        The target value should be calibrated by running this test on a specific baseline commit, with no other
-        heavy tasks running on the same machine during calibration. This will generate a config.json file
-        in the test folder.
+        rects = recurface.render(res.surface_bg)
+        assert rects == []
+        assert recurface.copies_count == 0
 
-        This test should then be run again, with that config file present, on the version which needs testing
-        """
+    def test_child_moved_outside_parent_is_culled(self, res):
+        child = CopyCountingRecurface(surface=res.surface_2, position=(30, 40), parent=res.recurface_1)
+        res.recurface_1.render(res.surface_bg)
 
-        def get_commit_hash():
-            if calibration_commit is not None:
-                return check_output("git show --pretty=format:'%H' --no-patch").decode("UTF-8")
+        child.render_position = (400, 40)
+        child.flag_surface()  # Clears the cached surface, so that any render attempt would generate a fresh copy
 
-        """
-        This variable should be set to the relevant commit hash once this test is otherwise completed and committed.
-        When making changes to this test, it should be set back to None in the commit which applies the changes,
-        and then set to that commit's hash in the next commit
-        """
-        calibration_commit = "7b914559dde0d14f14759b2f18131f429f9c0601"
-
-        rounding_precision = 3
-        target_ms = None
-        json_file_path = "test/config.json"
-        json_key = "test_performance_target_ms"
-        config = {}
-        current_commit = get_commit_hash()
-
-        # Loading config
-        try:
-            with open(json_file_path, "r") as config_file:
-                config = loads(config_file.read())
-                target_ms = config[json_key]
-
-            # No calibration needed, so should not be on the calibration commit
-            assert current_commit != calibration_commit, (
-                "the calibration commit is currently checked out."
-                " Please checkout the desired commit for testing and re-run"
-            )
-        except (FileNotFoundError, KeyError):  # No valid config, calibrate and save a fresh config file
-            assert current_commit == calibration_commit, (
-                f"please checkout commit {calibration_commit} and re-run to calibrate this test"
-            )
+        copies_count_before = child.copies_count
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(40, 60, 100, 160)]
+        assert child.copies_count == copies_count_before
 
-        # Running the test
+    def test_culled_child_rendered_again_when_moved_back(self, res):
         res.recurface_1.add_child_recurface(res.recurface_2)
-        res.recurface_1.surface.fill("white")
-        res.recurface_1.flag_surface()
-        res.recurface_2.surface.fill("red")
-        res.recurface_2.flag_surface()
+        res.recurface_2.render_position = (400, 40)
+        res.recurface_1.render(res.surface_bg)
 
-        display.init()
-        window = display.set_mode((400, 300))
+        res.recurface_2.render_position = (30, 40)
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(40, 60, 100, 160)]
 
-        start_time = datetime.now()
-        for i in range(10000):
-            if i % 2 == 0:
-                res.recurface_2.move_render_position(50)
-            else:
-                res.recurface_2.move_render_position(-50)
+    def test_clip_to_visible_area_copies_only_visible_area(self, res):
+        recurface = CopyCountingRecurface(surface=res.surface_1, position=(700, 500), do_clip_to_visible_area=True)
 
-            rects = res.recurface_1.render(window)
-            display.update(rects)
-        end_time = datetime.now()
+        rects = recurface.render(res.surface_bg)
+        assert rects == [Rect(700, 500, 100, 100)]
+        assert recurface.copied_area == Rect(0, 0, 100, 100)
 
-        performance_ms = round((end_time - start_time).total_seconds() * 1000, rounding_precision)
+    def test_clip_to_visible_area_renders_children_in_place(self, res):
+        res.recurface_1.render_position = (-200, -100)
+        res.recurface_1.do_clip_to_visible_area = True
+        res.recurface_1.add_child_recurface(res.recurface_3)
+        res.recurface_3.render_position = (250, 150)
+        res.surface_1.fill("white")
+        res.surface_3.fill("red")
+        res.recurface_1.flag_surface()
+        res.recurface_3.flag_surface()
+
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(0, 0, 100, 100)]
+        assert res.surface_bg.get_at((50, 50)) == (255, 0, 0)
+        assert res.surface_bg.get_at((49, 49)) == (255, 255, 255)
 
-        if target_ms is None:  # Store calibration results
-            target_ms = performance_ms
+        res.recurface_3.move_render_position(-10, -10)
+        rects = res.recurface_1.render(res.surface_bg)
+        assert rects == [Rect(40, 40, 60, 60)]
+
+    def test_clip_to_visible_area_regenerates_cache_when_area_changes(self, res):
+        recurface = CopyCountingRecurface(surface=res.surface_1, position=(700, 500), do_clip_to_visible_area=True)
+        recurface.render(res.surface_bg)
+        recurface.render(res.surface_bg)
+        assert recurface.copies_count == 1
+
+        recurface.move_render_position(-50)
+        recurface.render(res.surface_bg)
+        assert recurface.copies_count == 2
+        assert recurface.copied_area == Rect(0, 0, 150, 100)
+
+    def test_batched_blits_keep_render_order(self, res):
+        root = Recurface(position=(0, 0))
+        surface_red, surface_green, surface_blue = Surface((20, 20)), Surface((20, 20)), Surface((20, 20))
+        surface_red.fill("red")
+        surface_green.fill("green")
+        surface_blue.fill("blue")
+
+        Recurface(surface=surface_red, position=(0, 0), parent=root, priority=0)
+        surfaceless = Recurface(position=(5, 5), parent=root, priority=1)
+        Recurface(surface=surface_green, position=(0, 0), parent=surfaceless)
+        Recurface(surface=surface_blue, position=(10, 10), parent=root, priority=2)
+
+        root.render(res.surface_bg)
+        assert res.surface_bg.get_at((2, 2)) == (255, 0, 0)
+        assert res.surface_bg.get_at((7, 7)) == (0, 255, 0)
+        assert res.surface_bg.get_at((12, 12)) == (0, 0, 255)
+
+    def test_batched_blits_record_rendered_rects(self, res):
+        res.recurface_no_surface.add_child_recurface(res.recurface_2)
+        res.recurface_no_surface.add_child_recurface(res.recurface_3)
+        res.recurface_no_surface.render(res.surface_bg)
 
-            config[json_key] = target_ms
-            with open(json_file_path, "w") as config_file:
-                config_file.write(dumps(config))
+        assert res.recurface_2.is_surface_rendered
+        assert res.recurface_3.is_surface_rendered
 
-            raise RuntimeError(
-                f"test calibration completed ({performance_ms}ms), target performance stored in '{json_file_path}'."
-                " Please run tests again with the desired commit checked out"
+        res.recurface_3.move_render_position(10)
+        rects = res.recurface_no_surface.render(res.surface_bg)
+        assert rects == [Rect(60, 80, 80, 60)]
+
+    def test_chain_deeper_than_recursion_limit(self, res):
+        depth = getrecursionlimit() + 500
+        before_render_calls = []
+
+        root = Recurface(surface=Surface((50, 50)), position=(0, 0))
+        current = root
+        for index in range(depth):
+            surface = Surface((50, 50)) if index % 2 else None
+            current = Recurface(surface=surface, position=(0, 0), parent=current)
+        leaf = Recurface(surface=Surface((5, 5)), position=(0, 0), parent=current)
+        leaf.before_render = before_render_calls.append
+
+        root.render(res.surface_bg)
+        assert before_render_calls == [leaf]
+
+        leaf.move_render_position(10, 10)
+        rects = root.render(res.surface_bg)
+        assert sorted(rects) == [Rect(0, 0, 5, 5), Rect(10, 10, 5, 5)]
+
+        root.do_render = False
+        rects = root.render(res.surface_bg)
+        assert rects == [Rect(0, 0, 50, 50)]
+
+    def test_concurrent_render_matches_serial_render(self):
+        serial_root, serial_leaves = build_sibling_branches()
+        concurrent_root, concurrent_leaves = build_sibling_branches()
+        serial_destination = Surface((800, 600))
+        concurrent_destination = Surface((800, 600))
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for frame in range(4):
+                for leaf in (*serial_leaves[frame:], *concurrent_leaves[frame:]):
+                    leaf.move_render_position(frame, 2)
+
+                serial_rects = serial_root.render(serial_destination)
+                concurrent_rects = concurrent_root.render(concurrent_destination, executor=executor)
+
+                assert concurrent_rects == serial_rects
+                assert image.tobytes(concurrent_destination, "RGB") == image.tobytes(serial_destination, "RGB")
+
+    def test_concurrent_render_of_fully_cached_siblings(self):
+        root, leaves = build_sibling_branches()
+        destination = Surface((800, 600))
+        root.render(destination)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            assert root.render(destination, executor=executor) == []
+
+    def test_uniformly_moved_children_scroll_cached_surface(self):
+        root, playfield, tiles = build_scrolling_layer()
+        destination = Surface((200, 200))
+        screen = Surface((200, 200))
+        profiler = RenderProfiler()
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+
+        total_offset = (0, 0)
+        for offset in ((3, 0), (0, -2), (-4, 5), (1.4, 1.4), (2, 2)):
+            with Recurface.batch():
+                for tile in tiles:
+                    tile.move_render_position(*offset)
+            total_offset = (total_offset[0] + offset[0], total_offset[1] + offset[1])
+
+            for rect in root.render(destination, profiler=profiler):
+                screen.blit(destination, rect, area=rect)
+
+            expected_root = build_scrolling_layer(total_offset)[0]
+            expected_destination = Surface((200, 200))
+            expected_root.render(expected_destination)
+
+            assert image.tobytes(destination, "RGB") == image.tobytes(expected_destination, "RGB")
+            assert image.tobytes(screen, "RGB") == image.tobytes(expected_destination, "RGB")
+
+        assert profiler.last_report.recurface_stats[profiler.get_label(playfield)].cache_scrolls == 1
+        profiler.detach()
+
+    def test_scrolled_children_updated_when_later_rebuilt(self):
+        root, playfield, tiles = build_scrolling_layer()
+        destination = Surface((200, 200))
+        screen = Surface((200, 200))
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+
+        for tile in tiles:
+            tile.move_render_position(0, 7)
+        for rect in root.render(destination):
+            screen.blit(destination, rect, area=rect)
+
+        # A tile which was not re-rendered when the playfield was scrolled is moved on its own
+        tiles[14].move_render_position(3, 0)
+        tiles[14].surface.fill("white")
+        tiles[14].flag_surface()
+        for rect in root.render(destination):
+            screen.blit(destination, rect, area=rect)
+
+        assert image.tobytes(screen, "RGB") == image.tobytes(destination, "RGB")
+
+    def test_children_moved_unevenly_do_not_scroll(self):
+        root, playfield, tiles = build_scrolling_layer()
+        destination = Surface((200, 200))
+        profiler = RenderProfiler()
+        root.render(destination)
+
+        for tile in tiles:
+            tile.move_render_position(2, 0)
+        tiles[0].move_render_position(1, 0)
+        root.render(destination, profiler=profiler)
+
+        assert profiler.last_report.recurface_stats[profiler.get_label(playfield)].cache_scrolls == 0
+        profiler.detach()
+
+    def test_changed_children_patch_cached_surface(self):
+        def set_widget_surface(children: list[Recurface]) -> None:
+            children[2].surface.fill("blue")
+            children[2].flag_surface()
+
+        changes = (
+            lambda children: children[4].move_render_position(7, 3),
+            lambda children: children[4].move_render_position(-30, 12),
+            lambda children: next(iter(children[1].child_recurfaces)).move_render_position(20, 10),
+            lambda children: setattr(children[4], "render_priority", -1),
+            set_widget_surface,
+            lambda children: setattr(children[3], "do_render", False),
+            lambda children: setattr(children[0], "parent_recurface", None),
+            lambda children: setattr(children[0], "parent_recurface", children[3].parent_recurface),
+        )
+
+        root, panel, children = build_cursor_panel()
+        destination = Surface((450, 350))
+        screen = Surface((450, 350))
+        profiler = RenderProfiler()
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+
+        for change_index, change in enumerate(changes):
+            change(children)
+            for rect in root.render(destination, profiler=profiler):
+                screen.blit(destination, rect, area=rect)
+
+            expected_root, expected_panel, expected_children = build_cursor_panel()
+            for expected_change in changes[:change_index + 1]:
+                expected_change(expected_children)
+            expected_destination = Surface((450, 350))
+            expected_root.render(expected_destination)
+
+            assert profiler.last_report.recurface_stats[profiler.get_label(panel)].cache_patches == 1
+            assert image.tobytes(destination, "RGB") == image.tobytes(expected_destination, "RGB")
+            assert image.tobytes(screen, "RGB") == image.tobytes(expected_destination, "RGB")
+
+        profiler.detach()
+
+    def test_patched_cached_surface_restores_only_changed_areas(self):
+        panel = Recurface(surface=Surface((640, 480)), position=(0, 0))
+        for index in range(20):
+            Recurface(surface=Surface((30, 30)), position=(index * 31, 100), parent=panel)
+        cursor = Recurface(surface=Surface((8, 8)), position=(10, 10), parent=panel)
+        destination = Surface((640, 480))
+        profiler = RenderProfiler()
+        panel.render(destination)
+
+        cursor.move_render_position(5, 5)
+        rects = panel.render(destination, profiler=profiler)
+        stats = profiler.last_report.recurface_stats
+
+        assert sorted(rects) == [Rect(10, 10, 8, 8), Rect(15, 15, 8, 8)]
+        assert stats[profiler.get_label(panel)].surface_copies == 0
+        # Only the changed areas are restored, besides the panel's own blit onto the destination
+        assert stats[profiler.get_label(panel)].pixels_blitted == (2 * 8 * 8) + (640 * 480)
+        # The cursor is blitted again (clipped) for each changed area it overlaps, and no other children are blitted
+        assert stats[profiler.get_label(cursor)].pixels_blitted == (3 * 3) + (8 * 8)
+        assert profiler.last_report.totals().blits == 5
+        profiler.detach()
+
+    def test_partly_offscreen_cached_parent_patched_after_child_removed(self):
+        panel_surface = Surface((70, 50))
+        panel_surface.fill((0, 0, 200))
+        child_surface = Surface((10, 5))
+        child_surface.fill("red")
+
+        root = Recurface(surface=Surface((200, 150)), position=(0, 0))
+        panel = Recurface(surface=panel_surface, position=(30, -3), parent=root)
+        child = Recurface(surface=child_surface, position=(20, 30), parent=panel)
+        destination = Surface((200, 150))
+        screen = Surface((200, 150))
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+        assert destination.get_at((55, 27)) == (255, 0, 0)
+
+        child.parent_recurface = None
+        for _ in range(3):
+            rects = root.render(destination)
+            for rect in rects:
+                screen.blit(destination, rect, area=rect)
+
+            assert destination.get_at((55, 27)) == (0, 0, 200)
+            assert screen.get_at((55, 27)) == (0, 0, 200)
+
+        # Areas changed within the panel are reported where they appear on the destination
+        child.parent_recurface = panel
+        assert root.render(destination) == [Rect(50, 27, 10, 5)]
+
+    def test_cached_root_patched_after_parent_surface_removed(self):
+        parent_surface = Surface((20, 20))
+        parent_surface.fill("green")
+        child_surface = Surface((20, 20))
+        child_surface.fill("red")
+
+        root = Recurface(surface=Surface((600, 600)), position=(0, 0))
+        parent = Recurface(surface=parent_surface, position=(50, 50), parent=root)
+        Recurface(surface=child_surface, position=(-10, -10), parent=parent)
+        destination = Surface((600, 600))
+        screen = Surface((600, 600))
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+
+        # The child was clipped to the parent's surface, but is now rendered in full onto the root's surface
+        parent.surface = None
+        for _ in range(2):
+            for rect in root.render(destination):
+                screen.blit(destination, rect, area=rect)
+
+            assert destination.get_at((42, 42)) == (255, 0, 0)
+            assert screen.get_at((42, 42)) == (255, 0, 0)
+
+    def test_hidden_parent_surface_removed_before_shown(self):
+        child_surface = Surface((10, 10))
+        child_surface.fill("red")
+
+        root = Recurface(surface=Surface((200, 200)), position=(0, 0))
+        branch = Recurface(position=(0, 0), parent=root)
+        parent = Recurface(surface=Surface((20, 20)), position=(50, 50), parent=branch)
+        Recurface(surface=child_surface, position=(5, 5), parent=parent)
+        destination = Surface((200, 200))
+        screen = Surface((200, 200))
+        root.render(destination)
+        screen.blit(destination, (0, 0))
+
+        # The parent's surface is removed after it has already been reset, while its child still has a rendered rect
+        branch.do_render = False
+        root.render(destination)
+        parent.surface = None
+        branch.do_render = True
+        for rect in root.render(destination):
+            screen.blit(destination, rect, area=rect)
+
+        assert destination.get_at((55, 55)) == (255, 0, 0)
+        assert screen.get_at((55, 55)) == (255, 0, 0)
+
+    def test_cached_child_patched_outside_visible_area(self):
+        child_surface = Surface((50, 50))
+        child_surface.fill("green")
+        grandchild_surface = Surface((10, 10))
+        grandchild_surface.fill("red")
+
+        root = Recurface(surface=Surface((200, 200)), position=(0, 0))
+        parent = Recurface(surface=Surface((10, 10)), position=(5, 5), parent=root)
+        child = Recurface(surface=child_surface, position=(-2, -2), parent=parent)
+        grandchild = Recurface(surface=grandchild_surface, position=(30, 30), parent=child)
+        # Keeps the child's composite cached once the grandchild is removed
+        Recurface(surface=Surface((5, 5)), position=(0, 40), parent=child).do_render = False
+        destination = Surface((200, 200))
+        root.render(destination)
+
+        # The grandchild is removed from an area of the child's cached composite which is not visible
+        grandchild.parent_recurface = None
+        root.render(destination)
+
+        child.parent_recurface = root
+        root.render(destination)
+        assert destination.get_at((35, 35)) == (0, 255, 0)
+
+    def test_cached_parent_patched_after_shown_again(self):
+        parent_surface = Surface((30, 30))
+        parent_surface.fill("green")
+        child_surface = Surface((10, 10))
+        child_surface.fill("red")
+
+        root = Recurface(surface=Surface((100, 100)), position=(0, 0))
+        parent = Recurface(surface=parent_surface, position=(0, 0), parent=root)
+        child = Recurface(surface=child_surface, position=(10, 10), parent=parent)
+        # Keeps the parent's composite cached once the child's surface is removed
+        Recurface(surface=Surface((5, 5)), position=(0, 0), parent=parent).do_render = False
+        destination = Surface((100, 100))
+        root.render(destination)
+
+        # The child is reset while the parent is hidden, but the parent's cached composite is re-used once it is shown
+        parent.do_render = False
+        root.render(destination)
+        parent.do_render = True
+        root.render(destination)
+
+        child.surface = None
+        root.render(destination)
+        assert destination.get_at((15, 15)) == (0, 255, 0)
+
+    def test_get_fill_colour(self):
+        surface = Surface((10, 10))
+        surface.fill((1, 2, 3))
+        assert surface.unmap_rgb(Recurface.get_fill_colour(surface)) == (1, 2, 3)
+
+        surface.set_at((5, 5), (1, 2, 4))
+        assert Recurface.get_fill_colour(surface) is None
+
+    def test_converted_surfaces_render_identically(self, window):
+        def build_scene() -> Recurface:
+            root = Recurface(surface=Surface((100, 100), depth=24), position=(0, 0))
+            root.surface.fill((10, 20, 30))
+
+            alpha_surface = Surface((40, 40), SRCALPHA)
+            draw.circle(alpha_surface, (255, 0, 0, 128), (20, 20), 15)
+            Recurface(surface=alpha_surface, position=(5, 5), parent=root)
+
+            colorkey_surface = Surface((40, 40), depth=16)
+            colorkey_surface.fill((0, 255, 0))
+            draw.rect(colorkey_surface, (0, 0, 0), Rect(10, 10, 20, 20))
+            colorkey_surface.set_colorkey((0, 0, 0))
+            Recurface(surface=colorkey_surface, position=(50, 50), parent=root)
+
+            return root
+
+        build_scene().render(window)
+        expected = image.tobytes(window, "RGB")
+
+        Recurface.do_convert_surfaces = True
+        window.fill((0, 0, 0))
+        build_scene().render(window)
+        assert image.tobytes(window, "RGB") == expected
+
+    def test_converted_surface_kept_until_surface_flagged(self, window):
+        received = []
+
+        def record_filter(surface: Surface) -> Surface:
+            received.append(surface)
+            return surface.copy()
+
+        Recurface.do_convert_surfaces = True
+        surface = Surface((10, 10), depth=24)
+        recurface = Recurface(
+            surface=surface, position=(0, 0),
+            render_pipeline=(
+                PipelineFlag.APPLY_CHILDREN, PipelineFilter(record_filter, is_deterministic=False, is_in_place=False)
             )
+        )
 
-        else:
-            """
-            As performance is heavily dependent on the specs and current state of the host machine, this test
-            checks against each calibration value exactly once before deleting it from the config file.
-
-            The intended usage is to calibrate just before running tests on a new commit (meaning that
-            the state of the machine should be as close as possible between calibration and testing)
-            """
-            del config[json_key]
-            with open(json_file_path, "w") as config_file:
-                config_file.write(dumps(config))
-
-            # Limits will be set to 5% above/below calibration performance (typical deviation is no more than 2-3%)
-            upper_limit_ms = round(target_ms * 1.05, rounding_precision)
-            lower_limit_ms = round(target_ms * 0.95, rounding_precision)
-
-            assert performance_ms <= upper_limit_ms, (
-                "test did not complete within the desired timeframe"
-                f" ({performance_ms}ms > {upper_limit_ms}ms)"
-            )
+        recurface.render(window)
+        recurface.render(window)
+        assert received[0] is received[1]
+        assert received[0] is not surface
+        assert received[0].get_bitsize() == window.get_bitsize()
 
-            if performance_ms < lower_limit_ms:
-                raise RuntimeError(
-                    "test completed faster than expected - please set a new calibration commit"
-                    f" ({performance_ms}ms < {lower_limit_ms}ms)"
-                )
+        recurface.flag_surface()
+        recurface.render(window)
+        assert received[2] is not received[1]
@@ -0,0 +1,74 @@
+import pytest
+from pygame import Surface, Rect
+
+from recurfaces import Recurface, RecurfaceGroup
+
+
+@pytest.fixture
+def res():
+    class RecurfaceGroupResources:
+        surface_bg = Surface((800, 600))
+        surface_tile = Surface((10, 10))
+        parent = Recurface(surface=Surface((200, 200)), position=(0, 0))
+
+    return RecurfaceGroupResources
+
+
+class TestRecurfaceGroup:
+    def test_creates_children(self, res):
+        group = RecurfaceGroup(res.parent, res.surface_tile, [(0, 0), (10, 0), (20, 0)], priorities=[2, 1, 0])
+
+        assert len(group) == 3
+        assert set(res.parent.child_recurfaces) == set(group)
+        assert res.parent.child_recurfaces == tuple(reversed(group.recurfaces))
+        assert all(recurface.parent_recurface is res.parent for recurface in group)
+        assert group.surfaces == [res.surface_tile] * 3
+
+    def test_renders_children(self, res):
+        res.surface_tile.fill("red")
+        RecurfaceGroup(res.parent, res.surface_tile, [(0, 0), (50, 50)])
+
+        rects = res.parent.render(res.surface_bg)
+        assert rects == [Rect(0, 0, 200, 200)]
+        assert res.surface_bg.get_at((55, 55)) == (255, 0, 0)
+
+    def test_added_after_first_render(self, res):
+        res.parent.render(res.surface_bg)
+        RecurfaceGroup(res.parent, res.surface_tile, [(0, 0), (20, 0)])
+
+        rects = res.parent.render(res.surface_bg)
+        assert rects == [Rect(0, 0, 10, 10), Rect(20, 0, 10, 10)]
+
+    def test_set_positions(self, res):
+        group = RecurfaceGroup(res.parent, res.surface_tile, [(0, 0), (20, 0)])
+        res.parent.render(res.surface_bg)
+
+        group.positions = [(0, 0), (40, 0)]
+        assert group.positions == [(0, 0), (40, 0)]
+
+        rects = res.parent.render(res.surface_bg)
+        assert rects == [Rect(20, 0, 10, 10), Rect(40, 0, 10, 10)]
+
+    def test_remove(self, res):
+        group = RecurfaceGroup(res.parent, res.surface_tile, [(0, 0), (20, 0)])
+        res.parent.render(res.surface_bg)
+
+        group.remove()
+        assert res.parent.child_recurfaces == ()
+        assert all(recurface.parent_recurface is None for recurface in group)
+
+        rects = res.parent.render(res.surface_bg)
+        assert rects == [Rect(0, 0, 10, 10), Rect(20, 0, 10, 10)]
+
+    def test_mismatched_lengths(self, res):
+        with pytest.raises(ValueError):
+            RecurfaceGroup(res.parent, [res.surface_tile], [(0, 0), (20, 0)])
+
+    def test_add_child_recurfaces_moves_from_previous_parent(self, res):
+        old_parent = Recurface(position=(0, 0))
+        child = Recurface(surface=res.surface_tile, position=(0, 0), parent=old_parent)
+
+        res.parent.add_child_recurfaces([child, child])
+        assert child.parent_recurface is res.parent
+        assert old_parent.child_recurfaces == ()
+        assert res.parent.child_recurfaces == (child,)
@@ -0,0 +1,156 @@
+import pytest
+from pygame import Surface
+
+from recurfaces import Recurface, PipelineFlag, PipelineFilter, RenderProfiler
+from recurfaces.renderpipeline import PipelinePlan
+
+
+def identity_filter(surface: Surface) -> Surface:
+    return surface
+
+
+class TestPipelinePlan:
+    def test_maps_cached_surfaces_to_pipeline_indexes(self):
+        plan = PipelinePlan.compile((
+            PipelineFlag.CACHE_SURFACE, PipelineFlag.APPLY_CHILDREN,
+            PipelineFilter(identity_filter, is_deterministic=True), PipelineFlag.CACHE_SURFACE
+        ))
+
+        assert plan.cache_pipeline_indexes == (0, 3)
+        assert plan.cached_surface_indexes == (0, None, None, 1)
+        assert plan.apply_children_index == 1
+        assert plan.first_child_cached_surface_index == 1
+        assert plan.last_index == 3
+        assert plan.is_deterministic
+        assert not plan.is_size_fixed
+
+    def test_stores_flags_by_identity(self):
+        plan = PipelinePlan.compile(("apply_children", "cache_surface"))
+        assert plan.items[0] is PipelineFlag.APPLY_CHILDREN
+        assert plan.items[1] is PipelineFlag.CACHE_SURFACE
+
+    def test_shares_flag_only_plans(self):
+        pipeline = (PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE)
+        assert PipelinePlan.compile(pipeline) is PipelinePlan.compile(list(pipeline))
+
+    def test_non_deterministic_filter(self):
+        plan = PipelinePlan.compile((PipelineFlag.APPLY_CHILDREN, PipelineFilter(identity_filter, is_deterministic=False)))
+        assert not plan.is_deterministic
+
+        with pytest.raises(ValueError):
+            PipelinePlan.compile((
+                PipelineFlag.APPLY_CHILDREN, PipelineFilter(identity_filter, is_deterministic=False),
+                PipelineFlag.CACHE_SURFACE
+            ))
+
+    def test_apply_children_count(self):
+        with pytest.raises(ValueError):
+            PipelinePlan.compile((PipelineFlag.CACHE_SURFACE,))
+        with pytest.raises(ValueError):
+            PipelinePlan.compile((PipelineFlag.APPLY_CHILDREN, PipelineFlag.APPLY_CHILDREN))
+
+    def test_shortened_pipeline_is_applied(self):
+        recurface = Recurface(surface=Surface((10, 10)), position=(0, 0))
+
+        recurface.render_pipeline = (PipelineFlag.APPLY_CHILDREN,)
+        assert recurface.render_pipeline == (PipelineFlag.APPLY_CHILDREN,)
+
+    def test_unchanged_pipeline_prefix_keeps_cached_surfaces(self):
+        destination = Surface((100, 100))
+        recurface = Recurface(
+            surface=Surface((10, 10)), position=(0, 0),
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE)
+        )
+        Recurface(surface=Surface((5, 5)), position=(0, 0), parent=recurface)
+        recurface.render(destination)
+
+        recurface.render_pipeline = (
+            PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE,
+            PipelineFilter(identity_filter, is_deterministic=True)
+        )
+        profiler = RenderProfiler()
+        recurface.render(destination, profiler=profiler)
+        profiler.detach()
+
+        assert profiler.last_report.recurface_stats[profiler.get_label(recurface)].cache_hits == 1
+
+    def test_size_preserving_filters_allow_culling(self):
+        size_preserving_filter = PipelineFilter(identity_filter, is_deterministic=True, is_size_preserving=True)
+        assert PipelinePlan.compile((PipelineFlag.APPLY_CHILDREN, size_preserving_filter)).is_size_fixed
+        assert not PipelinePlan.compile((
+            PipelineFlag.APPLY_CHILDREN, size_preserving_filter, PipelineFilter(identity_filter, is_deterministic=True)
+        )).is_size_fixed
+
+        calls = []
+
+        def counting_filter(surface: Surface) -> Surface:
+            calls.append(surface.get_size())
+            return surface
+
+        recurface = Recurface(
+            surface=Surface((10, 10)), position=(900, 0),
+            render_pipeline=(
+                PipelineFlag.APPLY_CHILDREN,
+                PipelineFilter(counting_filter, is_deterministic=False, is_size_preserving=True)
+            )
+        )
+        profiler = RenderProfiler()
+        rects = recurface.render(Surface((100, 100)), profiler=profiler)
+        profiler.detach()
+
+        assert rects == []
+        assert calls == []
+        assert profiler.last_report.recurface_stats[profiler.get_label(recurface)].is_culled
+
+    def test_borrow_end_index(self):
+        assert PipelinePlan.compile((PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE)).borrow_end_index == 2
+
+        plan = PipelinePlan.compile((
+            PipelineFlag.APPLY_CHILDREN, PipelineFilter(identity_filter, is_deterministic=True, is_in_place=False),
+            PipelineFilter(identity_filter, is_deterministic=True)
+        ))
+        assert plan.borrow_end_index == 1
+
+        plan = PipelinePlan.compile((PipelineFlag.APPLY_CHILDREN, PipelineFilter(identity_filter, is_deterministic=True)))
+        assert plan.borrow_end_index is None
+
+    def test_leaf_renders_stored_surface_without_copying(self):
+        surface = Surface((10, 10))
+        surface.fill("red")
+        recurface = Recurface(surface=surface, position=(0, 0))
+
+        profiler = RenderProfiler()
+        destination = Surface((20, 20))
+        recurface.render(destination, profiler=profiler)
+        profiler.detach()
+
+        stats = profiler.last_report.recurface_stats[profiler.get_label(recurface)]
+        assert stats.surface_copies == 0
+        assert stats.cache_misses == 0
+        assert destination.get_at((5, 5)) == (255, 0, 0)
+
+    def test_out_of_place_filter_receives_copy_only_with_children(self):
+        received = []
+
+        def record_filter(surface: Surface) -> Surface:
+            received.append(surface)
+            return surface.copy()
+
+        surface = Surface((10, 10))
+        recurface = Recurface(
+            surface=surface, position=(0, 0),
+            render_pipeline=(
+                PipelineFlag.APPLY_CHILDREN,
+                PipelineFilter(record_filter, is_deterministic=True, is_in_place=False),
+                PipelineFlag.CACHE_SURFACE
+            )
+        )
+        recurface.render(Surface((20, 20)))
+        assert received[-1] is surface
+
+        child_surface = Surface((5, 5))
+        child_surface.fill("blue")
+        Recurface(surface=child_surface, position=(0, 0), parent=recurface)
+        recurface.render(Surface((20, 20)))
+        assert received[-1] is not surface
+        assert surface.get_at((0, 0)) == (0, 0, 0)
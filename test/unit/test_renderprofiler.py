@@ -0,0 +1,117 @@
+import pytest
+from pygame import Surface
+
+from recurfaces import Recurface, PipelineFlag, PipelineFilter, RenderProfiler
+
+
+@pytest.fixture
+def profiler():
+    result = RenderProfiler()
+    yield result
+    result.detach()
+
+
+class TestRenderProfiler:
+    def test_records_blits_and_pixels(self, profiler):
+        parent = Recurface(surface=Surface((100, 100)), position=(0, 0))
+        child = Recurface(surface=Surface((10, 20)), position=(5, 5), parent=parent)
+        profiler.label(parent, "parent")
+        profiler.label(child, "child")
+
+        parent.render(Surface((800, 600)), profiler=profiler)
+        report = profiler.last_report
+
+        assert report.recurface_stats["parent"].blits == 1
+        assert report.recurface_stats["parent"].pixels_blitted == 100 * 100
+        assert report.recurface_stats["child"].pixels_blitted == 10 * 20
+        assert report.totals().blits == 2
+        assert report.rects_count == 1
+
+    def test_records_cache_hits_and_misses(self, profiler):
+        parent = Recurface(
+            surface=Surface((100, 100)), position=(0, 0),
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE)
+        )
+        child = Recurface(surface=Surface((10, 10)), position=(5, 5), parent=parent)
+        profiler.label(parent, "parent")
+        profiler.label(child, "child")
+        destination = Surface((800, 600))
+
+        parent.render(destination, profiler=profiler)
+        assert profiler.last_report.recurface_stats["parent"].cache_misses == 1
+
+        parent.render(destination, profiler=profiler)
+        assert profiler.last_report.recurface_stats["parent"].cache_hits == 1
+        assert profiler.last_report.recurface_stats["parent"].surface_copies == 0
+
+        child.move_render_position(1)
+        parent.render(destination, profiler=profiler)
+        stats = profiler.last_report.recurface_stats["parent"]
+        assert stats.cache_misses == 1
+        assert stats.miss_invalidation == ("child", "render_position")
+        assert ["parent", "child", "render_position"] in profiler.last_report.to_dict()["invalidations"]
+
+    def test_records_filter_time(self, profiler):
+        recurface = Recurface(
+            surface=Surface((10, 10)), position=(0, 0),
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN, PipelineFilter(lambda surface: surface, is_deterministic=True))
+        )
+
+        recurface.render(Surface((800, 600)), profiler=profiler)
+        assert profiler.last_report.recurface_stats[profiler.get_label(recurface)].filter_time > 0
+
+    def test_records_culled_recurfaces(self, profiler):
+        parent = Recurface(surface=Surface((100, 100)), position=(0, 0))
+        child = Recurface(surface=Surface((10, 10)), position=(500, 500), parent=parent)
+
+        parent.render(Surface((800, 600)), profiler=profiler)
+        assert profiler.last_report.recurface_stats[profiler.get_label(child)].is_culled
+
+    def test_calls_on_frame(self):
+        reports = []
+        profiler = RenderProfiler(on_frame=reports.append)
+        recurface = Recurface(surface=Surface((10, 10)), position=(0, 0))
+
+        recurface.render(Surface((800, 600)), profiler=profiler)
+        recurface.render(Surface((800, 600)), profiler=profiler)
+        profiler.detach()
+
+        assert [report.frame_index for report in reports] == [0, 1]
+
+    def test_detach_stops_recording_invalidations(self, profiler):
+        recurface = Recurface(
+            surface=Surface((10, 10)), position=(0, 0),
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE)
+        )
+        recurface.render(Surface((800, 600)), profiler=profiler)
+        profiler.detach()
+
+        recurface.flag_surface()
+        assert RenderProfiler.active is None
+
+        recurface.render(Surface((800, 600)))
+        assert profiler.last_report.frame_index == 0
+
+    def test_unprofiled_render_stops_recording_invalidations(self, profiler):
+        parent = Recurface(
+            surface=Surface((100, 100)), position=(0, 0),
+            render_pipeline=(PipelineFlag.APPLY_CHILDREN, PipelineFlag.CACHE_SURFACE)
+        )
+        child = Recurface(surface=Surface((10, 10)), position=(5, 5), parent=parent)
+        destination = Surface((800, 600))
+        parent.render(destination, profiler=profiler)
+        child.move_render_position(1)
+
+        # Labels are looked up when the invalidations are reported, rather than when they are recorded
+        profiler.label(parent, "parent")
+        profiler.label(child, "child")
+        parent.render(destination, profiler=profiler)
+        assert profiler.last_report.invalidations == [("parent", "child", "render_position")]
+
+        parent.render(destination)
+        assert RenderProfiler.active is None
+
+        child.move_render_position(1)
+        parent.render(destination, profiler=profiler)
+        assert profiler.last_report.invalidations == []
+        assert profiler.last_report.recurface_stats["parent"].cache_misses == 1
@@ -0,0 +1,205 @@
+import pytest
+from random import Random
+from pygame import Surface, Rect
+
+from recurfaces import Recurface, SpatialIndex
+
+
+@pytest.fixture
+def res():
+    class SpatialIndexResources:
+        indexes = []
+
+        @staticmethod
+        def build_index(root: Recurface, cell_size: int = 64) -> SpatialIndex:
+            result = SpatialIndex(root, cell_size=cell_size)
+            SpatialIndexResources.indexes.append(result)
+            return result
+
+        @staticmethod
+        def get_rendered_rects(root: Recurface) -> list[tuple[Recurface, Rect]]:
+            """
+            Walks the whole chain, returning the clipped area of each rendered recurface with a surface
+            in render order
+            """
+
+            result = []
+
+            def walk(recurface: Recurface, offset: tuple[int, int], clip_rect: Rect) -> None:
+                if not (recurface.do_render and recurface.render_position):
+                    return
+
+                offset = (offset[0] + recurface.x_render_coord, offset[1] + recurface.y_render_coord)
+                if recurface.surface:
+                    clip_rect = Rect(offset, recurface.surface.get_size()).clip(clip_rect)
+                    if not clip_rect:
+                        return
+                    result.append((recurface, clip_rect))
+
+                for child in recurface.child_recurfaces:
+                    walk(child, offset, clip_rect)
+
+            walk(root, (0, 0), Rect(-10**6, -10**6, 2 * 10**6, 2 * 10**6))
+            return result
+
+    yield SpatialIndexResources
+
+    for spatial_index in SpatialIndexResources.indexes:
+        spatial_index.detach()
+
+
+class TestSpatialIndex:
+    def test_point_query_in_top_down_order(self, res):
+        root = Recurface(surface=Surface((200, 200)), position=(10, 10))
+        lower = Recurface(surface=Surface((50, 50)), position=(0, 0), parent=root, priority=0)
+        upper = Recurface(surface=Surface((50, 50)), position=(20, 20), parent=root, priority=1)
+        nested = Recurface(surface=Surface((10, 10)), position=(25, 25), parent=lower)
+        spatial_index = res.build_index(root)
+
+        assert spatial_index.get_recurfaces_at((40, 40)) == [upper, nested, lower, root]
+        assert spatial_index.get_recurfaces_at((15, 15)) == [lower, root]
+        assert spatial_index.get_recurfaces_at((5, 5)) == []
+
+    def test_areas_clipped_to_ancestors(self, res):
+        root = Recurface(position=(100, 100))
+        parent = Recurface(surface=Surface((50, 50)), position=(10, 10), parent=root)
+        child = Recurface(surface=Surface((50, 50)), position=(30, -20), parent=parent)
+        hidden_child = Recurface(surface=Surface((10, 10)), position=(60, 0), parent=parent)
+        spatial_index = res.build_index(root)
+
+        assert spatial_index.get_rect(parent) == Rect(110, 110, 50, 50)
+        assert spatial_index.get_rect(child) == Rect(140, 110, 20, 30)
+        assert spatial_index.get_rect(hidden_child) is None
+        assert len(spatial_index) == 2
+
+    def test_changes_update_index(self, res):
+        root = Recurface(surface=Surface((300, 300)), position=(0, 0))
+        branch = Recurface(position=(100, 100), parent=root)
+        leaf = Recurface(surface=Surface((10, 10)), position=(0, 0), parent=branch)
+        spatial_index = res.build_index(root)
+        assert spatial_index.get_recurfaces_at((105, 105)) == [leaf, root]
+
+        branch.move_render_position(50, 0)
+        assert spatial_index.get_recurfaces_at((105, 105)) == [root]
+        assert spatial_index.get_rect(leaf) == Rect(150, 100, 10, 10)
+
+        leaf.surface = Surface((40, 40))
+        assert spatial_index.get_recurfaces_at((185, 135)) == [leaf, root]
+
+        branch.do_render = False
+        assert spatial_index.get_rect(leaf) is None
+
+        branch.do_render = True
+        leaf.parent_recurface = None
+        assert spatial_index.get_rect(leaf) is None
+
+        root.add_child_recurfaces([leaf])
+        assert spatial_index.get_rect(leaf) == Rect(0, 0, 40, 40)
+
+    def test_priority_change_reorders_results(self, res):
+        root = Recurface(position=(0, 0))
+        first = Recurface(surface=Surface((10, 10)), position=(0, 0), parent=root, priority=0)
+        second = Recurface(surface=Surface((10, 10)), position=(0, 0), parent=root, priority=1)
+        spatial_index = res.build_index(root)
+        assert spatial_index.get_recurfaces_at((5, 5)) == [second, first]
+
+        first.render_priority = 2
+        assert spatial_index.get_recurfaces_at((5, 5)) == [first, second]
+
+    def test_rect_query(self, res):
+        root = Recurface(position=(0, 0))
+        sprites = [
+            Recurface(surface=Surface((10, 10)), position=(index * 20, 0), parent=root, priority=index)
+            for index in range(10)
+        ]
+        spatial_index = res.build_index(root, cell_size=16)
+
+        assert spatial_index.get_recurfaces_colliding(Rect(15, 5, 30, 30)) == [sprites[2], sprites[1]]
+        assert spatial_index.get_recurfaces_colliding(Rect(0, 0, 0, 0)) == []
+
+    def test_matches_walked_chain_after_random_changes(self, res):
+        rng = Random(5)
+        root = Recurface(surface=Surface((400, 400)), position=(0, 0))
+        recurfaces = [root]
+        for index in range(200):
+            surface = Surface((rng.randrange(5, 60), rng.randrange(5, 60))) if rng.random() < 0.8 else None
+            recurfaces.append(Recurface(
+                surface=surface, position=(rng.randrange(-20, 380), rng.randrange(-20, 380)),
+                parent=rng.choice(recurfaces), priority=rng.randrange(5)
+            ))
+        spatial_index = res.build_index(root, cell_size=32)
+
+        for step in range(200):
+            recurface = rng.choice(recurfaces[1:])
+            change = rng.randrange(4)
+            if change == 0:
+                recurface.move_render_position(rng.randrange(-30, 31), rng.randrange(-30, 31))
+            elif change == 1:
+                recurface.do_render = not recurface.do_render
+            elif change == 2:
+                recurface.render_priority = rng.randrange(5)
+            else:
+                # A recurface cannot be moved into its own descendants
+                recurface.parent_recurface = rng.choice(
+                    [candidate for candidate in recurfaces if recurface not in candidate.ancestry]
+                )
+
+            if step % 10 == 0:
+                rendered_rects = res.get_rendered_rects(root)
+                assert {recurface: spatial_index.get_rect(recurface) for recurface, _ in rendered_rects} == dict(
+                    rendered_rects
+                )
+                assert len(spatial_index) == len(rendered_rects)
+
+                point = (rng.randrange(400), rng.randrange(400))
+                expected = [recurface for recurface, rect in reversed(rendered_rects) if rect.collidepoint(point)]
+                assert spatial_index.get_recurfaces_at(point) == expected
+
+    def test_changes_to_other_chains_ignored(self, res):
+        class ChildReadCountingRecurface(Recurface):
+            reads_count = 0
+
+            @property
+            def child_recurfaces(self):
+                ChildReadCountingRecurface.reads_count += 1
+                return super().child_recurfaces
+
+        root = Recurface(surface=Surface((100, 100)), position=(0, 0))
+        button = Recurface(surface=Surface((10, 10)), position=(5, 5), parent=root)
+        other_root = ChildReadCountingRecurface(position=(0, 0))
+        others = [
+            ChildReadCountingRecurface(surface=Surface((10, 10)), position=(index, 0), parent=other_root)
+            for index in range(50)
+        ]
+        spatial_index = res.build_index(root)
+        assert spatial_index.get_recurfaces_at((6, 6)) == [button, root]
+
+        ChildReadCountingRecurface.reads_count = 0
+        other_root.move_render_position(1, 0)
+        others[0].surface = Surface((20, 20))
+        others[1].do_render = False
+        assert spatial_index.get_recurfaces_at((6, 6)) == [button, root]
+        assert ChildReadCountingRecurface.reads_count == 0
+
+        # A recurface moved from another chain into the indexed chain is indexed along with its descendants
+        other_root.parent_recurface = root
+        assert spatial_index.get_rect(others[2]) == Rect(3, 0, 10, 10)
+
+        other_root.parent_recurface = None
+        assert spatial_index.get_rect(others[2]) is None
+        assert len(spatial_index) == 2
+
+    def test_detached_index_stops_tracking(self, res):
+        root = Recurface(surface=Surface((10, 10)), position=(0, 0))
+        spatial_index = SpatialIndex(root)
+        assert spatial_index in SpatialIndex.attached
+
+        spatial_index.detach()
+        assert spatial_index not in SpatialIndex.attached
+
+    def test_root_must_be_top_level(self):
+        root = Recurface(position=(0, 0))
+        child = Recurface(position=(0, 0), parent=root)
+
+        with pytest.raises(ValueError):
+            SpatialIndex(child)
@@ -0,0 +1,100 @@
+import pytest
+from threading import Event
+from concurrent.futures import ThreadPoolExecutor
+from pygame import Surface, Rect, image
+
+from recurfaces import Recurface, StreamedRecurface
+
+
+@pytest.fixture
+def res():
+    class StreamedRecurfaceResources:
+        executor = ThreadPoolExecutor(max_workers=1)
+        load_started = Event()
+        load_allowed = Event()
+        loads_count = 0
+
+        placeholder = Surface((10, 10))
+        placeholder.fill((0, 0, 255))
+
+        @staticmethod
+        def load_surface() -> Surface:
+            StreamedRecurfaceResources.loads_count += 1
+            StreamedRecurfaceResources.load_started.set()
+            StreamedRecurfaceResources.load_allowed.wait(timeout=5)
+
+            result = Surface((20, 20))
+            result.fill((255, 0, 0))
+            return result
+
+    yield StreamedRecurfaceResources
+
+    StreamedRecurfaceResources.load_allowed.set()
+    StreamedRecurfaceResources.executor.shutdown()
+
+
+class TestStreamedRecurface:
+    def test_placeholder_rendered_until_loaded(self, res):
+        streamed = StreamedRecurface(res.load_surface, placeholder=res.placeholder, executor=res.executor, position=(0, 0))
+        destination = Surface((20, 20))
+
+        assert streamed.render(destination) == [Rect(0, 0, 10, 10)]
+        assert destination.get_at((5, 5)) == (0, 0, 255)
+        assert res.load_started.wait(timeout=5)
+        assert not streamed.is_loaded
+
+        res.load_allowed.set()
+        streamed.start_loading().result(timeout=5)
+        assert streamed.render(destination) == [Rect(0, 0, 20, 20)]
+        assert streamed.is_loaded
+        assert destination.get_at((15, 15)) == (255, 0, 0)
+        assert res.loads_count == 1
+
+    def test_loading_starts_on_first_render(self, res):
+        res.load_allowed.set()
+        streamed = StreamedRecurface(res.load_surface, executor=res.executor, position=(0, 0))
+        parent = Recurface(surface=Surface((20, 20)), position=(0, 0))
+        assert res.loads_count == 0
+
+        streamed.parent_recurface = parent
+        parent.render(Surface((20, 20)))
+        assert res.load_started.wait(timeout=5)
+        assert res.loads_count == 1
+
+    def test_loads_image_file(self, res, tmp_path):
+        path = tmp_path / "image.png"
+        image.save(res.placeholder, str(path))
+
+        streamed = StreamedRecurface(path, executor=res.executor, position=(0, 0))
+        streamed.start_loading().result(timeout=5)
+
+        destination = Surface((10, 10))
+        streamed.render(destination)
+        assert destination.get_at((5, 5)) == (0, 0, 255)
+
+    def test_loading_error_raised_from_render(self, res):
+        def fail() -> Surface:
+            raise OSError("unable to load")
+
+        streamed = StreamedRecurface(fail, placeholder=res.placeholder, executor=res.executor, position=(0, 0))
+        streamed.start_loading().exception(timeout=5)
+
+        with pytest.raises(OSError):
+            streamed.render(Surface((10, 10)))
+        assert not streamed.is_loaded
+        assert streamed.surface is res.placeholder
+
+    def test_user_before_render_called_after_surface_updated(self, res):
+        res.load_allowed.set()
+        sizes = []
+        streamed = StreamedRecurface(
+            res.load_surface, executor=res.executor, position=(0, 0),
+            before_render=lambda recurface: sizes.append(recurface.surface and recurface.surface.get_size())
+        )
+        streamed.start_loading().result(timeout=5)
+
+        streamed.render(Surface((20, 20)))
+        assert sizes == [(20, 20)]
+
+    def test_invalid_source(self):
+        assert pytest.raises(ValueError, StreamedRecurface, 5)
@@ -0,0 +1,119 @@
+import pytest
+from gc import collect
+from pygame import Surface
+
+from recurfaces import Recurface, SurfaceCache
+
+
+class EvictionRecorder:
+    """
+    Stands in for a recurface, recording which of its cached surfaces have been evicted
+    """
+
+    def __init__(self):
+        self.evicted = []
+
+    def _evict_cached_surface(self, index: int) -> None:
+        self.evicted.append(index)
+
+
+@pytest.fixture
+def surface_cache():
+    # Ensures that cached surfaces from recurfaces left over by other tests are not released part way through a test
+    collect()
+
+    yield Recurface.surface_cache
+
+    Recurface.surface_cache.max_bytes = None
+    Recurface.surface_cache.is_cost_aware = False
+
+
+class TestSurfaceCache:
+    def test_tracks_used_bytes(self):
+        cache = SurfaceCache()
+        owner = EvictionRecorder()
+        surface = Surface((10, 10), depth=32)
+
+        assert cache.store(owner, 0, surface)
+        assert cache.used_bytes == surface.get_pitch() * 10
+
+        cache.discard(owner, 0)
+        assert cache.used_bytes == 0
+        assert len(cache) == 0
+
+    def test_evicts_least_recently_used(self):
+        cache = SurfaceCache(max_bytes=2 * 400)
+        owner_1, owner_2, owner_3 = EvictionRecorder(), EvictionRecorder(), EvictionRecorder()
+
+        cache.store(owner_1, 0, Surface((10, 10), depth=32))
+        cache.store(owner_2, 0, Surface((10, 10), depth=32))
+        cache.touch(owner_1, 0)
+        cache.store(owner_3, 0, Surface((10, 10), depth=32))
+
+        assert owner_1.evicted == []
+        assert owner_2.evicted == [0]
+        assert cache.used_bytes == 2 * 400
+
+    def test_cost_aware_evicts_cheapest_to_rebuild(self):
+        cache = SurfaceCache(max_bytes=2 * 400, is_cost_aware=True)
+        owner_1, owner_2, owner_3 = EvictionRecorder(), EvictionRecorder(), EvictionRecorder()
+
+        cache.store(owner_1, 0, Surface((10, 10), depth=32), rebuild_time=0.5)
+        cache.store(owner_2, 0, Surface((10, 10), depth=32), rebuild_time=0.1)
+        cache.touch(owner_2, 0)
+        cache.store(owner_3, 0, Surface((10, 10), depth=32), rebuild_time=0.3)
+
+        assert owner_1.evicted == []
+        assert owner_2.evicted == [0]
+
+    def test_refuses_surfaces_larger_than_budget(self):
+        cache = SurfaceCache(max_bytes=100)
+
+        assert not cache.store(EvictionRecorder(), 0, Surface((10, 10), depth=32))
+        assert cache.used_bytes == 0
+
+    def test_lowering_budget_evicts(self):
+        cache = SurfaceCache()
+        owner = EvictionRecorder()
+        cache.store(owner, 0, Surface((10, 10), depth=32))
+
+        cache.max_bytes = 0
+        assert owner.evicted == [0]
+
+    def test_forgets_collected_owners(self):
+        cache = SurfaceCache()
+        cache.store(EvictionRecorder(), 0, Surface((10, 10), depth=32))
+
+        assert cache.used_bytes == 0
+
+    def test_negative_budget(self):
+        with pytest.raises(ValueError):
+            SurfaceCache(max_bytes=-1)
+
+    def test_recurface_caches_are_tracked_and_released(self, surface_cache):
+        used_bytes_before = surface_cache.used_bytes
+        recurface = Recurface(surface=Surface((100, 100), depth=32), position=(0, 0))
+        # Leaf recurfaces render their stored surface directly, so do not cache it
+        Recurface(surface=Surface((10, 10), depth=32), position=(0, 0), parent=recurface)
+
+        recurface.render(Surface((800, 600)))
+        assert surface_cache.used_bytes == used_bytes_before + recurface.surface.get_pitch() * 100
+
+        recurface.flag_surface()
+        assert surface_cache.used_bytes == used_bytes_before
+
+    def test_evicted_recurface_caches_are_rebuilt(self, surface_cache):
+        destination = Surface((800, 600))
+        parent = Recurface(surface=Surface((100, 100), depth=32), position=(0, 0))
+        parent.surface.fill("white")
+        child = Recurface(surface=Surface((10, 10), depth=32), position=(20, 20), parent=parent)
+        child.surface.fill("red")
+
+        parent.render(destination)
+        surface_cache.max_bytes = 0
+        destination.fill("black")
+
+        rects = parent.render(destination)
+        assert rects == []
+        assert destination.get_at((25, 25)) == (255, 0, 0)
+        assert destination.get_at((50, 50)) == (255, 255, 255)
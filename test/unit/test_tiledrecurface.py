@@ -0,0 +1,110 @@
+import pytest
+from pygame import Surface, Rect, image
+
+from recurfaces import Recurface, TiledRecurface, RenderProfiler
+
+
+@pytest.fixture
+def res():
+    class TiledRecurfaceResources:
+        source = Surface((1000, 800))
+        for column in range(10):
+            for row in range(8):
+                source.fill((column * 20, row * 20, 100), Rect(column * 100, row * 100, 100, 100))
+
+        requested_tiles = []
+
+        @staticmethod
+        def tile_source(column: int, row: int) -> Surface:
+            TiledRecurfaceResources.requested_tiles.append((column, row))
+
+            result = Surface((50, 50))
+            result.fill(((column * 10) % 256, (row * 10) % 256, 0))
+            return result
+
+    return TiledRecurfaceResources
+
+
+class TestTiledRecurface:
+    def test_only_visible_tiles_are_children(self, res):
+        viewport = Recurface(surface=Surface((250, 150)), position=(0, 0))
+        tiled = TiledRecurface(res.source, tile_size=(100, 100), position=(-20, -20), parent=viewport)
+
+        viewport.render(Surface((300, 200)))
+        assert sorted(tiled.visible_tiles) == [(column, row) for column in range(3) for row in range(2)]
+        assert len(tiled.child_recurfaces) == 6
+
+    def test_renders_same_output_as_full_surface(self, res):
+        viewport_surface = Surface((250, 150))
+        viewport = Recurface(surface=viewport_surface, position=(0, 0))
+        tiled = TiledRecurface(res.source, tile_size=(100, 100), position=(-20, -20), parent=viewport)
+
+        expected = Surface((250, 150))
+        for position in ((-20, -20), (-335, -410), (-750, -650)):
+            tiled.render_position = position
+            destination = Surface((250, 150))
+            viewport.render(destination)
+
+            expected.blit(res.source, position)
+            assert image.tobytes(destination, "RGB") == image.tobytes(expected, "RGB")
+
+    def test_tiles_materialised_lazily_and_evicted(self, res):
+        tiled = TiledRecurface(
+            res.tile_source, tile_size=(50, 50), position=(0, 0), max_cached_tiles=4, viewport_size=(100, 100)
+        )
+
+        tiled.render(Surface((100, 100)))
+        assert sorted(res.requested_tiles) == [(0, 0), (0, 1), (1, 0), (1, 1)]
+
+        tiled.render_position = (-10000, -10000)
+        tiled.render(Surface((100, 100)))
+        assert tiled.materialised_tiles_count == 4 + 4
+
+        tiled.render_position = (-20000, -20000)
+        tiled.render(Surface((100, 100)))
+        # Only the 4 most recently visible tiles which are now out of view are kept
+        assert tiled.materialised_tiles_count == 4 + 4
+
+        res.requested_tiles.clear()
+        tiled.render_position = (-10000, -10000)
+        tiled.render(Surface((100, 100)))
+        assert res.requested_tiles == []
+
+    def test_grid_size_bounds_visible_tiles(self, res):
+        tiled = TiledRecurface(
+            res.tile_source, tile_size=(50, 50), grid_size=(3, 3), position=(50, 50), viewport_size=(400, 400)
+        )
+
+        tiled.render(Surface((400, 400)))
+        assert sorted(tiled.visible_tiles) == [(column, row) for column in range(3) for row in range(3)]
+
+    def test_refresh_tiles_requests_tiles_again(self, res):
+        tiled = TiledRecurface(res.tile_source, tile_size=(50, 50), position=(0, 0), viewport_size=(50, 50))
+        destination = Surface((50, 50))
+        tiled.render(destination)
+
+        res.requested_tiles.clear()
+        tiled.refresh_tiles()
+        rects = tiled.render(destination)
+        assert res.requested_tiles == [(0, 0)]
+        assert rects == [Rect(0, 0, 50, 50)]
+
+    def test_tile_surfaces_blitted_without_copying(self, res):
+        viewport = Recurface(surface=Surface((250, 150)), position=(0, 0))
+        tiled = TiledRecurface(res.source, tile_size=(100, 100), position=(-20, -20), parent=viewport)
+        profiler = RenderProfiler()
+        viewport.render(Surface((300, 200)), profiler=profiler)
+
+        stats = profiler.last_report.recurface_stats
+        assert all(stats[profiler.get_label(tile)].surface_copies == 0 for tile in tiled.child_recurfaces)
+        profiler.detach()
+
+    def test_user_before_render_called_before_tiles_update(self, res):
+        tiled = TiledRecurface(res.source, tile_size=(100, 100), position=(0, 0), viewport_size=(100, 100))
+        tiled.before_render = lambda recurface: recurface.move_render_position(-150)
+
+        tiled.render(Surface((100, 100)))
+        assert sorted(tiled.visible_tiles) == [(1, 0), (2, 0)]
+
+    def test_invalid_tile_size(self, res):
+        assert pytest.raises(ValueError, TiledRecurface, res.source, (0, 100))
@@ -0,0 +1,7 @@
+:: Requires pygame to be installed
+:: This script will run the headless render benchmarks and save their results to a JSON file for later comparison
+
+cd ..
+python test/benchmark/run_benchmarks.py --output benchmark_results.json
+
+pause